@@ -44,6 +44,7 @@
         # Configuration
         'data/website.xml',
         'data/images.xml',
+        'data/ir_cron.xml',
 
         # Layout (header, footer, base)
         'views/layout/assets.xml',
@@ -59,6 +60,7 @@
         'views/components/product_results_info.xml',
         'views/components/button_halftone.xml',
         'views/components/article_narrow.xml',
+        'views/components/responsive_image.xml',
         'views/components/faq_section.xml',
         'views/components/reseller_section.xml',
         'views/components/quantity_selector.xml',
@@ -92,19 +94,53 @@
     ],
     'assets': {
         'web.assets_frontend': [
-            # Core styles
+            # Core styles (every page). Page styles are in the per-area
+            # bundles below, attached by views/layout/assets.xml
             'custom_shop_templates/static/src/scss/variables.scss',
             'custom_shop_templates/static/src/scss/_base.scss',
             'custom_shop_templates/static/src/scss/_utilities.scss',
             'custom_shop_templates/static/src/scss/components.scss',
-            'custom_shop_templates/static/src/scss/components/_banners.scss',
+            'custom_shop_templates/static/src/scss/components/_buttons.scss',
+
+            # JavaScript
+            'custom_shop_templates/static/src/js/product_variant_autoselect.js',
+            # 'custom_shop_templates/static/src/js/cart.js',  # TODO: File missing
+            # Inline script in template instead
+            # 'custom_shop_templates/static/src/js/checkout_address.js',
+            'custom_shop_templates/static/src/js/addresses.js',
+            'custom_shop_templates/static/src/js/payment-method-toggle.js',
+            'custom_shop_templates/static/src/js/prefetch.js',
+            'custom_shop_templates/static/src/js/search_suggest.js',
+            'custom_shop_templates/static/src/js/cart_batch.js',
+            'custom_shop_templates/static/src/js/checkout_steps.js',
+            'custom_shop_templates/static/src/js/account-selector.js',
+        ],
 
-            # Summary components (base → variants → specific)
+        # Variables and mixins for the per-area bundles: the same helpers,
+        # in the same order, as the head of web.assets_frontend
+        'custom_shop_templates._assets_area_helpers': [
+            ('include', 'web._assets_helpers'),
+            ('include', 'web._assets_frontend_helpers'),
+            'web/static/src/scss/pre_variables.scss',
+            'web/static/lib/bootstrap/scss/_variables.scss',
+            'web/static/lib/bootstrap/scss/_variables-dark.scss',
+            'web/static/lib/bootstrap/scss/_maps.scss',
+            'custom_shop_templates/static/src/scss/variables.scss',
+        ],
+
+        # Per-area page styles. Each bundle lists every page file whose
+        # classes its templates use, in the former web.assets_frontend order,
+        # so the cascade on each page is unchanged.
+        # Check with: python3 scripts/check_assets.py
+        'custom_shop_templates.assets_shop': [
+            ('include', 'custom_shop_templates._assets_area_helpers'),
+            'custom_shop_templates/static/src/scss/components/_summary-base.scss',
+        ],
+        'custom_shop_templates.assets_checkout': [
+            ('include', 'custom_shop_templates._assets_area_helpers'),
             'custom_shop_templates/static/src/scss/components/_summary-base.scss',
             'custom_shop_templates/static/src/scss/components/_cart-summary.scss',
             'custom_shop_templates/static/src/scss/components/_checkout-summary.scss',
-
-            # Page-specific styles
             'custom_shop_templates/static/src/scss/pages/_cart.scss',
             'custom_shop_templates/static/src/scss/pages/_checkout-address.scss',
             'custom_shop_templates/static/src/scss/pages/_checkout-shipping.scss',
@@ -112,22 +148,33 @@
             'custom_shop_templates/static/src/scss/pages/_login.scss',
             'custom_shop_templates/static/src/scss/pages/_register.scss',
             'custom_shop_templates/static/src/scss/pages/_account-layout.scss',
+            'custom_shop_templates/static/src/scss/pages/_addresses.scss',
+            'custom_shop_templates/static/src/scss/pages/_orders.scss',
+        ],
+        'custom_shop_templates.assets_account': [
+            ('include', 'custom_shop_templates._assets_area_helpers'),
+            'custom_shop_templates/static/src/scss/components/_banners.scss',
+            'custom_shop_templates/static/src/scss/components/_summary-base.scss',
+            'custom_shop_templates/static/src/scss/pages/_checkout-address.scss',
+            'custom_shop_templates/static/src/scss/pages/_login.scss',
+            'custom_shop_templates/static/src/scss/pages/_register.scss',
+            'custom_shop_templates/static/src/scss/pages/_account-layout.scss',
             'custom_shop_templates/static/src/scss/pages/_account-navigation.scss',
             'custom_shop_templates/static/src/scss/pages/_dashboard.scss',
             'custom_shop_templates/static/src/scss/pages/_account-details.scss',
             'custom_shop_templates/static/src/scss/pages/_addresses.scss',
             'custom_shop_templates/static/src/scss/pages/_payment-methods.scss',
             'custom_shop_templates/static/src/scss/pages/_orders.scss',
-
-            # JavaScript
-            'custom_shop_templates/static/src/js/product_variant_autoselect.js',
-            # 'custom_shop_templates/static/src/js/cart.js',  # TODO: File missing
-            # Inline script in template instead
-            # 'custom_shop_templates/static/src/js/checkout_address.js',
-            'custom_shop_templates/static/src/js/addresses.js',
-            'custom_shop_templates/static/src/js/payment-method-toggle.js',
-            'custom_shop_templates/static/src/js/prefetch.js',
-            'custom_shop_templates/static/src/js/account-selector.js',
+        ],
+        'custom_shop_templates.assets_auth': [
+            ('include', 'custom_shop_templates._assets_area_helpers'),
+            'custom_shop_templates/static/src/scss/components/_banners.scss',
+            'custom_shop_templates/static/src/scss/pages/_checkout-address.scss',
+            'custom_shop_templates/static/src/scss/pages/_login.scss',
+            'custom_shop_templates/static/src/scss/pages/_register.scss',
+            'custom_shop_templates/static/src/scss/pages/_account-details.scss',
+            'custom_shop_templates/static/src/scss/pages/_addresses.scss',
+            'custom_shop_templates/static/src/scss/pages/_payment-methods.scss',
         ],
     },
     'images': [
@@ -1,4 +1,7 @@
 # -*- coding: utf-8 -*-
 
+from . import metrics
+from . import images
 from . import portal
 from . import checkout
+from . import shop
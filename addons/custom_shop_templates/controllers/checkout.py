@@ -1,9 +1,49 @@
 # -*- coding: utf-8 -*-
 
+import hashlib
+import json
+import logging
+import time
+from urllib.parse import parse_qs, urlsplit
+
 from odoo import http
 from odoo.http import request
 from odoo.addons.website_sale.controllers.main import WebsiteSale
 
+from .metrics import tts_instrument
+
+_logger = logging.getLogger(__name__)
+
+# Checkout steps in funnel order, with the URL that renders each one
+CHECKOUT_STEP_URLS = {
+    'address': '/shop/checkout?step=address',
+    'shipping': '/shop/checkout?step=shipping',
+    'payment': '/shop/payment',
+    'notes': '/shop/checkout/notes',
+}
+CHECKOUT_URL_STEPS = {url: step for step, url in CHECKOUT_STEP_URLS.items()}
+
+# Steps rendered by a full page load, never swapped in by checkout_steps.js:
+# the payment form is a public widget that only starts on page load
+CHECKOUT_FULL_PAGE_STEPS = {'payment'}
+
+# Step validation errors: ?error=<code> on the step URL a submit returns
+CHECKOUT_STEP_ERRORS = {
+    'terms': "Please accept the Terms and Conditions to place your order.",
+}
+
+# Delivery rate quotes are reused for this long (seconds), as long as the
+# order fingerprint (lines, quantities, shipping address) doesn't change
+DELIVERY_QUOTE_TTL = 600
+
+# Steps that must be complete before a step can be shown
+CHECKOUT_STEP_REQUIRES = {
+    'address': [],
+    'shipping': ['address'],
+    'payment': ['address', 'shipping'],
+    'notes': ['address', 'shipping'],
+}
+
 
 class TTSCheckout(WebsiteSale):
     """
@@ -17,114 +57,234 @@ class TTSCheckout(WebsiteSale):
     - /shop/checkout?step=shipping (Step 2: Shipping method selection)
     - /shop/payment                (Step 3: Payment method selection)
     - /shop/checkout/notes         (Step 4: Order notes + Terms acceptance)
+    - /shop/checkout/step          (JSON: submit a step, get the next one)
+
+    Cart:
+    - /shop/cart/update_batch      (JSON: several line quantity changes at once)
     """
 
-    @http.route(['/shop/checkout'], type='http', auth='public', website=True, sitemap=False)
-    def checkout(self, **post):
+    # =======================================================================
+    # CHECKOUT STATE (shared by all steps)
+    # =======================================================================
+
+    def _tts_load_checkout(self):
         """
-        Override the standard /shop/checkout route to implement sub-steps.
+        Load the current order and everything the steps read from it, once.
 
-        Sub-steps:
-        - step=address  : Show billing/shipping address forms
-        - step=shipping : Show shipping method selection
-        - (no step)     : Redirect to step=address (default)
+        Billing and shipping partners are fetched together, and the set of
+        completed steps is computed here so each route doesn't re-read
+        partner_id.street/city, carrier_id, etc. on its own.
 
-        The standard Odoo checkout combines address + shipping in one page.
-        This controller separates them into distinct steps for better UX.
+        :return: dict with keys
+            order, partner, shipping_partner, carrier, only_services,
+            completed_steps (set of step names), started_at (perf_counter)
         """
-        order = request.website.sale_get_order()
+        started_at = time.perf_counter()
+        checkout = {
+            'order': request.website.sale_get_order(),
+            'started_at': started_at,
+        }
+        return self._tts_refresh_checkout(checkout)
+
+    def _tts_refresh_checkout(self, checkout):
+        """
+        (Re)compute the partners and completed steps of checkout['order'].
+
+        Also used after a step was saved (/shop/checkout/step), so the next
+        step is prepared without loading the order again.
+        """
+        order = checkout['order']
+        checkout.update({
+            'partner': order.partner_id,
+            'shipping_partner': order.partner_shipping_id,
+            'carrier': order.carrier_id,
+            'only_services': order and order.only_services or False,
+            'completed_steps': set(),
+        })
+        if not order:
+            return checkout
+
+        # Single prefetch for both addresses (billing + shipping)
+        (order.partner_id | order.partner_shipping_id).fetch(['street', 'city', 'zip', 'country_id', 'state_id'])
+
+        completed_steps = checkout['completed_steps']
+        if order.partner_id.street and order.partner_id.city:
+            completed_steps.add('address')
+        if order.carrier_id:
+            completed_steps.add('shipping')
+        if request.session.get('selected_payment_method_id'):
+            completed_steps.add('payment')
+
+        return checkout
+
+    def _tts_check_step(self, checkout, step):
+        """
+        Make sure a step can be shown.
+
+        :return: redirect response (to the cart or to the first missing step),
+                 or None if the step can be rendered
+        """
+        url = self._tts_step_redirect_url(checkout, step)
+        return request.redirect(url) if url else None
 
-        # Redirect to cart if no order
+    def _tts_step_redirect_url(self, checkout, step):
+        """URL to send the customer to instead of `step` (see _tts_check_step), or None."""
+        order = checkout['order']
         if not order or not order.order_line or order.state != 'draft':
-            return request.redirect('/shop/cart')
+            return '/shop/cart'
 
-        # Get current step (default to 'address' if not specified)
-        current_step = post.get('step', 'address')
+        for required_step in CHECKOUT_STEP_REQUIRES[step]:
+            if required_step not in checkout['completed_steps']:
+                return CHECKOUT_STEP_URLS[required_step]
 
-        # Validate step value
-        if current_step not in ['address', 'shipping']:
-            current_step = 'address'
+        return None
 
-        # ===================================================================
-        # STEP 1: ADDRESS
-        # ===================================================================
-        if current_step == 'address':
-            # Get countries and states for form dropdowns
-            countries = request.env['res.country'].sudo().search([])
-            states = request.env['res.country.state'].sudo().search([])
-
-            # Get partner data
-            partner = order.partner_id
-
-            # Prepare values - must include all variables expected by website_sale.checkout
-            values = {
-                'website_sale_order': order,
-                'order': order,  # REQUIRED: website_sale.checkout expects 'order'
-                'partner': partner,
-                'partner_id': partner.id,
-                'countries': countries,
-                'states': states,
-                'current_step': 'address',
-                'errors': {},
-                'error_message': [],
-                'only_services': order and order.only_services or False,
-            }
+    def _tts_checkout_values(self, checkout, step, **extra):
+        """
+        Values for website_sale.checkout, common to every step.
 
-            # Render checkout template (address section will be shown via t-if)
-            return request.render('website_sale.checkout', values)
+        :param extra: step-specific values (countries, carriers, ...)
+        """
+        order = checkout['order']
+        values = {
+            'website_sale_order': order,
+            'order': order,  # REQUIRED: website_sale.checkout expects 'order'
+            'partner': checkout['partner'],
+            'partner_id': checkout['partner'].id,
+            'current_step': step,
+            'completed_steps': checkout['completed_steps'],
+            'errors': {},
+            'error_message': [],
+            'only_services': checkout['only_services'],
+        }
+        values.update(extra)
+        return values
 
-        # ===================================================================
-        # STEP 2: SHIPPING
-        # ===================================================================
-        elif current_step == 'shipping':
-            # Check if address was completed (partner must have address data)
-            if not order.partner_id.street or not order.partner_id.city:
-                # Redirect back to address step if incomplete
-                return request.redirect('/shop/checkout?step=address')
-
-            # Get available shipping carriers
-            carriers = request.env['delivery.carrier'].sudo().search([])
-
-            # Prepare values - must include all variables expected by website_sale.checkout
-            values = {
-                'website_sale_order': order,
-                'order': order,  # REQUIRED: website_sale.checkout expects 'order'
-                'partner': order.partner_id,
-                'partner_id': order.partner_id.id,
-                'partner_shipping_id': order.partner_shipping_id,
-                'carriers': carriers,
-                'current_step': 'shipping',
-                'errors': {},
-                'error_message': [],
-                'only_services': order and order.only_services or False,
-            }
+    def _tts_get_delivery_quotes(self, order, carriers):
+        """
+        Delivery price of each carrier for this order, cached in the session.
 
-            # Render checkout template (shipping section will be shown via t-if)
-            return request.render('website_sale.checkout', values)
+        Quotes are keyed by the order fingerprint, so changing the cart or
+        the shipping address invalidates them. Carriers switched back and
+        forth on the shipping step are not rated again.
 
-    @http.route(['/shop/checkout/address'], type='http', auth='public', methods=['POST'], website=True, sitemap=False)
-    def checkout_address_submit(self, **post):
+        :return: dict {carrier_id: {'price': float} or {'error': str}}
         """
-        Process address form submission (Step 1)
+        fingerprint = order._get_tts_delivery_fingerprint()
+        now = time.time()
+
+        cache = request.session.get('tts_delivery_quotes') or {}
+        if cache.get('fingerprint') != fingerprint or cache.get('expires', 0) < now:
+            cache = {'fingerprint': fingerprint, 'expires': now + DELIVERY_QUOTE_TTL, 'quotes': {}}
+
+        # Session data is JSON: carrier ids are stored as string keys
+        quotes = cache['quotes']
+        missing = carriers.filtered(lambda carrier: str(carrier.id) not in quotes)
+        for carrier in missing:
+            quotes[str(carrier.id)] = self._tts_rate_carrier(order, carrier)
+        if missing:
+            request.session['tts_delivery_quotes'] = cache
+
+        return {carrier.id: quotes[str(carrier.id)] for carrier in carriers}
+
+    def _tts_rate_carrier(self, order, carrier):
+        """Compute one carrier's delivery price (see _tts_get_delivery_quotes)."""
+        try:
+            result = carrier.rate_shipment(order)
+        except Exception as e:
+            _logger.warning(f"Error calculating delivery price: {str(e)}")
+            return {'error': str(e)}
+
+        if result and not result.get('success', True):
+            return {'error': result.get('error_message') or ''}
+
+        return {'price': result['price'] if result and 'price' in result else 0}
+
+    def _tts_render_step(self, checkout, step, values):
+        """Render one checkout step (all steps share website_sale.checkout)."""
+        _logger.debug(
+            "TTS checkout step '%s' prepared in %.2f ms",
+            step, (time.perf_counter() - checkout['started_at']) * 1000,
+        )
+        return request.render('website_sale.checkout', values)
 
-        POST data expected:
-        - billing_first_name, billing_last_name
-        - company_name, vat
-        - billing_street, billing_street2
-        - billing_zip, billing_city
-        - billing_country_id, billing_state_id
-        - phone
-        - shipping_same (checkbox: 1 if same as billing)
-        - shipping_* fields (if shipping_same != 1)
+    def _tts_step_values(self, checkout, step):
+        """
+        Values to render one step, for the page routes and /shop/checkout/step.
 
-        Returns: Redirect to /shop/checkout?step=shipping
+        :return: dict for website_sale.checkout / checkout_step_content
         """
-        order = request.website.sale_get_order()
+        order = checkout['order']
 
-        if not order:
-            return request.redirect('/shop/cart')
+        # STEP 1: ADDRESS
+        if step == 'address':
+            partner = checkout['partner']
+
+            # Get countries and states for form dropdowns (cached per language)
+            # Only the selected countries' states are rendered; the others are
+            # fetched on demand from /shop/states/<country_id> (addresses.js)
+            countries = request.env['res.country']._get_tts_country_options()
+            billing_country_id = partner.country_id.id
+            shipping_country_id = checkout['shipping_partner'].country_id.id or billing_country_id
+            State = request.env['res.country.state']
+            states = State._get_tts_state_options(billing_country_id) if billing_country_id else ()
+            shipping_states = State._get_tts_state_options(shipping_country_id) if shipping_country_id else ()
+
+            return self._tts_checkout_values(
+                checkout, 'address',
+                countries=countries,
+                states=states,
+                shipping_states=shipping_states,
+            )
 
-        # Get or create billing partner
+        # STEP 2: SHIPPING
+        if step == 'shipping':
+            # Get shipping carriers for this website/company/shipping country (memoized)
+            carriers = request.env['delivery.carrier']._get_tts_available_carriers(order)
+
+            # Rate every carrier now so prices show instantly; the POST reuses them
+            delivery_quotes = self._tts_get_delivery_quotes(order, carriers)
+
+            return self._tts_checkout_values(
+                checkout, 'shipping',
+                partner_shipping_id=checkout['shipping_partner'],
+                carriers=carriers,
+                delivery_quotes=delivery_quotes,
+            )
+
+        # STEP 3: PAYMENT
+        if step == 'payment':
+            # Get payment methods for this website/country/currency/company (memoized)
+            payment_methods = request.env['payment.method']._get_tts_available_methods(order)
+            return self._tts_checkout_values(
+                checkout, 'payment',
+                payment_methods_sudo=payment_methods,
+            )
+
+        # STEP 4: NOTES
+        selected_payment_method_id = request.session.get('selected_payment_method_id')
+        selected_payment_method = None
+        if selected_payment_method_id:
+            selected_payment_method = request.env['payment.method'].sudo().browse(selected_payment_method_id)
+
+        return self._tts_checkout_values(
+            checkout, 'notes',
+            selected_payment_method=selected_payment_method,
+        )
+
+    # =======================================================================
+    # STEP SUBMISSION (shared by the form POST routes and /shop/checkout/step)
+    # =======================================================================
+
+    def _tts_submit_address(self, checkout, post):
+        """
+        Save the address step (billing + shipping address).
+
+        :return: URL to continue to (next step, or the same step on error)
+        """
+        order = checkout['order']
+
+        # Billing partner (already prefetched by _tts_load_checkout)
         partner = order.partner_id
 
         # Update billing address
@@ -141,14 +301,16 @@ class TTSCheckout(WebsiteSale):
             'vat': post.get('vat', ''),
         }
 
-        partner.sudo().write(billing_data)
+        # Only write what changed (re-submitting the form is a no-op)
+        partner.sudo()._tts_write_changed(billing_data)
 
         # Handle shipping address
         if post.get('shipping_same') == '1':
             # Shipping same as billing
-            order.partner_shipping_id = partner
+            if order.partner_shipping_id != partner:
+                order.partner_shipping_id = partner
         else:
-            # Create or update separate shipping address
+            # Reuse, update or create a separate shipping address
             shipping_data = {
                 'name': f"{post.get('shipping_first_name', '')} {post.get('shipping_last_name', '')}".strip(),
                 'street': post.get('shipping_street', ''),
@@ -157,34 +319,36 @@ class TTSCheckout(WebsiteSale):
                 'zip': post.get('shipping_zip', ''),
                 'country_id': int(post.get('shipping_country_id')) if post.get('shipping_country_id') else False,
                 'state_id': int(post.get('shipping_state_id')) if post.get('shipping_state_id') else False,
-                'type': 'delivery',
-                'parent_id': partner.id,
             }
 
-            # Check if shipping address already exists
-            if order.partner_shipping_id and order.partner_shipping_id.id != partner.id:
-                order.partner_shipping_id.sudo().write(shipping_data)
-            else:
-                shipping_partner = request.env['res.partner'].sudo().create(shipping_data)
+            # Same address as an existing delivery contact (indexed hash lookup)
+            shipping_partner = partner.sudo()._tts_find_delivery_address(shipping_data)
+            if not shipping_partner:
+                current = order.partner_shipping_id.sudo()
+                if current and current != partner and current._tts_is_exclusive_to(order):
+                    # Only this order ships there: correct it in place
+                    shipping_partner = current
+                    shipping_partner._tts_write_changed(shipping_data)
+                else:
+                    # A new address; the current contact may be shared
+                    # (another order's, a colleague's)
+                    shipping_partner = request.env['res.partner'].sudo().create(
+                        dict(shipping_data, type='delivery', parent_id=partner.id)
+                    )
+
+            if order.partner_shipping_id != shipping_partner:
                 order.partner_shipping_id = shipping_partner
 
-        # Redirect to shipping step
-        return request.redirect('/shop/checkout?step=shipping')
+        # Continue to shipping step
+        return CHECKOUT_STEP_URLS['shipping']
 
-    @http.route(['/shop/checkout/shipping'], type='http', auth='public', methods=['POST'], website=True, sitemap=False)
-    def checkout_shipping_submit(self, **post):
+    def _tts_submit_shipping(self, checkout, post):
         """
-        Process shipping method selection (Step 2)
+        Save the selected carrier and its quoted delivery price.
 
-        POST data expected:
-        - carrier_id: ID of selected delivery carrier
-
-        Returns: Redirect to /shop/payment
+        :return: URL to continue to (next step, or the same step on error)
         """
-        order = request.website.sale_get_order()
-
-        if not order:
-            return request.redirect('/shop/cart')
+        order = checkout['order']
 
         # Get selected carrier
         carrier_id = int(post.get('carrier_id', 0))
@@ -193,27 +357,175 @@ class TTSCheckout(WebsiteSale):
             # Get carrier object
             carrier = request.env['delivery.carrier'].sudo().browse(carrier_id)
 
-            # Calculate delivery price
-            try:
-                price_result = carrier.get_delivery_price(order)
-                if price_result and 'price' in price_result:
-                    delivery_price = price_result['price']
-                else:
-                    delivery_price = 0
+            # Delivery price quoted on the shipping step (computed now if missing/stale)
+            quote = self._tts_get_delivery_quotes(order, carrier)[carrier.id]
 
+            if 'price' in quote:
                 # Apply carrier and delivery cost to order (Odoo 18 method)
-                order.set_delivery_line(carrier, delivery_price)
-            except Exception as e:
+                order.set_delivery_line(carrier, quote['price'])
+            else:
                 # If delivery calculation fails, just set carrier without price
-                import logging
-                _logger = logging.getLogger(__name__)
-                _logger.warning(f"Error calculating delivery price: {str(e)}")
                 order.carrier_id = carrier
 
-        # Redirect to payment step
-        return request.redirect('/shop/payment')
+        # Continue to payment step
+        return CHECKOUT_STEP_URLS['payment']
+
+    def _tts_submit_payment(self, checkout, post):
+        """
+        Remember the selected payment method (session).
+
+        :return: URL to continue to (next step, or the same step on error)
+        """
+        # Get selected payment method
+        payment_method_id = int(post.get('payment_method_id', 0))
+
+        if payment_method_id:
+            # Store payment method in session for later use
+            request.session['selected_payment_method_id'] = payment_method_id
+
+        # Continue to notes step
+        return CHECKOUT_STEP_URLS['notes']
+
+    def _tts_submit_notes(self, checkout, post):
+        """
+        Save the order note; terms must be accepted.
+
+        :return: URL to continue to (next step, or the same step on error)
+        """
+        order = checkout['order']
+
+        # Validate terms acceptance
+        if not post.get('terms_accepted') == '1':
+            # Back to the same step, with the error shown
+            return CHECKOUT_STEP_URLS['notes'] + '?error=terms'
+
+        # Save order note if provided
+        order_note = post.get('order_note', '').strip()
+        if order_note:
+            order.sudo().write({'note': order_note})
+
+        # Get payment method from session
+        payment_method_id = request.session.get('selected_payment_method_id')
+
+        if payment_method_id:
+            # Process payment transaction
+            # This should redirect to payment provider or confirm order
+            return f'/shop/payment/transaction?payment_method_id={payment_method_id}'
+        else:
+            # If no payment method, just confirm order
+            return '/shop/confirm_order'
+
+    # =======================================================================
+    # ROUTES
+    # =======================================================================
+
+    @http.route(['/shop/checkout'], type='http', auth='public', website=True, sitemap=False)
+    @tts_instrument
+    def checkout(self, **post):
+        """
+        Override the standard /shop/checkout route to implement sub-steps.
+
+        Sub-steps:
+        - step=address  : Show billing/shipping address forms
+        - step=shipping : Show shipping method selection
+        - (no step)     : Redirect to step=address (default)
+
+        The standard Odoo checkout combines address + shipping in one page.
+        This controller separates them into distinct steps for better UX.
+        """
+        checkout = self._tts_load_checkout()
+
+        # Get current step (default to 'address' if not specified)
+        current_step = post.get('step', 'address')
+
+        # Validate step value
+        if current_step not in ['address', 'shipping']:
+            current_step = 'address'
+
+        # Redirect to cart if no order, or back to address if incomplete
+        redirect = self._tts_check_step(checkout, current_step)
+        if redirect:
+            return redirect
+
+        values = self._tts_step_values(checkout, current_step)
+
+        # Render checkout template (address / shipping section shown via t-if)
+        return self._tts_render_step(checkout, current_step, values)
+
+    @http.route(['/shop/states/<int:country_id>'], type='http', auth='public', methods=['GET'], website=True, sitemap=False)
+    @tts_instrument
+    def country_states(self, country_id, **kw):
+        """
+        State options of one country, as JSON (used by address forms)
+
+        Address forms only render the selected country's states; addresses.js
+        calls this route when the customer picks another country.
+
+        Response: {"country_id": 57, "states": [{"id": 1, "name": "Berlin"}, ...]}
+        Cacheable: sends an ETag and answers 304 when it matches If-None-Match.
+        """
+        states = request.env['res.country.state']._get_tts_state_options(country_id)
+        payload = {
+            'country_id': country_id,
+            'states': [{'id': state.id, 'name': state.name} for state in states],
+        }
+        body = json.dumps(payload, separators=(',', ':'))
+        etag = hashlib.sha1(body.encode()).hexdigest()
+
+        headers = [
+            ('ETag', f'"{etag}"'),
+            ('Cache-Control', 'public, max-age=3600'),
+            ('Vary', 'Cookie'),
+        ]
+
+        if etag in request.httprequest.if_none_match:
+            return request.make_response('', headers=headers, status=304)
+
+        return request.make_response(body, headers=headers + [('Content-Type', 'application/json')])
+
+    @http.route(['/shop/checkout/address'], type='http', auth='public', methods=['POST'], website=True, sitemap=False)
+    @tts_instrument
+    def checkout_address_submit(self, **post):
+        """
+        Process address form submission (Step 1)
+
+        POST data expected:
+        - billing_first_name, billing_last_name
+        - company_name, vat
+        - billing_street, billing_street2
+        - billing_zip, billing_city
+        - billing_country_id, billing_state_id
+        - phone
+        - shipping_same (checkbox: 1 if same as billing)
+        - shipping_* fields (if shipping_same != 1)
+
+        Returns: Redirect to /shop/checkout?step=shipping
+        """
+        checkout = self._tts_load_checkout()
+        if not checkout['order']:
+            return request.redirect('/shop/cart')
+
+        return request.redirect(self._tts_submit_address(checkout, post))
+
+    @http.route(['/shop/checkout/shipping'], type='http', auth='public', methods=['POST'], website=True, sitemap=False)
+    @tts_instrument
+    def checkout_shipping_submit(self, **post):
+        """
+        Process shipping method selection (Step 2)
+
+        POST data expected:
+        - carrier_id: ID of selected delivery carrier
+
+        Returns: Redirect to /shop/payment
+        """
+        checkout = self._tts_load_checkout()
+        if not checkout['order']:
+            return request.redirect('/shop/cart')
+
+        return request.redirect(self._tts_submit_shipping(checkout, post))
 
     @http.route(['/shop/payment'], type='http', auth='public', website=True, sitemap=False)
+    @tts_instrument
     def payment(self, **post):
         """
         Override /shop/payment to implement custom payment step with conditionals.
@@ -221,41 +533,20 @@ class TTSCheckout(WebsiteSale):
         This renders the same checkout template but with current_step='payment'
         which triggers the payment section in checkout_steps.xml
         """
-        order = request.website.sale_get_order()
+        checkout = self._tts_load_checkout()
 
-        # Redirect to cart if no order
-        if not order or not order.order_line or order.state != 'draft':
-            return request.redirect('/shop/cart')
+        # Redirect to cart if no order, or back to address/shipping if incomplete
+        redirect = self._tts_check_step(checkout, 'payment')
+        if redirect:
+            return redirect
 
-        # Check if previous steps completed
-        if not order.partner_id.street or not order.partner_id.city:
-            # Redirect back to address if incomplete
-            return request.redirect('/shop/checkout?step=address')
-
-        if not order.carrier_id:
-            # Redirect back to shipping if not selected
-            return request.redirect('/shop/checkout?step=shipping')
-
-        # Get payment methods
-        payment_methods = request.env['payment.method'].sudo().search([])
-
-        # Prepare values for payment step
-        values = {
-            'website_sale_order': order,
-            'order': order,
-            'partner': order.partner_id,
-            'partner_id': order.partner_id.id,
-            'payment_methods_sudo': payment_methods,
-            'current_step': 'payment',
-            'errors': {},
-            'error_message': [],
-            'only_services': order and order.only_services or False,
-        }
+        values = self._tts_step_values(checkout, 'payment')
 
         # Render checkout template (payment section will be shown via t-elif)
-        return request.render('website_sale.checkout', values)
+        return self._tts_render_step(checkout, 'payment', values)
 
     @http.route(['/shop/checkout/payment'], type='http', auth='public', methods=['POST'], website=True, sitemap=False)
+    @tts_instrument
     def checkout_payment_submit(self, **post):
         """
         Process payment method selection (Step 3)
@@ -265,22 +556,14 @@ class TTSCheckout(WebsiteSale):
 
         Returns: Redirect to /shop/checkout/notes
         """
-        order = request.website.sale_get_order()
-
-        if not order:
+        checkout = self._tts_load_checkout()
+        if not checkout['order']:
             return request.redirect('/shop/cart')
 
-        # Get selected payment method
-        payment_method_id = int(post.get('payment_method_id', 0))
-
-        if payment_method_id:
-            # Store payment method in session for later use
-            request.session['selected_payment_method_id'] = payment_method_id
-
-        # Redirect to notes step
-        return request.redirect('/shop/checkout/notes')
+        return request.redirect(self._tts_submit_payment(checkout, post))
 
     @http.route(['/shop/checkout/notes'], type='http', auth='public', website=True, sitemap=False)
+    @tts_instrument
     def checkout_notes(self, **post):
         """
         Display notes step (Step 4) - Final step before order confirmation
@@ -293,43 +576,22 @@ class TTSCheckout(WebsiteSale):
 
         Returns: Render checkout template with current_step='notes'
         """
-        order = request.website.sale_get_order()
+        checkout = self._tts_load_checkout()
 
-        # Redirect to cart if no order
-        if not order or not order.order_line or order.state != 'draft':
-            return request.redirect('/shop/cart')
+        # Redirect to cart if no order, or back to address/shipping if incomplete
+        redirect = self._tts_check_step(checkout, 'notes')
+        if redirect:
+            return redirect
 
-        # Check if previous steps completed
-        if not order.partner_id.street or not order.partner_id.city:
-            return request.redirect('/shop/checkout?step=address')
-
-        if not order.carrier_id:
-            return request.redirect('/shop/checkout?step=shipping')
-
-        # Get selected payment method from session
-        selected_payment_method_id = request.session.get('selected_payment_method_id')
-        selected_payment_method = None
-
-        if selected_payment_method_id:
-            selected_payment_method = request.env['payment.method'].sudo().browse(selected_payment_method_id)
-
-        # Prepare values for notes step
-        values = {
-            'website_sale_order': order,
-            'order': order,
-            'partner': order.partner_id,
-            'partner_id': order.partner_id.id,
-            'selected_payment_method': selected_payment_method,
-            'current_step': 'notes',
-            'errors': {},
-            'error_message': [],
-            'only_services': order and order.only_services or False,
-        }
+        values = self._tts_step_values(checkout, 'notes')
+        if post.get('error') in CHECKOUT_STEP_ERRORS:
+            values['error_message'] = [CHECKOUT_STEP_ERRORS[post['error']]]
 
         # Render checkout template (notes section will be shown via t-elif)
-        return request.render('website_sale.checkout', values)
+        return self._tts_render_step(checkout, 'notes', values)
 
     @http.route(['/shop/checkout/notes'], type='http', auth='public', methods=['POST'], website=True, sitemap=False)
+    @tts_instrument
     def checkout_notes_submit(self, **post):
         """
         Process notes form submission (Step 4 - Final step)
@@ -340,28 +602,123 @@ class TTSCheckout(WebsiteSale):
 
         Returns: Redirect to payment transaction or order confirmation
         """
-        order = request.website.sale_get_order()
-
-        if not order:
+        checkout = self._tts_load_checkout()
+        if not checkout['order']:
             return request.redirect('/shop/cart')
 
-        # Validate terms acceptance
-        if not post.get('terms_accepted') == '1':
-            # Redirect back with error (TODO: add error message)
-            return request.redirect('/shop/checkout/notes')
+        return request.redirect(self._tts_submit_notes(checkout, post))
 
-        # Save order note if provided
-        order_note = post.get('order_note', '').strip()
-        if order_note:
-            order.sudo().write({'note': order_note})
+    @http.route(['/shop/checkout/step'], type='json', auth='public', methods=['POST'], website=True, sitemap=False)
+    @tts_instrument
+    def checkout_step_json(self, step=None, data=None, **kw):
+        """
+        Submit one checkout step and get the next one, in a single round trip
 
-        # Get payment method from session
-        payment_method_id = request.session.get('selected_payment_method_id')
+        Same validation and persistence as the form POST routes, but instead
+        of POST -> 302 -> GET of the full checkout page, the response carries
+        the next step's content (checkout_step_content) and the refreshed
+        order summary. checkout_steps.js swaps them in and updates the URL.
 
-        if payment_method_id:
-            # Process payment transaction
-            # This should redirect to payment provider or confirm order
-            return request.redirect(f'/shop/payment/transaction?payment_method_id={payment_method_id}')
-        else:
-            # If no payment method, just confirm order
-            return request.redirect('/shop/confirm_order')
+        Params:
+        - step: 'address', 'shipping', 'payment' or 'notes' (submitted step)
+        - data: the step form's fields ({name: value}, as in the POST routes)
+
+        Returns: {"step", "url", "html", "summary"}
+                 or {"step", "error"} (step not saved, message to show)
+                 or {"redirect": url} (cart, payment step, confirmation)
+        """
+        submit = {
+            'address': self._tts_submit_address,
+            'shipping': self._tts_submit_shipping,
+            'payment': self._tts_submit_payment,
+            'notes': self._tts_submit_notes,
+        }.get(step)
+
+        checkout = self._tts_load_checkout()
+        order = checkout['order']
+        if not submit or not order or order.state != 'draft':
+            return {'redirect': '/shop/cart'}
+
+        url = submit(checkout, dict(data or {}))
+        error = parse_qs(urlsplit(url).query).get('error')
+        if error and error[0] in CHECKOUT_STEP_ERRORS:
+            return {'step': step, 'error': CHECKOUT_STEP_ERRORS[error[0]]}
+
+        next_step = CHECKOUT_URL_STEPS.get(url)
+        if not next_step or next_step in CHECKOUT_FULL_PAGE_STEPS:
+            return {'redirect': url}
+
+        # Same order record, refreshed partners/carrier/completed steps
+        self._tts_refresh_checkout(checkout)
+        redirect_url = self._tts_step_redirect_url(checkout, next_step)
+        if redirect_url:
+            return {'redirect': redirect_url}
+
+        View = request.env['ir.ui.view']
+        values = dict(View._prepare_qcontext(), **self._tts_step_values(checkout, next_step))
+        result = {
+            'step': next_step,
+            'url': CHECKOUT_STEP_URLS[next_step],
+            'html': View._render_template('custom_shop_templates.checkout_step_content', values),
+            'summary': View._render_template('custom_shop_templates.checkout_order_summary_tts', values),
+        }
+        _logger.debug(
+            "TTS checkout step '%s' submitted, '%s' prepared in %.2f ms",
+            step, next_step, (time.perf_counter() - checkout['started_at']) * 1000,
+        )
+        return result
+
+    # =======================================================================
+    # CART (batched quantity changes)
+    # =======================================================================
+
+    @http.route(['/shop/cart/update_batch'], type='json', auth='public', methods=['POST'], website=True, sitemap=False)
+    @tts_instrument
+    def cart_update_batch(self, lines=None, **kw):
+        """
+        Apply several cart line quantity changes in one call (cart page)
+
+        The +/-/delete buttons and quantity inputs of checkout_cart are
+        collected client-side and sent together, instead of one
+        cart_update_json round trip (and full cart re-render) per click.
+        The lines are updated in one pass (sale.order._tts_cart_set_quantities),
+        totals are computed once, and only the changed line rows and the
+        summary are rendered.
+
+        Params:
+        - lines: [{"line_id": int, "quantity": number}] (0 removes the line)
+
+        Returns: {
+            "lines": {line_id: html},   changed rows (checkout_cart_line)
+            "removed": [line_id],       rows to remove
+            "summary": html,            checkout_cart_summary_tts
+            "cart_quantity": number,
+            "empty": bool,              reload to show the empty cart
+        }
+        """
+        order = request.website.sale_get_order()
+        if not order or order.state != 'draft':
+            return {'lines': {}, 'removed': [], 'summary': '', 'cart_quantity': 0, 'empty': True}
+
+        quantities = {}
+        for change in lines or []:
+            try:
+                quantities[int(change['line_id'])] = max(float(change['quantity']), 0)
+            except (KeyError, TypeError, ValueError):
+                continue
+        changed, removed = order._tts_cart_set_quantities(quantities)
+
+        request.session['website_sale_cart_quantity'] = order.cart_quantity
+
+        View = request.env['ir.ui.view']
+        values = {'website_sale_order': order, 'website': request.website}
+        return {
+            'lines': {
+                line.id: View._render_template('custom_shop_templates.checkout_cart_line', dict(values, line=line))
+                for line in changed
+            },
+            'removed': removed,
+            'summary': View._render_template('custom_shop_templates.checkout_cart_summary_tts', values),
+            'cart_quantity': order.cart_quantity,
+            'empty': not order.website_order_line,
+        }
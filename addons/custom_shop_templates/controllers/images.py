@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+from odoo import http
+from odoo.http import request, Stream, STATIC_CACHE_LONG
+
+# Directory of the files listed in the image manifest (website._tts_image_manifest)
+IMAGE_DIST_DIR = 'custom_shop_templates/static/dist/img/'
+
+
+class TTSImages(http.Controller):
+
+    @http.route(['/tts/img/<path:filename>'], type='http', auth='public', methods=['GET'],
+                save_session=False, readonly=True)
+    def tts_image(self, filename, **kw):
+        """
+        Content-hashed image built by scripts/build_images.py
+
+        The file name changes with its content, so the response can be
+        cached for a year and marked immutable: browsers don't even
+        revalidate it on reload. Only files listed in the manifest are
+        served.
+        """
+        manifest = request.env['website']._tts_image_manifest()
+        if not any(self._tts_manifest_has(entry, filename) for entry in manifest.values()):
+            raise request.not_found()
+        return Stream.from_path(IMAGE_DIST_DIR + filename, public=True).get_response(
+            max_age=STATIC_CACHE_LONG,
+            immutable=True,
+            content_security_policy=None,
+        )
+
+    @staticmethod
+    def _tts_manifest_has(entry, filename):
+        return entry['src'] == filename or any(
+            name == filename for variants in entry['variants'].values() for name, _width in variants
+        )
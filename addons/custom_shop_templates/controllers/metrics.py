@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Per-route performance metrics for the TTS shop, checkout and portal controllers.
+
+Routes decorated with @tts_instrument (below @http.route) record, per call:
+- wall time (including the QWeb render of lazy responses)
+- SQL query count and SQL time
+- QWeb render time
+- response size
+
+into per-worker histograms, exposed in Prometheus text format on
+/tts/metrics. Each worker process keeps its own numbers; series carry a
+`pid` label so they can be summed across workers.
+
+/tts/metrics is off until a scrape token is set (ir.config_parameter
+custom_shop_templates.metrics_token); scrapers send it as
+`Authorization: Bearer <token>`.
+
+Counters (tts_count) are exposed the same way, e.g. the prefetch micro-cache
+outcomes of models/ir_http.py.
+
+Optional cProfile sampling (ir.config_parameter):
+- custom_shop_templates.profile_sample_rate: share of requests profiled (0-1)
+- custom_shop_templates.profile_slow_ms: only keep profiles of requests slower
+  than this; dumps go to <data_dir>/tts_profiles/<db>/
+"""
+
+import cProfile
+import functools
+import hmac
+import logging
+import os
+import random
+import threading
+import time
+
+from odoo import http
+from odoo.http import request
+from odoo.tools import config
+
+_logger = logging.getLogger(__name__)
+
+PROFILE_SAMPLE_PARAM = 'custom_shop_templates.profile_sample_rate'
+PROFILE_SLOW_PARAM = 'custom_shop_templates.profile_slow_ms'
+METRICS_TOKEN_PARAM = 'custom_shop_templates.metrics_token'
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name: (help, buckets)
+METRICS = {
+    'tts_route_duration_seconds': ('Wall time of TTS routes, QWeb render included', SECONDS_BUCKETS),
+    'tts_route_sql_queries': ('SQL queries per request of TTS routes', QUERY_BUCKETS),
+    'tts_route_sql_seconds': ('SQL time per request of TTS routes', SECONDS_BUCKETS),
+    'tts_route_render_seconds': ('QWeb render time of TTS routes', SECONDS_BUCKETS),
+    'tts_route_response_bytes': ('Response size of TTS routes', BYTES_BUCKETS),
+}
+
+# name: (help, label)
+COUNTERS = {
+    'tts_prefetch_total': ('Prefetch micro-cache events, by outcome (stored, hit, expired, rejected)', 'outcome'),
+}
+
+# {(metric, route): [cumulative bucket counts..., sum, count]}
+_histograms = {}
+# {(counter, label value): count}
+_counters = {}
+_lock = threading.Lock()
+
+
+def _observe(metric, route, value):
+    buckets = METRICS[metric][1]
+    with _lock:
+        series = _histograms.get((metric, route))
+        if series is None:
+            series = _histograms[(metric, route)] = [0] * len(buckets) + [0.0, 0]
+        for position, bound in enumerate(buckets):
+            if value <= bound:
+                series[position] += 1
+        series[-2] += value
+        series[-1] += 1
+
+
+def tts_count(counter, label_value, amount=1):
+    """Increment a counter of COUNTERS for one label value."""
+    with _lock:
+        _counters[(counter, label_value)] = _counters.get((counter, label_value), 0) + amount
+
+
+def _prometheus_text():
+    """All histograms and counters of this worker, in Prometheus text exposition format."""
+    pid = os.getpid()
+    with _lock:
+        snapshot = {key: list(series) for key, series in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    for metric, (help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} histogram')
+        for (name, route), series in sorted(snapshot.items()):
+            if name != metric:
+                continue
+            labels = f'route="{route}",pid="{pid}"'
+            for bound, count in zip(buckets, series):
+                lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {series[-1]}')
+            lines.append(f'{metric}_sum{{{labels}}} {series[-2]}')
+            lines.append(f'{metric}_count{{{labels}}} {series[-1]}')
+    for counter, (help_text, label) in COUNTERS.items():
+        lines.append(f'# HELP {counter} {help_text}')
+        lines.append(f'# TYPE {counter} counter')
+        for (name, value), count in sorted(counters.items()):
+            if name == counter:
+                lines.append(f'{counter}{{{label}="{value}",pid="{pid}"}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def _start_profiler():
+    """cProfile profiler for this request if it is sampled, else None."""
+    ICP = request.env['ir.config_parameter'].sudo()
+    try:
+        rate = float(ICP.get_param(PROFILE_SAMPLE_PARAM) or 0)
+    except ValueError:
+        return None
+    if not rate or random.random() >= rate:
+        return None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _dump_profile(profiler, route, wall_time):
+    """Keep the profile of a sampled request if it was slow enough."""
+    profiler.disable()
+    try:
+        slow_ms = float(request.env['ir.config_parameter'].sudo().get_param(PROFILE_SLOW_PARAM) or 0)
+    except ValueError:
+        slow_ms = 0
+    if wall_time * 1000 < slow_ms:
+        return
+
+    directory = os.path.join(config['data_dir'], 'tts_profiles', request.db or 'nodb')
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{route}-{time.strftime("%Y%m%d-%H%M%S")}-{int(wall_time * 1000)}ms.prof')
+    profiler.dump_stats(path)
+    _logger.info("TTS: profile of %s (%.0f ms) written to %s", route, wall_time * 1000, path)
+
+
+def tts_instrument(endpoint):
+    """
+    Record the metrics of a route (see module docstring).
+
+    Put it below @http.route so Odoo routes to the instrumented function.
+    Lazy QWeb responses are measured when Odoo renders them, so overrides
+    can still change response.qcontext after calling super().
+    """
+    route = endpoint.__qualname__
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        thread = threading.current_thread()
+        query_count = getattr(thread, 'query_count', 0)
+        query_time = getattr(thread, 'query_time', 0.0)
+        profiler = _start_profiler()
+        started_at = time.perf_counter()
+
+        def record(render_time=None, size=None):
+            wall_time = time.perf_counter() - started_at
+            _observe('tts_route_duration_seconds', route, wall_time)
+            _observe('tts_route_sql_queries', route, getattr(thread, 'query_count', 0) - query_count)
+            _observe('tts_route_sql_seconds', route, getattr(thread, 'query_time', 0.0) - query_time)
+            if render_time is not None:
+                _observe('tts_route_render_seconds', route, render_time)
+            if size is not None:
+                _observe('tts_route_response_bytes', route, size)
+            if profiler:
+                _dump_profile(profiler, route, wall_time)
+
+        response = endpoint(*args, **kwargs)
+
+        if getattr(response, 'is_qweb', False):
+            render = response.render
+
+            def timed_render():
+                render_started_at = time.perf_counter()
+                html = render()
+                record(time.perf_counter() - render_started_at, len(html.encode()))
+                return html
+
+            response.render = timed_render
+        else:
+            length = getattr(response, 'calculate_content_length', None)
+            record(size=length() if length else None)
+
+        return response
+
+    return wrapper
+
+
+class TTSMetrics(http.Controller):
+
+    def _tts_metrics_authorized(self):
+        """
+        Whether the request carries the scrape token (METRICS_TOKEN_PARAM).
+
+        The client address is not trusted: behind a reverse proxy on the same
+        host every request comes from 127.0.0.1. Without a configured token
+        (or without a database to read it from) nobody is authorized.
+        """
+        if not request.db:
+            return False
+        token = request.env['ir.config_parameter'].sudo().get_param(METRICS_TOKEN_PARAM)
+        if not token:
+            return False
+        scheme, _sep, credentials = request.httprequest.headers.get('Authorization', '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(credentials.strip().encode(), token.encode())
+
+    @http.route(['/tts/metrics'], type='http', auth='none', methods=['GET'], save_session=False)
+    def tts_metrics(self, **kw):
+        """
+        Route metrics and counters of this worker, Prometheus text format
+
+        Opt-in: answers only requests with `Authorization: Bearer <token>`,
+        the token being the custom_shop_templates.metrics_token system
+        parameter. Anything else gets a 404.
+        """
+        if not self._tts_metrics_authorized():
+            raise request.not_found()
+        return request.make_response(_prometheus_text(), headers=[
+            ('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'),
+            ('Cache-Control', 'no-store'),
+        ])
@@ -3,6 +3,9 @@
 from odoo import http
 from odoo.http import request
 from odoo.addons.portal.controllers.portal import CustomerPortal
+from odoo.addons.sale.controllers.portal import CustomerPortal as SaleCustomerPortal
+
+from .metrics import tts_instrument
 
 
 class TTSPortal(CustomerPortal):
@@ -13,25 +16,23 @@ class TTSPortal(CustomerPortal):
     """
 
     @http.route(['/my/addresses', '/my/addresses/edit'], type='http', auth='user', website=True)
+    @tts_instrument
     def portal_my_addresses(self, **kw):
         """
         Addresses page - Shows billing and shipping addresses OR edit form
         Routes: /my/addresses (list view) OR /my/addresses/edit (form view)
         Template: custom_shop_templates.portal_my_addresses (contains both views)
 
-        Uses Odoo's standard address_get() method which performs DFS search
-        through descendants and ancestors to find invoice/delivery addresses.
+        Default invoice/delivery addresses come from address_get(), memoized
+        per partner by res.partner._get_tts_default_addresses().
         """
         partner = request.env.user.partner_id
 
-        # Use Odoo's standard address_get() method (same as sale_order)
-        # Returns dict: {'invoice': id, 'delivery': id}
-        # Automatically falls back to 'contact' type or partner itself
-        addr_ids = partner.address_get(['invoice', 'delivery'])
-
-        # Browse to get recordsets
-        billing_address = request.env['res.partner'].browse(addr_ids['invoice'])
-        shipping_address = request.env['res.partner'].browse(addr_ids['delivery'])
+        # {'invoice': partner, 'delivery': partner}, same resolution as
+        # address_get() (falls back to 'contact' type or the partner itself)
+        addresses = partner._get_tts_default_addresses()
+        billing_address = addresses['invoice']
+        shipping_address = addresses['delivery']
 
         # Only show address if it has actual address data
         if not (billing_address.street or billing_address.city or billing_address.zip):
@@ -40,9 +41,12 @@ class TTSPortal(CustomerPortal):
         if not (shipping_address.street or shipping_address.city or shipping_address.zip):
             shipping_address = False
 
-        # Get countries and states for form dropdowns
-        countries = request.env['res.country'].sudo().search([])
-        states = request.env['res.country.state'].sudo().search([])
+        # Get countries and states for form dropdowns (cached per language)
+        # Only the selected country's states are rendered (Germany by default);
+        # addresses.js fetches the others from /shop/states/<country_id>
+        countries = request.env['res.country']._get_tts_country_options()
+        country = partner.country_id or request.env.ref('base.de', raise_if_not_found=False)
+        states = request.env['res.country.state']._get_tts_state_options(country.id) if country else ()
 
         # Determine which view to show based on URL path
         show_form = request.httprequest.path == '/my/addresses/edit'
@@ -61,6 +65,7 @@ class TTSPortal(CustomerPortal):
         return request.render('custom_shop_templates.portal_my_addresses', values)
 
     @http.route(['/my/addresses/edit'], type='http', auth='user', website=True)
+    @tts_instrument
     def portal_my_addresses_edit(self, **kw):
         """
         Addresses edit page - Form to edit billing address
@@ -69,9 +74,10 @@ class TTSPortal(CustomerPortal):
         """
         partner = request.env.user.partner_id
 
-        # Get countries and states for dropdowns
-        countries = request.env['res.country'].sudo().search([])
-        states = request.env['res.country.state'].sudo().search([])
+        # Get countries and states for dropdowns (cached per language)
+        countries = request.env['res.country']._get_tts_country_options()
+        country = partner.country_id or request.env.ref('base.de', raise_if_not_found=False)
+        states = request.env['res.country.state']._get_tts_state_options(country.id) if country else ()
 
         values = {
             'partner': partner,
@@ -83,6 +89,7 @@ class TTSPortal(CustomerPortal):
         return request.render('custom_shop_templates.portal_my_addresses_edit', values)
 
     @http.route(['/my/addresses/save'], type='http', auth='user', methods=['POST'], website=True, csrf=True)
+    @tts_instrument
     def portal_addresses_save(self, **post):
         """
         Save addresses form
@@ -95,8 +102,8 @@ class TTSPortal(CustomerPortal):
         last_name = post.get('last_name', '').strip()
         name = f"{first_name} {last_name}".strip()
 
-        # Update partner address and name
-        partner.sudo().write({
+        # Update partner address and name (only the fields that changed)
+        partner.sudo()._tts_write_changed({
             'name': name,
             'street': post.get('street'),
             'street2': post.get('street2'),
@@ -110,6 +117,7 @@ class TTSPortal(CustomerPortal):
         return request.redirect('/my/addresses?success=1')
 
     @http.route(['/my/payment_method'], type='http', auth='user', website=True)
+    @tts_instrument
     def portal_my_payment_method(self, **kw):
         """
         Payment Method page - Shows saved payment method preference
@@ -127,6 +135,7 @@ class TTSPortal(CustomerPortal):
         return request.render('custom_shop_templates.portal_my_payment_methods', values)
 
     @http.route(['/my/payment_method/save_preference'], type='json', auth='user', methods=['POST'], website=True)
+    @tts_instrument
     def save_payment_preference(self, payment_method_code=None):
         """
         Save user's preferred payment method
@@ -146,6 +155,7 @@ class TTSPortal(CustomerPortal):
         return {'success': False, 'error': 'No payment method code provided'}
 
     @http.route(['/my/account'], type='http', auth='user', website=True)
+    @tts_instrument
     def account(self, redirect=None, **kw):
         """
         Account Details main page - Shows account info card (read-only)
@@ -171,6 +181,7 @@ class TTSPortal(CustomerPortal):
         return request.render('custom_shop_templates.portal_my_account_details', values)
 
     @http.route(['/my/account/edit'], type='http', auth='user', website=True)
+    @tts_instrument
     def portal_my_account_details_edit(self, **kw):
         """
         Account Details edit page - Form to edit account information
@@ -191,6 +202,7 @@ class TTSPortal(CustomerPortal):
         return request.render('custom_shop_templates.portal_my_account_details_edit', values)
 
     @http.route(['/my/account/save'], type='http', auth='user', methods=['POST'], website=True, csrf=True)
+    @tts_instrument
     def portal_account_details_save(self, **post):
         """
         Save account details form
@@ -256,3 +268,26 @@ class TTSPortal(CustomerPortal):
 
         # Redirect back to account details page with success flag
         return request.redirect('/my/account?success=1')
+
+
+class TTSSalePortal(SaleCustomerPortal):
+    """
+    Custom sale portal controller for TTS Website
+    Adds the data needed by custom_shop_templates.tts_portal_orders (/my/orders)
+    """
+
+    def _prepare_sale_portal_rendering_values(self, quotation_page=False, **kwargs):
+        """
+        Preload the product preview of every order on the page.
+
+        The orders list shows the first 2 lines of each order and a
+        "+ N more" link. Loading them here for the whole page keeps the
+        query count constant instead of growing with the number of orders.
+        """
+        values = super()._prepare_sale_portal_rendering_values(quotation_page=quotation_page, **kwargs)
+
+        orders = values.get('orders')
+        if orders:
+            values['tts_order_previews'] = orders._get_tts_portal_line_preview(limit=2)
+
+        return values
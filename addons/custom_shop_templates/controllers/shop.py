@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import json
+import threading
+import time
+
+from odoo import http
+from odoo.http import request
+from odoo.addons.website_sale.controllers.main import WebsiteSale
+
+from .metrics import tts_instrument
+
+# Anonymous full-page cache (opt-in, see website._tts_page_cache_enabled)
+PAGE_CACHE_TTL = 300  # seconds
+PAGE_CACHE_CSRF_HOLE = '__tts_csrf_token__'
+PAGE_CACHE_MAX_ENTRIES = 1000  # pages per worker
+PAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # page bodies per worker
+# Query parameters that change /shop and product pages. Others (utm_*,
+# fbclid, cache busters, ...) are left out of the key, so they don't add
+# entries
+PAGE_CACHE_QUERY_PARAMS = (
+    'category', 'search', 'order', 'page', 'attrib', 'in_stock',
+    'after', 'start', 'ppg', 'min_price', 'max_price', 'tags',
+)
+# Response headers not replayed on hits
+PAGE_CACHE_SKIPPED_HEADERS = {'set-cookie', 'content-length', 'x-tts-page-cache'}
+
+# Keyset pagination (opt-in, see website._tts_keyset_pagination_enabled):
+# products fetched past the page, to know whether there is a next page and
+# to fill the "More from" strip below the grid
+KEYSET_LOOKAHEAD = 4
+
+# Keyset page of a /shop request: anchor product id (0 = first page), number
+# of products before the page (for "Showing X to Y") and products to fetch
+Keyset = collections.namedtuple('Keyset', ['after', 'start', 'limit'])
+
+
+def _to_int(value):
+    """Non-negative int of a query parameter, 0 if invalid."""
+    try:
+        return max(int(value or 0), 0)
+    except ValueError:
+        return 0
+
+
+class PageCache:
+    """
+    LRU of rendered pages, per worker, bounded by entry count and bytes.
+
+    Kept apart from the registry's ormcache so pages never evict ACL, rule
+    or view caches, and expired or stale pages are dropped on access.
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._pages = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None:
+                return None
+            if page['expires'] < time.time():
+                self._discard(key)
+                return None
+            self._pages.move_to_end(key)
+            return page
+
+    def set(self, key, page):
+        if page['size'] > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._pages[key] = page
+            self.size += page['size']
+            while len(self._pages) > self.max_entries or self.size > self.max_bytes:
+                self._discard(next(iter(self._pages)))
+
+    def _discard(self, key):
+        page = self._pages.pop(key, None)
+        if page is not None:
+            self.size -= page['size']
+
+
+_page_cache = PageCache(PAGE_CACHE_MAX_ENTRIES, PAGE_CACHE_MAX_BYTES)
+
+
+class TTSShop(WebsiteSale):
+    """
+    Custom shop controller for TTS Website
+    Extends WebsiteSale /shop listing with data the TTS templates need,
+    computed once per page instead of per product inside QWeb.
+
+    Also serves /shop and product pages from a full-page cache to anonymous
+    visitors when enabled (ir.config_parameter custom_shop_templates.page_cache = 1).
+    """
+
+    # =======================================================================
+    # ANONYMOUS FULL-PAGE CACHE
+    # =======================================================================
+
+    def _tts_page_cache_key(self):
+        """
+        Cache key of the current page, or None if it must not be cached.
+
+        Only anonymous GET requests without a cart are cached: everything
+        else on these pages is the same for every public visitor.
+        Key: path, the PAGE_CACHE_QUERY_PARAMS of the query string, website,
+        language, pricelist, fiscal position and the versions of the shown
+        data (tts.cache.version), so product, category, price and stock
+        changes are picked up by every worker.
+        """
+        website = request.website
+        if (
+            request.httprequest.method != 'GET'
+            or not request.env.user._is_public()
+            or request.session.get('sale_order_id')
+            or request.session.debug
+            or not website._tts_page_cache_enabled()
+        ):
+            return None
+        Version = request.env['tts.cache.version']
+        args = request.httprequest.args
+        return (
+            request.db,
+            request.httprequest.path,
+            tuple((name, tuple(args.getlist(name))) for name in PAGE_CACHE_QUERY_PARAMS if name in args),
+            website.id,
+            request.lang.code,
+            website.pricelist_id.id,
+            website.fiscal_position_id.id,
+            tuple(Version._tts_get(topic) for topic in ('catalog', 'stock', 'display')),
+        )
+
+    def _tts_get_cached_page(self):
+        """
+        Cached response for the current page, or None on a miss.
+
+        The CSRF token is the only per-visitor part of the page: it is
+        stored as a placeholder and filled in for each request. The other
+        response headers are replayed as they were stored.
+        """
+        key = self._tts_page_cache_key()
+        if not key:
+            return None
+
+        page = _page_cache.get(key)
+        if not page:
+            return None
+
+        body = page['body'].replace(PAGE_CACHE_CSRF_HOLE, request.csrf_token())
+        return request.make_response(body, headers=page['headers'] + [('X-TTS-Page-Cache', 'hit')])
+
+    def _tts_store_page(self, response):
+        """Store a freshly rendered page in the cache (if cacheable) and return it."""
+        key = self._tts_page_cache_key()
+        if not key or getattr(response, 'qcontext', None) is None:
+            return response
+
+        response.flatten()
+        if response.status_code != 200:
+            return response
+
+        body = response.get_data(as_text=True).replace(request.csrf_token(), PAGE_CACHE_CSRF_HOLE)
+        _page_cache.set(key, {
+            'body': body,
+            'headers': [
+                (name, value) for name, value in response.headers.items()
+                if name.lower() not in PAGE_CACHE_SKIPPED_HEADERS
+            ],
+            'size': len(body.encode()),
+            'expires': time.time() + PAGE_CACHE_TTL,
+        })
+        response.headers['X-TTS-Page-Cache'] = 'miss'
+        return response
+
+    # =======================================================================
+    # "IN STOCK ONLY" FILTER
+    # =======================================================================
+
+    def _tts_in_stock_only(self, post):
+        """On unless the shopper turned it off (?in_stock=0)."""
+        return post.get('in_stock') != '0'
+
+    def _get_search_options(self, *args, **post):
+        options = super()._get_search_options(*args, **post)
+        options['tts_in_stock'] = self._tts_in_stock_only(post)
+        # Keyset page and search limit from shop() (never from the query string)
+        keyset = post.get('tts_keyset')
+        options['tts_keyset'] = keyset if isinstance(keyset, Keyset) else None
+        search_limit = post.get('tts_search_limit')
+        options['tts_search_limit'] = search_limit if isinstance(search_limit, int) else None
+        return options
+
+    def _shop_get_query_url_kwargs(self, *args, **post):
+        # Keep the filter in pager, category and sort links
+        kwargs = super()._shop_get_query_url_kwargs(*args, **post)
+        if post.get('in_stock'):
+            kwargs['in_stock'] = post['in_stock']
+        return kwargs
+
+    # =======================================================================
+    # KEYSET PAGINATION
+    # =======================================================================
+
+    def _tts_keyset(self, page, search, ppg, post):
+        """
+        Keyset paging parameters for this /shop request, or None for the
+        regular OFFSET pager.
+
+        URLs are /shop?after=<id of the last product of the previous page>
+        &start=<products before the page>: stable for crawlers, and each page
+        is one indexed range scan. Searches (ranked by relevance), old
+        /shop/page/N URLs and sort orders that can't be paged by keyset keep
+        using the OFFSET pager.
+
+        :return: Keyset, or None
+        """
+        if search or page > 1 or not request.website._tts_keyset_pagination_enabled():
+            return None
+        if not request.env['product.template']._tts_keyset_order(self._get_search_order(post)):
+            return None
+
+        after = _to_int(post.get('after'))
+        ppg = _to_int(ppg) or request.website.shop_ppg or 20
+        return Keyset(after, _to_int(post.get('start')) if after else 0, ppg + KEYSET_LOOKAHEAD)
+
+    def _tts_search_limit(self, page, search, ppg):
+        """
+        Search results to fetch for this /shop request: up to the end of the
+        requested page, plus the "More from" strip, or None without a search.
+
+        website_sale slices the page out of the results
+        (search_product[offset:offset + ppg]), so they start at the first
+        one; the total is counted separately (see _search_fetch).
+        """
+        if not search:
+            return None
+        ppg = _to_int(ppg) or request.website.shop_ppg or 20
+        return max(_to_int(page), 1) * ppg + KEYSET_LOOKAHEAD
+
+    # =======================================================================
+    # ROUTES
+    # =======================================================================
+
+    @http.route()
+    @tts_instrument
+    def shop(self, page=0, category=None, search='', min_price=0.0, max_price=0.0, ppg=False, **post):
+        """
+        Override /shop to pre-compute the related products shown below the
+        grid and the category counts for the filter pills.
+
+        Stock badges and the "In stock only" filter (?in_stock=0 to show
+        out-of-stock products too) use the stored product.template
+        tts_stock_bucket, so nothing stock-related is computed here.
+
+        With keyset pagination enabled, pages are /shop?after=<id> and are
+        fetched by product_template._tts_keyset_fetch (see _tts_keyset).
+        """
+        cached = self._tts_get_cached_page()
+        if cached:
+            return cached
+
+        # Rank Name/SKU search results by relevance unless a sort was chosen
+        if search and not post.get('order'):
+            request.update_context(tts_search_rank=True)
+
+        keyset = self._tts_keyset(page, search, ppg, post)
+        search_limit = self._tts_search_limit(page, search, ppg)
+
+        response = super().shop(
+            page=page, category=category, search=search, min_price=min_price, max_price=max_price, ppg=ppg,
+            **dict(post, tts_keyset=keyset, tts_search_limit=search_limit)
+        )
+
+        # Redirects and other non-QWeb responses have no qcontext
+        qcontext = getattr(response, 'qcontext', None)
+        if qcontext is None:
+            return response
+
+        products = qcontext.get('products') or request.env['product.template']
+
+        # "More from <category>": first search results that are not on this page
+        # (shop_related_products used to build this with O(n²) QWeb loops)
+        search_product = qcontext.get('search_product')
+        related_products = (search_product - products)[:4] if search_product else products.browse()
+        qcontext['tts_related_products'] = related_products
+
+        # Card prices of the whole page in one lookup (tts.product.display.price)
+        qcontext['tts_display_prices'] = (products | related_products)._tts_get_display_prices()
+
+        # Published product count per category, for the filter pills (cached),
+        # counting what the "In stock only" filter lets through
+        in_stock = self._tts_in_stock_only(post)
+        qcontext['tts_category_counts'] = request.env['product.public.category']._get_tts_product_counts(
+            request.website.id, in_stock=in_stock,
+        )
+        qcontext['tts_in_stock'] = in_stock
+
+        # "Showing X to Y (of Z)" and the next page link
+        if keyset:
+            offset = keyset.start
+            if products and search_product and len(search_product) > len(products):
+                qcontext['tts_next_url'] = qcontext['keep'](
+                    '/shop', after=products[-1].id, start=offset + len(products),
+                )
+        else:
+            offset = qcontext['pager']['offset'] if qcontext.get('pager') else 0
+        qcontext['tts_results_range'] = (
+            offset + 1 if products else 0,
+            offset + len(products),
+            qcontext.get('search_count', len(products)),
+        )
+
+        return self._tts_store_page(response)
+
+    @http.route()
+    @tts_instrument
+    def product(self, product, category='', search='', **kwargs):
+        """
+        Override product detail page to serve it from the anonymous page cache,
+        with the display prices of the product and its related products.
+        """
+        cached = self._tts_get_cached_page()
+        if cached:
+            return cached
+
+        response = super().product(product, category=category, search=search, **kwargs)
+
+        # Prices of the product and its related product cards in one lookup
+        qcontext = getattr(response, 'qcontext', None)
+        if qcontext is not None:
+            qcontext['tts_display_prices'] = (product | product._get_tts_related_products(limit=4))._tts_get_display_prices()
+
+        return self._tts_store_page(response)
+
+    @http.route(['/shop/suggest'], type='http', auth='public', methods=['GET'], website=True, sitemap=False)
+    def shop_suggest(self, q='', **kw):
+        """
+        Search-as-you-type suggestions for the shop search box (JSON)
+
+        Answered from a per-worker prefix index (product.template._tts_suggest),
+        so no ORM search runs per keystroke. Suggestions depend on the
+        website (host) and the language (URL prefix, frontend_lang cookie or
+        Accept-Language), which shared caches must key on.
+
+        Response: {"products": [{"name", "sku", "url"}], "categories": [{"name", "url"}]}
+        """
+        suggestions = request.env['product.template']._tts_suggest(q)
+        return request.make_response(json.dumps(suggestions), headers=[
+            ('Content-Type', 'application/json'),
+            ('Cache-Control', 'public, max-age=60'),
+            ('Vary', 'Host, Cookie, Accept-Language'),
+        ])
@@ -1,2 +1,16 @@
 # -*- coding: utf-8 -*-
+from . import tts_cache_version
 from . import res_partner
+from . import product_template
+from . import res_country
+from . import sale_order
+from . import delivery_carrier
+from . import payment_method
+from . import website
+from . import product_display_price
+from . import product_product
+from . import product_pricelist_item
+from . import product_public_category
+from . import stock_quant
+from . import account_tax
+from . import ir_http
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from odoo import api, models
+
+from .product_display_price import TTS_DISPLAY_PRICE_TAX_FIELDS
+
+
+class AccountTax(models.Model):
+    _inherit = 'account.tax'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if TTS_DISPLAY_PRICE_TAX_FIELDS.intersection(vals):
+            # Products with this tax, and fiscal positions mapping to it
+            templates = self.env['product.template'].sudo().with_context(active_test=False).search([
+                ('taxes_id', 'in', self.ids),
+            ])
+            mappings = self.env['account.fiscal.position.tax'].sudo().search([('tax_dest_id', 'in', self.ids)])
+            self.env['tts.product.display.price']._tts_schedule_refresh(
+                templates=templates, fiscal_positions=mappings.position_id,
+            )
+        return res
+
+
+class AccountFiscalPositionTax(models.Model):
+    _inherit = 'account.fiscal.position.tax'
+
+    # Tax mappings change the stored display prices of their fiscal position
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['tts.product.display.price']._tts_schedule_refresh(fiscal_positions=records.position_id)
+        return records
+
+    def write(self, vals):
+        positions = self.position_id
+        res = super().write(vals)
+        self.env['tts.product.display.price']._tts_schedule_refresh(fiscal_positions=positions | self.position_id)
+        return res
+
+    def unlink(self):
+        self.env['tts.product.display.price']._tts_schedule_refresh(fiscal_positions=self.position_id)
+        return super().unlink()
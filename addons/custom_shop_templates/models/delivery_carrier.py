@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from odoo import api, models, tools
+
+# Fields the available carriers are selected on
+TTS_CARRIER_FIELDS = {'active', 'is_published', 'website_id', 'company_id', 'country_ids'}
+
+
+class DeliveryCarrier(models.Model):
+    _inherit = 'delivery.carrier'
+
+    @api.model
+    def _get_tts_available_carriers(self, order):
+        """
+        Carriers that apply to an order's website, company and shipping country.
+
+        Used by the checkout shipping step instead of an unfiltered search.
+        The matching ids are memoized per (website, country, company) and
+        carrier version, bumped when a carrier is created, deleted, or
+        written on one of TTS_CARRIER_FIELDS.
+
+        :return: delivery.carrier recordset (sudo)
+        """
+        website_id = order.website_id.id or self.env['website'].get_current_website().id
+        carrier_ids = self._tts_available_carrier_ids(
+            website_id, order.partner_shipping_id.country_id.id, order.company_id.id,
+            self.env['tts.cache.version']._tts_get('carrier'),
+        )
+        return self.sudo().browse(carrier_ids)
+
+    @tools.ormcache('website_id', 'country_id', 'company_id', 'version')
+    def _tts_available_carrier_ids(self, website_id, country_id, company_id, version):
+        domain = [
+            ('is_published', '=', True),
+            ('website_id', 'in', [False, website_id]),
+            ('company_id', 'in', [False, company_id]),
+        ]
+        if country_id:
+            domain += ['|', ('country_ids', '=', False), ('country_ids', 'in', [country_id])]
+        return tuple(self.sudo().search(domain).ids)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['tts.cache.version']._tts_bump('carrier')
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if self and TTS_CARRIER_FIELDS.intersection(vals):
+            self.env['tts.cache.version']._tts_bump('carrier')
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['tts.cache.version']._tts_bump('carrier')
+        return res
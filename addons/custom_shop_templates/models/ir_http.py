@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Prefetch micro-cache.
+
+Links to shop and account pages are prefetched (Speculation Rules, or
+<link rel=prefetch> from prefetch.js). When the browser doesn't reuse the
+prefetched response, the real click used to render the page a second time.
+Prefetch requests (Sec-Purpose / Purpose headers) are now rendered once and
+kept for a few seconds, per session; the next real navigation to the same
+URL is answered from there.
+
+Only the GET pages of PREFETCH_ROUTES can be prefetched (matched without
+the language prefix, /de/shop is /shop); prefetch requests for anything
+else (cart, checkout steps, logout, ...) are rejected before the controller
+runs.
+
+Entries live in each worker's memory, like the route metrics; outcomes are
+counted in /tts/metrics (tts_prefetch_total). Their key includes a
+generation counter stored in the session, which the session's requests to
+PREFETCH_INVALIDATING_ROUTES increment: a prefetched page never hides a
+change made in between, whichever worker holds it. Other requests (JSON
+lookups, tracking, HEAD/OPTIONS) leave the prefetched pages alone.
+"""
+
+import collections
+import json
+import re
+import threading
+import time
+
+from markupsafe import Markup
+
+from odoo import api, models
+from odoo.http import request
+
+from odoo.addons.custom_shop_templates.controllers.metrics import tts_count
+
+# Pages that can be prefetched: GET, no side effects. Speculation Rules URL
+# patterns, '*' matches anything (including '/')
+PREFETCH_ROUTES = (
+    '/shop',
+    '/shop/*',
+    '/my',
+    '/my/home',
+    '/my/orders',
+    '/my/orders/page/*',
+    '/my/addresses',
+    '/my/addresses/edit',
+    '/my/account',
+    '/my/account/edit',
+    '/my/payment_method',
+)
+
+# Never prefetched, even when matching PREFETCH_ROUTES: they show or change
+# the cart, the order, the session or the pricelist
+PREFETCH_EXCLUDED_ROUTES = (
+    '/shop/cart*',
+    '/shop/checkout*',
+    '/shop/address*',
+    '/shop/payment*',
+    '/shop/confirm*',
+    '/shop/extra_info*',
+    '/shop/change_pricelist/*',
+    '/shop/pricelist*',
+    '/shop/suggest*',
+    '/shop/states/*',
+)
+
+# Routes that change what prefetchable pages show (cart, orders, addresses,
+# account details, payment methods): POSTs (any method but
+# PREFETCH_SAFE_METHODS) to them forget the session's prefetched pages.
+# Matched like PREFETCH_ROUTES
+PREFETCH_INVALIDATING_ROUTES = (
+    '/shop/cart/*',
+    '/shop/checkout*',
+    '/shop/address*',
+    '/shop/payment*',
+    '/shop/confirm*',
+    '/shop/extra_info*',
+    '/payment/*',
+    '/my/account*',
+    '/my/addresses*',
+    '/my/address/*',
+    '/my/payment_method*',
+)
+# Routes that change the session's pricelist with a GET
+PREFETCH_INVALIDATING_GET_ROUTES = (
+    '/shop/change_pricelist/*',
+    '/shop/pricelist*',
+)
+# Methods that never change anything
+PREFETCH_SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+PREFETCH_CACHE_TTL = 30  # seconds
+PREFETCH_CACHE_SIZE = 256  # entries per worker
+
+# Session key of the prefetch generation (see module docstring)
+PREFETCH_GENERATION_KEY = 'tts_prefetch_generation'
+
+# Speculation Rules eagerness: 'moderate' = hover (200 ms) or mousedown
+SPECULATION_EAGERNESS = 'moderate'
+
+# {(session id, generation, uid, website, lang, full path): {'body', 'content_type', 'expires'}}
+_cache = collections.OrderedDict()
+_lock = threading.Lock()
+
+
+def _route_regex(patterns):
+    return re.compile('|'.join(re.escape(pattern).replace(r'\*', '.*') for pattern in patterns))
+
+
+_PREFETCH_ROUTES_RE = _route_regex(PREFETCH_ROUTES)
+_PREFETCH_EXCLUDED_RE = _route_regex(PREFETCH_EXCLUDED_ROUTES)
+_PREFETCH_INVALIDATING_RE = _route_regex(PREFETCH_INVALIDATING_ROUTES)
+_PREFETCH_INVALIDATING_GET_RE = _route_regex(PREFETCH_INVALIDATING_GET_ROUTES)
+
+
+def is_prefetch_request(httprequest):
+    """Prefetch/prerender request: Sec-Purpose (Speculation Rules), Purpose or X-Moz."""
+    purpose = ' '.join(httprequest.headers.get(name, '') for name in ('Sec-Purpose', 'Purpose', 'X-Moz'))
+    return 'prefetch' in purpose.lower()
+
+
+def is_prefetchable(path):
+    return bool(_PREFETCH_ROUTES_RE.fullmatch(path)) and not _PREFETCH_EXCLUDED_RE.fullmatch(path)
+
+
+def invalidates_prefetch(method, path):
+    """Whether a request changes what the session's prefetched pages show."""
+    if method in PREFETCH_SAFE_METHODS:
+        return method == 'GET' and bool(_PREFETCH_INVALIDATING_GET_RE.fullmatch(path))
+    return bool(_PREFETCH_INVALIDATING_RE.fullmatch(path))
+
+
+class IrHttp(models.AbstractModel):
+    _inherit = 'ir.http'
+
+    @classmethod
+    def _dispatch(cls, endpoint):
+        httprequest = request.httprequest
+        if invalidates_prefetch(httprequest.method, cls._tts_prefetch_path()):
+            cls._tts_prefetch_drop_session()
+            return super()._dispatch(endpoint)
+        if httprequest.method != 'GET':
+            return super()._dispatch(endpoint)
+
+        key = cls._tts_prefetch_key()
+        if not is_prefetch_request(httprequest):
+            cached = cls._tts_prefetch_pop(key) if key else None
+            return cached if cached is not None else super()._dispatch(endpoint)
+
+        if not key:
+            # 503: browsers discard prefetches that don't answer 2xx
+            tts_count('tts_prefetch_total', 'rejected')
+            return request.make_response('', status=503, headers=[
+                ('Cache-Control', 'no-store'),
+                ('X-TTS-Prefetch', 'rejected'),
+            ])
+
+        response = super()._dispatch(endpoint)
+        cls._tts_prefetch_store(key, response)
+        return response
+
+    @classmethod
+    def _tts_prefetch_key(cls):
+        """Micro-cache key of the current request, or None if the page can't be prefetched."""
+        if request.session.debug or not is_prefetchable(cls._tts_prefetch_path()):
+            return None
+        website = getattr(request, 'website', None)
+        return (
+            request.session.sid,
+            request.session.get(PREFETCH_GENERATION_KEY, 0),
+            request.env.uid,
+            website.id if website else None,
+            request.env.lang,
+            request.httprequest.full_path,
+        )
+
+    @classmethod
+    def _tts_prefetch_path(cls):
+        """Path of the current request without its language prefix."""
+        path = request.httprequest.path
+        lang = getattr(request, 'lang', None)
+        prefix = f'/{lang.url_code}' if lang and lang.url_code else None
+        if prefix and (path == prefix or path.startswith(prefix + '/')):
+            return path[len(prefix):] or '/'
+        return path
+
+    @classmethod
+    def _tts_prefetch_store(cls, key, response):
+        """Keep a rendered prefetch response for the real navigation."""
+        if getattr(response, 'status_code', None) != 200 or not getattr(response, 'mimetype', '') == 'text/html':
+            return
+        if PREFETCH_GENERATION_KEY not in request.session:
+            # From now on the session's changes increment it (_tts_prefetch_drop_session)
+            request.session[PREFETCH_GENERATION_KEY] = key[1]
+        response.flatten()
+        with _lock:
+            _cache[key] = {
+                'body': response.get_data(),
+                'content_type': response.headers.get('Content-Type'),
+                'expires': time.time() + PREFETCH_CACHE_TTL,
+            }
+            _cache.move_to_end(key)
+            while len(_cache) > PREFETCH_CACHE_SIZE:
+                _cache.popitem(last=False)
+        response.headers['X-TTS-Prefetch'] = 'stored'
+        tts_count('tts_prefetch_total', 'stored')
+
+    @classmethod
+    def _tts_prefetch_pop(cls, key):
+        """Response prefetched for this navigation (served once), or None."""
+        with _lock:
+            entry = _cache.pop(key, None)
+        if entry is None:
+            return None
+        if entry['expires'] < time.time():
+            tts_count('tts_prefetch_total', 'expired')
+            return None
+        tts_count('tts_prefetch_total', 'hit')
+        return request.make_response(entry['body'], headers=[
+            ('Content-Type', entry['content_type']),
+            ('X-TTS-Prefetch', 'hit'),
+        ])
+
+    @classmethod
+    def _tts_prefetch_drop_session(cls):
+        """
+        Forget the prefetched pages of this session (it is changing something).
+
+        Incrementing the session's generation invalidates them in every
+        worker; this worker's copies are dropped right away.
+        """
+        if PREFETCH_GENERATION_KEY not in request.session:
+            return  # nothing was ever prefetched
+        request.session[PREFETCH_GENERATION_KEY] += 1
+        sid = request.session.sid
+        with _lock:
+            for key in [key for key in _cache if key[0] == sid]:
+                del _cache[key]
+
+    @api.model
+    def _tts_speculation_rules(self):
+        """
+        Speculation Rules JSON for <script type="speculationrules">, built
+        from PREFETCH_ROUTES / PREFETCH_EXCLUDED_ROUTES, with and without the
+        website's language prefixes. prefetch.js reads it too, for browsers
+        without Speculation Rules.
+        """
+        website = self.env['website'].get_current_website()
+        prefixes = [''] + [
+            f'/{lang.url_code}' for lang in website.language_ids
+            if lang != website.default_lang_id and lang.url_code
+        ]
+        rules = {'prefetch': [{
+            'source': 'document',
+            'where': {'and': [
+                {'href_matches': [prefix + route for prefix in prefixes for route in PREFETCH_ROUTES]},
+                {'not': {'href_matches': [prefix + route for prefix in prefixes for route in PREFETCH_EXCLUDED_ROUTES]}},
+                {'not': {'selector_matches': '[rel~=nofollow], [target=_blank], [download]'}},
+            ]},
+            'eagerness': SPECULATION_EAGERNESS,
+        }]}
+        return Markup(json.dumps(rules).replace('</', '<\\/'))
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from odoo import api, models, tools
+
+# Fields the available payment methods are selected on
+TTS_PAYMENT_METHOD_FIELDS = {
+    'active', 'is_primary', 'provider_ids', 'supported_country_ids', 'supported_currency_ids',
+}
+TTS_PAYMENT_PROVIDER_FIELDS = {'state', 'is_published', 'company_id', 'website_id', 'payment_method_ids'}
+
+
+class PaymentMethod(models.Model):
+    _inherit = 'payment.method'
+
+    @api.model
+    def _get_tts_available_methods(self, order):
+        """
+        Payment methods usable for an order's website, country, currency and company.
+
+        Used by the checkout payment step instead of an unfiltered search.
+        Only primary methods with an enabled, published provider are kept.
+        The matching ids are memoized per (website, country, currency, company)
+        and payment version, bumped on relevant payment method and provider
+        changes.
+
+        :return: payment.method recordset (sudo)
+        """
+        website_id = order.website_id.id or self.env['website'].get_current_website().id
+        method_ids = self._tts_available_method_ids(
+            website_id,
+            order.partner_invoice_id.country_id.id,
+            order.currency_id.id,
+            order.company_id.id,
+            self.env['tts.cache.version']._tts_get('payment'),
+        )
+        return self.sudo().browse(method_ids)
+
+    @tools.ormcache('website_id', 'country_id', 'currency_id', 'company_id', 'version')
+    def _tts_available_method_ids(self, website_id, country_id, currency_id, company_id, version):
+        domain = [
+            ('is_primary', '=', True),
+            ('provider_ids', 'any', [
+                ('state', 'in', ['enabled', 'test']),
+                ('is_published', '=', True),
+                ('company_id', '=', company_id),
+                ('website_id', 'in', [False, website_id]),
+            ]),
+        ]
+        if country_id:
+            domain += ['|', ('supported_country_ids', '=', False), ('supported_country_ids', 'in', [country_id])]
+        if currency_id:
+            domain += ['|', ('supported_currency_ids', '=', False), ('supported_currency_ids', 'in', [currency_id])]
+        return tuple(self.sudo().search(domain).ids)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['tts.cache.version']._tts_bump('payment')
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if self and TTS_PAYMENT_METHOD_FIELDS.intersection(vals):
+            self.env['tts.cache.version']._tts_bump('payment')
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['tts.cache.version']._tts_bump('payment')
+        return res
+
+
+class PaymentProvider(models.Model):
+    _inherit = 'payment.provider'
+
+    # Provider state/website/publication decides which methods are available
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['tts.cache.version']._tts_bump('payment')
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if self and TTS_PAYMENT_PROVIDER_FIELDS.intersection(vals):
+            self.env['tts.cache.version']._tts_bump('payment')
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['tts.cache.version']._tts_bump('payment')
+        return res
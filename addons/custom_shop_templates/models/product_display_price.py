@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+import psycopg2
+
+from odoo import api, fields, models
+from odoo.tools.sql import create_unique_index
+
+# product.template fields the display prices are computed from
+TTS_DISPLAY_PRICE_FIELDS = {'list_price', 'compare_list_price', 'taxes_id', 'categ_id', 'currency_id', 'company_id'}
+
+# account.tax fields that change the tax-included prices or the VAT rate
+TTS_DISPLAY_PRICE_TAX_FIELDS = {
+    'amount', 'amount_type', 'price_include', 'price_include_override',
+    'include_base_amount', 'children_tax_ids', 'active',
+}
+
+# Stored per (template, pricelist, fiscal position); False = none
+TTS_DISPLAY_PRICE_VALUES = (
+    'price_tax_excluded', 'price_tax_included',
+    'strike_price_tax_excluded', 'strike_price_tax_included',
+    'discount_percent', 'vat_rate',
+)
+
+
+class ProductDisplayPrice(models.Model):
+    """
+    Shop display prices, stored per (template, pricelist, fiscal position).
+
+    Product cards and the product detail page read their price, strike-through
+    price, discount badge and VAT rate from here, with one lookup per page
+    (product.template._tts_get_display_prices), instead of computing them for
+    every product on every render.
+
+    Rows are created on the first lookup of a key and refreshed at the end of
+    the transaction that changes a product price, a pricelist rule, a tax or a
+    fiscal position mapping (see _tts_schedule_refresh). A daily cron catches
+    date-based pricelist rules and currency rates.
+    """
+    _name = 'tts.product.display.price'
+    _description = 'TTS Product Display Price'
+
+    product_tmpl_id = fields.Many2one('product.template', required=True, ondelete='cascade', index=True)
+    pricelist_id = fields.Many2one('product.pricelist', ondelete='cascade')
+    fiscal_position_id = fields.Many2one('account.fiscal.position', ondelete='cascade')
+    currency_id = fields.Many2one('res.currency', required=True)
+
+    price_tax_excluded = fields.Monetary()
+    price_tax_included = fields.Monetary()
+    # Price before the pricelist discount (compare_list_price or list_price),
+    # 0 when the product is not discounted
+    strike_price_tax_excluded = fields.Monetary()
+    strike_price_tax_included = fields.Monetary()
+    discount_percent = fields.Integer()
+    # First percentage tax after fiscal position mapping, 0 if untaxed
+    vat_rate = fields.Float()
+
+    def init(self):
+        super().init()
+        # One row per key; also the lookup index (pricelist/fiscal position may be empty)
+        create_unique_index(
+            self.env.cr, 'tts_product_display_price_key_index', self._table,
+            ['product_tmpl_id', 'COALESCE(pricelist_id, 0)', 'COALESCE(fiscal_position_id, 0)'],
+        )
+
+    # -------------------------------------------------------------------------
+    # Lookup
+    # -------------------------------------------------------------------------
+
+    @api.model
+    def _tts_lookup(self, templates, pricelist, fiscal_position):
+        """
+        Display prices of `templates` for a pricelist and fiscal position.
+
+        One search for the whole batch; templates without a row yet are
+        computed now and stored (unless the request is read-only, or another
+        request stored them first).
+
+        :return: dict {template_id: {field: value} for TTS_DISPLAY_PRICE_VALUES + currency}
+        """
+        rows = self.sudo().search([
+            ('product_tmpl_id', 'in', templates.ids),
+            ('pricelist_id', '=', pricelist.id),
+            ('fiscal_position_id', '=', fiscal_position.id),
+        ])
+        prices = {row.product_tmpl_id.id: row._tts_values() for row in rows}
+
+        missing = templates.filtered(lambda template: template.id not in prices)
+        if missing:
+            computed = self._tts_compute(missing, pricelist, fiscal_position)
+            prices.update(computed)
+            if not getattr(self.env.cr, 'readonly', False):
+                try:
+                    with self.env.cr.savepoint():
+                        self.sudo().create([
+                            self._tts_row_vals(template_id, values, pricelist, fiscal_position)
+                            for template_id, values in computed.items()
+                        ])
+                except psycopg2.IntegrityError:
+                    pass  # stored meanwhile by a concurrent request
+        return prices
+
+    def _tts_values(self):
+        values = {name: self[name] for name in TTS_DISPLAY_PRICE_VALUES}
+        values['currency'] = self.currency_id
+        return values
+
+    @api.model
+    def _tts_row_vals(self, template_id, values, pricelist, fiscal_position):
+        vals = {name: values[name] for name in TTS_DISPLAY_PRICE_VALUES}
+        vals.update(
+            product_tmpl_id=template_id,
+            pricelist_id=pricelist.id,
+            fiscal_position_id=fiscal_position.id,
+            currency_id=values['currency'].id,
+        )
+        return vals
+
+    # -------------------------------------------------------------------------
+    # Computation
+    # -------------------------------------------------------------------------
+
+    @api.model
+    def _tts_compute(self, templates, pricelist, fiscal_position):
+        """
+        Display prices of `templates`, computed with the pricelist rules
+        (one batched price computation) and the fiscal position's taxes.
+
+        :return: dict {template_id: values}, as _tts_lookup
+        """
+        company = pricelist.company_id or fiscal_position.company_id or self.env.company
+        currency = pricelist.currency_id or company.currency_id
+        templates = templates.sudo().with_company(company)
+        today = fields.Date.context_today(self)
+        Tax = self.env['account.tax']
+
+        if pricelist:
+            prices = pricelist.sudo()._get_products_price(templates, 1.0)
+        else:
+            prices = {
+                template.id: template.currency_id._convert(template.list_price, currency, company, today)
+                for template in templates
+            }
+
+        result = {}
+        for template in templates:
+            price = prices[template.id]
+            # Strike-through: the compare price if set, else the list price
+            # before pricelist discounts
+            base_price = template.currency_id._convert(
+                template.compare_list_price or template.list_price, currency, company, today,
+            )
+            strike_price = base_price if currency.compare_amounts(base_price, price) > 0 else 0.0
+
+            product_taxes = template.taxes_id._filter_taxes_by_company(company)
+            taxes = fiscal_position.map_tax(product_taxes) if fiscal_position else product_taxes
+
+            def with_taxes(amount):
+                amount = Tax._fix_tax_included_price_company(amount, product_taxes, taxes, company)
+                computed = taxes.compute_all(amount, currency, 1.0, product=template)
+                return computed['total_excluded'], computed['total_included']
+
+            price_tax_excluded, price_tax_included = with_taxes(price)
+            strike_tax_excluded, strike_tax_included = with_taxes(strike_price) if strike_price else (0.0, 0.0)
+            vat_tax = taxes.flatten_taxes_hierarchy().filtered(lambda tax: tax.amount_type == 'percent')[:1]
+
+            result[template.id] = {
+                'price_tax_excluded': price_tax_excluded,
+                'price_tax_included': price_tax_included,
+                'strike_price_tax_excluded': strike_tax_excluded,
+                'strike_price_tax_included': strike_tax_included,
+                'discount_percent': int((strike_price - price) / strike_price * 100) if strike_price else 0,
+                'vat_rate': vat_tax.amount if vat_tax else 0.0,
+                'currency': currency,
+            }
+        return result
+
+    def _tts_refresh(self):
+        """Recompute these rows; only rows whose values changed are written."""
+        rows = self.sudo().exists()
+        keys = {}
+        for row in rows:
+            keys.setdefault((row.pricelist_id, row.fiscal_position_id), rows.browse())
+            keys[(row.pricelist_id, row.fiscal_position_id)] |= row
+
+        for (pricelist, fiscal_position), key_rows in keys.items():
+            computed = self._tts_compute(key_rows.product_tmpl_id, pricelist, fiscal_position)
+            for row in key_rows:
+                values = computed[row.product_tmpl_id.id]
+                changed = {name: values[name] for name in TTS_DISPLAY_PRICE_VALUES if row[name] != values[name]}
+                if row.currency_id != values['currency']:
+                    changed['currency_id'] = values['currency'].id
+                if changed:
+                    row.write(changed)
+
+    # -------------------------------------------------------------------------
+    # Incremental refresh
+    # -------------------------------------------------------------------------
+
+    @api.model
+    def _tts_schedule_refresh(self, templates=None, pricelists=None, fiscal_positions=None):
+        """
+        Queue the rows of these templates / pricelists / fiscal positions for a
+        refresh at the end of the transaction.
+
+        Price changes often come in bursts (imports, pricelist edits line by
+        line); collecting the keys and refreshing once in a precommit hook
+        computes each affected row once per transaction.
+        """
+        pending = self.env.cr.precommit.data.setdefault('tts_display_price_refresh', {
+            'product_tmpl_id': set(), 'pricelist_id': set(), 'fiscal_position_id': set(),
+        })
+        if not any(pending.values()):
+            self.env.cr.precommit.add(self._tts_flush_refresh)
+        pending['product_tmpl_id'].update(templates.ids if templates else ())
+        pending['pricelist_id'].update(pricelists.ids if pricelists else ())
+        pending['fiscal_position_id'].update(fiscal_positions.ids if fiscal_positions else ())
+
+    @api.model
+    def _tts_flush_refresh(self):
+        pending = self.env.cr.precommit.data.pop('tts_display_price_refresh', {})
+        domain = [(name, 'in', list(ids)) for name, ids in pending.items() if ids]
+        if not domain:
+            return
+        domain = ['|'] * (len(domain) - 1) + domain
+        self.sudo().search(domain)._tts_refresh()
+        # Precommit hooks run after the ORM flush: write the new prices now
+        self.flush_model()
+
+    @api.model
+    def _cron_tts_refresh_display_prices(self):
+        """Safety net: recompute every row (date-based rules, currency rates)."""
+        self.sudo().search([])._tts_refresh()
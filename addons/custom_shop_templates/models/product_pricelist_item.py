@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from odoo import api, models
+
+
+class ProductPricelistItem(models.Model):
+    _inherit = 'product.pricelist.item'
+
+    # Cached shop pages and stored display prices show pricelist prices
+
+    def _tts_schedule_display_price_refresh(self):
+        """Refresh the display prices of these rules' pricelists, and of the pricelists based on them."""
+        pricelists = self.pricelist_id
+        pricelists |= self.sudo().search([('base_pricelist_id', 'in', pricelists.ids)]).pricelist_id
+        self.env['tts.product.display.price']._tts_schedule_refresh(pricelists=pricelists)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['tts.cache.version']._tts_bump('display')
+        records._tts_schedule_display_price_refresh()
+        return records
+
+    def write(self, vals):
+        if 'pricelist_id' in vals:
+            # Rules moved to another pricelist: refresh the one they leave too
+            self._tts_schedule_display_price_refresh()
+        res = super().write(vals)
+        if self and vals:
+            self.env['tts.cache.version']._tts_bump('display')
+        self._tts_schedule_display_price_refresh()
+        return res
+
+    def unlink(self):
+        self._tts_schedule_display_price_refresh()
+        res = super().unlink()
+        self.env['tts.cache.version']._tts_bump('display')
+        return res
+
+
+class ProductPricelist(models.Model):
+    _inherit = 'product.pricelist'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'currency_id' in vals or 'company_id' in vals:
+            self.env['tts.product.display.price']._tts_schedule_refresh(pricelists=self)
+        return res
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from odoo import models
+from odoo.tools.sql import create_index
+
+
+class ProductProduct(models.Model):
+    _inherit = 'product.product'
+
+    def init(self):
+        super().init()
+        # Trigram index for SKU search (product.template._search_fetch)
+        if self.env.registry.has_trigram:
+            create_index(
+                self.env.cr, 'product_product_tts_default_code_trgm_index',
+                self._table, ['default_code gin_trgm_ops'], method='gin',
+            )
+
+    def write(self, vals):
+        # SKUs feed the catalog caches; other variant data (price extra,
+        # default variant) is shown on cached shop pages
+        res = super().write(vals)
+        if self:
+            self.env['product.template']._tts_bump_cache_versions(vals)
+        return res
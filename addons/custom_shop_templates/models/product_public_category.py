@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from odoo import api, models, tools
+
+# product.public.category fields the catalog caches (product counts,
+# suggestions) are built from
+TTS_CATEGORY_CATALOG_FIELDS = {'name', 'parent_id', 'website_id', 'product_tmpl_ids'}
+
+
+class ProductPublicCategory(models.Model):
+    _inherit = 'product.public.category'
+
+    @api.model
+    def _get_tts_product_counts(self, website_id, in_stock=False):
+        """
+        Number of published products per category (including subcategories),
+        only counting products in stock with in_stock (the /shop "In stock
+        only" filter).
+
+        Used by the shop filter pills to show counts and hide empty
+        categories. Computed with one query per website and kept in the
+        ormcache per catalog version, so counts are refreshed on
+        publish/unpublish and category changes.
+
+        :return: dict {category_id: product_count}
+        """
+        Version = self.env['tts.cache.version']
+        version = (Version._tts_get('catalog'), Version._tts_get('stock') if in_stock else None)
+        return self._tts_product_counts(website_id, bool(in_stock), version)
+
+    @tools.ormcache('website_id', 'in_stock', 'version')
+    def _tts_product_counts(self, website_id, in_stock, version):
+        self.env['product.template'].flush_model([
+            'active', 'is_published', 'sale_ok', 'website_id', 'public_categ_ids', 'tts_stock_bucket',
+        ])
+        self.flush_model(['parent_path'])
+        self.env.cr.execute("""
+            SELECT category.id, COUNT(DISTINCT rel.product_template_id)
+              FROM product_public_category category
+              JOIN product_public_category sub
+                ON sub.parent_path LIKE category.parent_path || '%%'
+              JOIN product_public_category_product_template_rel rel
+                ON rel.product_public_category_id = sub.id
+              JOIN product_template product
+                ON product.id = rel.product_template_id
+             WHERE product.active
+               AND product.is_published
+               AND product.sale_ok
+               AND (product.website_id IS NULL OR product.website_id = %s)
+               AND (NOT %s OR product.tts_stock_bucket != 'out')
+          GROUP BY category.id
+        """, [website_id, in_stock])
+        return dict(self.env.cr.fetchall())
+
+    # Category changes affect search suggestions and product counts; other
+    # fields (sequence, images, ...) only what cached shop pages show
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['tts.cache.version']._tts_bump('catalog')
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if self and TTS_CATEGORY_CATALOG_FIELDS.intersection(vals):
+            self.env['tts.cache.version']._tts_bump('catalog')
+        elif self and vals:
+            self.env['tts.cache.version']._tts_bump('display')
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['tts.cache.version']._tts_bump('catalog')
+        return res
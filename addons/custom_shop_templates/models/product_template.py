@@ -0,0 +1,716 @@
+# -*- coding: utf-8 -*-
+import bisect
+import collections
+import datetime
+import threading
+
+from odoo import api, fields, models, tools
+from odoo.osv import expression
+from odoo.tools import SQL, escape_psql
+from odoo.tools.sql import create_index
+
+from .product_display_price import TTS_DISPLAY_PRICE_FIELDS
+
+# product.template / product.product fields the catalog caches (related
+# products, category counts, search counts, suggestions) are built from
+TTS_CATALOG_FIELDS = {
+    'name', 'default_code', 'active', 'is_published', 'sale_ok', 'website_id',
+    'public_categ_ids', 'alternative_product_ids', 'tts_related_product_ids',
+}
+
+# Number of co-category neighbours kept per product in the related index
+TTS_RELATED_INDEX_SIZE = 8
+# Public categories with more products than this are too broad to relate
+# products (e.g. "All") and are left out of the index: pairs grow with the
+# square of a category's size
+TTS_RELATED_MAX_CATEGORY_SIZE = 500
+
+# Search-as-you-type: shortest prefix answered, and max entries returned
+TTS_SUGGEST_MIN_CHARS = 2
+TTS_SUGGEST_LIMIT = 8
+# Changes are found by write_date (the start of the writing transaction):
+# re-read products written this long before the last sync, for writers that
+# committed late
+TTS_SUGGEST_SYNC_MARGIN = datetime.timedelta(minutes=10)
+
+# Stock availability buckets (product card / detail badge, /shop filter).
+# Values sort in display order: in < low < out
+TTS_STOCK_BUCKETS = [
+    ('in', 'In stock'),
+    ('low', 'Limited stock'),
+    ('out', 'Out of stock'),
+]
+TTS_LOW_STOCK_THRESHOLD = 10  # more than this on hand is "in stock"
+
+# Keyset pagination (/shop?after=<id>): sortable columns of the shop orders
+TTS_KEYSET_FIELDS = {
+    'is_published', 'website_sequence', 'create_date', 'list_price',
+    'name', 'tts_stock_bucket', 'id',
+}
+
+
+def _tts_freeze(value):
+    """Hashable copy of a domain (lists become tuples), for ormcache keys."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_tts_freeze(item) for item in value)
+    return value
+
+
+def tts_stock_bucket(quantity):
+    """Availability bucket for a total on-hand quantity."""
+    if quantity > TTS_LOW_STOCK_THRESHOLD:
+        return 'in'
+    return 'low' if quantity > 0 else 'out'
+
+
+def tts_suggest_keys(name, skus=()):
+    """Index keys of a record: full name, every word start ("blue tent 3p", "tent 3p", "3p") and SKUs."""
+    words = (name or '').split()
+    keys = {' '.join(words[position:]) for position in range(len(words))}
+    keys.update(skus)
+    return {key.strip().lower() for key in keys if key.strip()}
+
+
+class TTSSuggestIndex:
+    """
+    Sorted prefix index of a website's published products and public
+    categories in one language (see ProductTemplate._tts_suggest).
+
+    keys/entries are parallel lists sorted by key, categories first for equal
+    keys, so a prefix lookup is a bisect; records are removed and re-added
+    one by one when they change. entry = (kind, id, name, sku, url).
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.entries = []
+        self.record_keys = {}  # {(kind, id): keys}
+        self.counts = collections.Counter()  # records per kind
+        self.version = None
+        self.synced_at = None
+        self.category_fingerprint = None
+
+    def add(self, items):
+        """Index [(entry, keys)]: one sort for big batches, bisect inserts for a few."""
+        if len(items) > len(self.keys) // 16:
+            rows = [(key, entry[0] != 'category', entry) for entry, keys in items for key in keys]
+            rows.extend((key, entry[0] != 'category', entry) for key, entry in zip(self.keys, self.entries))
+            rows.sort(key=lambda row: row[:2])
+            self.keys = [key for key, _rank, _entry in rows]
+            self.entries = [entry for _key, _rank, entry in rows]
+        else:
+            for entry, keys in items:
+                insert = bisect.bisect_left if entry[0] == 'category' else bisect.bisect_right
+                for key in keys:
+                    position = insert(self.keys, key)
+                    self.keys.insert(position, key)
+                    self.entries.insert(position, entry)
+        for entry, keys in items:
+            self.record_keys[entry[:2]] = keys
+            self.counts[entry[0]] += 1
+
+    def remove(self, kind, record_id):
+        keys = self.record_keys.pop((kind, record_id), None)
+        if keys is None:
+            return
+        self.counts[kind] -= 1
+        for key in keys:
+            low = bisect.bisect_left(self.keys, key)
+            high = bisect.bisect_right(self.keys, key, low)
+            for position in range(low, high):
+                if self.entries[position][:2] == (kind, record_id):
+                    del self.keys[position]
+                    del self.entries[position]
+                    break
+
+    def record_ids(self, kind):
+        return [record_id for record_kind, record_id in self.record_keys if record_kind == kind]
+
+    def lookup(self, term, limit):
+        """Entries with a key starting with `term`, one per record, at most `limit`."""
+        found, seen = [], set()
+        position = bisect.bisect_left(self.keys, term)
+        while position < len(self.keys) and len(found) < limit and self.keys[position].startswith(term):
+            entry = self.entries[position]
+            position += 1
+            if entry[:2] not in seen:
+                seen.add(entry[:2])
+                found.append(entry)
+        return found
+
+
+# Per-worker suggestion indexes {(db, website id, lang): TTSSuggestIndex}
+_tts_suggest_indexes = {}
+_tts_suggest_lock = threading.Lock()
+
+
+class ProductTemplate(models.Model):
+    _inherit = 'product.template'
+
+    # Co-category index, rebuilt by the "TTS: Rebuild related products" cron.
+    # Products sharing the most public categories come first.
+    tts_related_product_ids = fields.Many2many(
+        'product.template',
+        'tts_product_template_related_rel',
+        'product_id', 'related_id',
+        string='Related Products (Index)',
+        copy=False,
+    )
+
+    # Stored availability, kept up to date from stock.quant / stock.move
+    # changes (see _tts_schedule_stock_bucket_update). Indexed so /shop can
+    # filter and sort on it instead of computing stock per card.
+    tts_stock_bucket = fields.Selection(
+        TTS_STOCK_BUCKETS,
+        string='Stock Availability',
+        default='out',
+        index=True,
+        copy=False,
+        readonly=True,
+    )
+
+    def _get_tts_stock_map(self):
+        """
+        Total on-hand stock per template for a whole page of products.
+
+        Equivalent to summing qty_available over product_variant_ids, but done
+        with one grouped read on stock.quant instead of one compute per variant.
+        Uses the same location domain as qty_available, so warehouse/company
+        context is respected.
+
+        :return: dict {template_id: total_stock}
+        """
+        stock_map = dict.fromkeys(self.ids, 0.0)
+        if not self:
+            return stock_map
+
+        variants = self.with_context(active_test=True).product_variant_ids
+        if not variants:
+            return stock_map
+
+        domain_quant_loc, _domain_in, _domain_out = variants._get_domain_locations()
+        groups = self.env['stock.quant'].sudo()._read_group(
+            [('product_id', 'in', variants.ids)] + domain_quant_loc,
+            groupby=['product_id'],
+            aggregates=['quantity:sum'],
+        )
+        for variant, quantity in groups:
+            template_id = variant.product_tmpl_id.id
+            stock_map[template_id] = stock_map.get(template_id, 0.0) + (quantity or 0.0)
+
+        return stock_map
+
+    # -------------------------------------------------------------------------
+    # Stock availability bucket
+    # -------------------------------------------------------------------------
+
+    def _tts_update_stock_bucket(self):
+        """
+        Recompute tts_stock_bucket for these templates.
+
+        One grouped stock query for the whole batch, and one write per bucket
+        that actually changed (so unchanged products keep their write_date and
+        cached cards/pages).
+        """
+        templates = self.sudo().with_context(active_test=False).exists()
+        if not templates:
+            return
+
+        stock_map = templates._get_tts_stock_map()
+        changed = {}
+        for template in templates:
+            bucket = tts_stock_bucket(stock_map.get(template.id, 0.0))
+            if template.tts_stock_bucket != bucket:
+                changed.setdefault(bucket, templates.browse())
+                changed[bucket] |= template
+
+        for bucket, records in changed.items():
+            records.write({'tts_stock_bucket': bucket})
+
+    def _tts_schedule_stock_bucket_update(self):
+        """
+        Queue these templates for a bucket update at the end of the transaction.
+
+        Stock operations touch the same quants many times (reservations,
+        validations); collecting the template ids and updating them once
+        in a precommit hook keeps it to one grouped query per transaction.
+        """
+        if not self:
+            return
+        pending = self.env.cr.precommit.data.setdefault('tts_stock_bucket_template_ids', set())
+        if not pending:
+            self.env.cr.precommit.add(self._tts_flush_stock_bucket_updates)
+        pending.update(self.ids)
+
+    def _tts_flush_stock_bucket_updates(self):
+        template_ids = self.env.cr.precommit.data.pop('tts_stock_bucket_template_ids', set())
+        self.browse(template_ids)._tts_update_stock_bucket()
+        # Precommit hooks run after the ORM flush: write the new buckets now
+        self.flush_model(['tts_stock_bucket'])
+
+    @api.model
+    def _cron_tts_refresh_stock_buckets(self):
+        """Safety net: recompute tts_stock_bucket for every product."""
+        self.with_context(active_test=False).search([])._tts_update_stock_bucket()
+
+    # -------------------------------------------------------------------------
+    # Display prices (tts.product.display.price)
+    # -------------------------------------------------------------------------
+
+    def _tts_get_display_prices(self):
+        """
+        Prices to show on the product cards / detail page of these templates,
+        for the current website's pricelist, fiscal position and tax display
+        setting, with one lookup for the whole batch.
+
+        :return: dict {template_id: {price, strike_price, discount_percent,
+                 vat_rate, tax_included, currency}}; strike_price is 0 when
+                 the product is not discounted
+        """
+        website = self.env['website'].get_current_website()
+        tax_included = website.show_line_subtotals_tax_selection == 'tax_included'
+        stored = self.env['tts.product.display.price']._tts_lookup(
+            self, website.pricelist_id, website.fiscal_position_id,
+        )
+        suffix = 'tax_included' if tax_included else 'tax_excluded'
+        return {
+            template_id: {
+                'price': values[f'price_{suffix}'],
+                'strike_price': values[f'strike_price_{suffix}'],
+                'discount_percent': values['discount_percent'],
+                'vat_rate': values['vat_rate'],
+                'tax_included': tax_included,
+                'currency': values['currency'],
+            }
+            for template_id, values in stored.items()
+        }
+
+    def _get_tts_related_products(self, limit=4):
+        """
+        Related products for the product detail page.
+
+        Priority:
+        1. Alternative products (alternative_product_ids)
+        2. Products sharing public categories (tts_related_product_ids index)
+
+        Only products visible on the current website are returned. Results
+        are memoized per (template, website, catalog version) in the LRU ormcache.
+
+        :return: product.template recordset (at most `limit` records)
+        """
+        self.ensure_one()
+        website = self.env['website'].get_current_website()
+        version = self.env['tts.cache.version']._tts_get('catalog')
+        related_ids = self._tts_related_product_ids(self.id, website.id, version)
+        return self.browse(related_ids[:limit])
+
+    @api.model
+    @tools.ormcache('template_id', 'website_id', 'version')
+    def _tts_related_product_ids(self, template_id, website_id, version):
+        template = self.sudo().browse(template_id)
+        candidates = template.alternative_product_ids or template.tts_related_product_ids
+        visible = candidates.filtered(
+            lambda p: p.active and p.is_published and p.website_id.id in (False, website_id)
+        )
+        return tuple(visible.ids)
+
+    @api.model
+    def _cron_tts_rebuild_related_products(self):
+        """
+        Rebuild the co-category index (tts_related_product_ids) in one query.
+
+        For every product, keep the TTS_RELATED_INDEX_SIZE published products
+        that share the most public categories with it. Each product's
+        neighbours are ranked and limited on their own (LATERAL ... LIMIT),
+        within categories of at most TTS_RELATED_MAX_CATEGORY_SIZE products,
+        so the work grows with the number of products, not its square.
+        """
+        self.env['product.template'].flush_model(['active', 'is_published', 'public_categ_ids'])
+        self.env.cr.execute("DELETE FROM tts_product_template_related_rel")
+        self.env.cr.execute("""
+            WITH categories AS (
+                SELECT product_public_category_id AS id
+                  FROM product_public_category_product_template_rel
+              GROUP BY product_public_category_id
+                HAVING COUNT(*) <= %s
+            ), products AS (
+                SELECT DISTINCT rel.product_template_id AS id
+                  FROM product_public_category_product_template_rel rel
+                  JOIN categories ON categories.id = rel.product_public_category_id
+            )
+            INSERT INTO tts_product_template_related_rel (product_id, related_id)
+                 SELECT products.id, related.id
+                   FROM products
+           CROSS JOIN LATERAL (
+                     SELECT b.product_template_id AS id
+                       FROM product_public_category_product_template_rel a
+                       JOIN categories
+                         ON categories.id = a.product_public_category_id
+                       JOIN product_public_category_product_template_rel b
+                         ON b.product_public_category_id = a.product_public_category_id
+                        AND b.product_template_id != a.product_template_id
+                       JOIN product_template pt
+                         ON pt.id = b.product_template_id
+                      WHERE a.product_template_id = products.id
+                        AND pt.active AND pt.is_published
+                   GROUP BY b.product_template_id
+                   ORDER BY COUNT(*) DESC, b.product_template_id
+                      LIMIT %s
+                 ) related
+        """, [TTS_RELATED_MAX_CATEGORY_SIZE, TTS_RELATED_INDEX_SIZE])
+        self.invalidate_model(['tts_related_product_ids'])
+        self.env['tts.cache.version']._tts_bump('catalog')
+
+    # -------------------------------------------------------------------------
+    # Name/SKU search (TTS search box)
+    # -------------------------------------------------------------------------
+
+    @api.model
+    def _search_get_detail(self, website, order, options):
+        """Add the /shop "In stock only" filter (indexed tts_stock_bucket predicate), keyset page and search limit."""
+        detail = super()._search_get_detail(website, order, options)
+        if options.get('tts_in_stock'):
+            detail['base_domain'].append([('tts_stock_bucket', '!=', 'out')])
+        # Keyset page and search limit requested by TTSShop.shop (see _search_fetch)
+        detail['tts_keyset'] = options.get('tts_keyset')
+        detail['tts_search_limit'] = options.get('tts_search_limit')
+        return detail
+
+    def _search_fetch(self, search_detail, search, limit, order):
+        """
+        Name/SKU search backend for the /shop search box.
+
+        1. Exact SKU fast path: an exact variant default_code match returns
+           that product alone (btree index lookup, no pattern scan).
+        2. Otherwise match name and SKUs only (trigram-indexed columns, see
+           init() and product.product.init()) instead of also scanning the
+           descriptions, and rank the results by relevance when the shopper
+           didn't choose a sort order (context key tts_search_rank).
+
+        Ranking and limiting happen in SQL (see _tts_search_rank_sql). /shop
+        asks for the results up to the end of the requested page
+        (tts_search_limit) instead of all of them; the total comes from a
+        separate search_count, only when there are more results than that.
+        """
+        term = (search or '').strip()
+        if not term:
+            keyset = search_detail.get('tts_keyset')
+            fetched = keyset and self._tts_keyset_fetch(search_detail, order, keyset.after, keyset.limit)
+            if fetched:
+                return fetched
+            return super()._search_fetch(search_detail, search, limit, order)
+
+        model = self.sudo() if search_detail.get('requires_sudo') else self
+        base_domain = expression.AND(search_detail['base_domain'])
+        order = search_detail.get('order', order)
+        limit = search_detail.get('tts_search_limit') or limit
+
+        def counted(results, domain):
+            if limit and len(results) >= limit:
+                return results, model.search_count(domain)
+            return results, len(results)
+
+        exact_domain = expression.AND([base_domain, [('product_variant_ids.default_code', '=', term)]])
+        exact = model.search(exact_domain, limit=limit, order=order)
+        if exact:
+            return counted(exact, exact_domain)
+
+        domain = expression.AND([base_domain, [
+            '|', '|',
+            ('name', 'ilike', term),
+            ('default_code', 'ilike', term),
+            ('product_variant_ids.default_code', 'ilike', term),
+        ]])
+        if not self.env.context.get('tts_search_rank'):
+            return counted(model.search(domain, order=order, limit=limit), domain)
+
+        # Rank, then the shop order for same-rank products, then LIMIT
+        query = model._search(domain)
+        query.order = SQL("%s, %s", model._tts_search_rank_sql(query, term), model._order_to_sql(order, query))
+        query.limit = limit
+        return counted(model.browse(query.get_result_ids()), domain)
+
+    @api.model
+    def _tts_search_rank_sql(self, query, term):
+        """
+        SQL relevance of the products of `query` for a search term (lower is
+        better): a variant SKU starting with the term, then the name equal to
+        it, starting with it, having a word starting with it, anything else.
+        """
+        term = term.lower()
+        prefix = escape_psql(term) + '%'
+        name = SQL("lower(%s)", self._field_to_sql(query.table, 'name', query))
+        return SQL(
+            """CASE
+                WHEN EXISTS (
+                    SELECT 1 FROM product_product variant
+                     WHERE variant.product_tmpl_id = %(template_id)s
+                       AND lower(variant.default_code) LIKE %(prefix)s
+                ) THEN 1
+                WHEN %(name)s = %(term)s THEN 2
+                WHEN %(name)s LIKE %(prefix)s THEN 3
+                WHEN %(name)s LIKE %(word)s THEN 4
+                ELSE 5
+            END""",
+            template_id=SQL.identifier(query.table, 'id'),
+            name=name,
+            term=term,
+            prefix=prefix,
+            word='% ' + prefix,
+        )
+
+    # -------------------------------------------------------------------------
+    # Keyset pagination (/shop?after=<id>)
+    # -------------------------------------------------------------------------
+
+    def _tts_keyset_fetch(self, search_detail, order, after, limit):
+        """
+        One /shop page fetched by keyset instead of OFFSET.
+
+        The page starts right after the anchor product (id `after`, none for
+        the first page) in the shop order, i.e. WHERE (sort key, id) >
+        (anchor's sort key, id), so deep pages cost the same as the first
+        one. The total comes from a cached count.
+
+        :return: (at most `limit` products, total count), or None if the
+                 order can't be paged by keyset (the caller then falls back
+                 to OFFSET)
+        """
+        order = search_detail.get('order', order)
+        keys = self._tts_keyset_order(order)
+        if not keys:
+            return None
+
+        model = self.sudo() if search_detail.get('requires_sudo') else self
+        domain = expression.AND(search_detail['base_domain'])
+        total = model._tts_cached_count(domain)
+
+        anchor = self.sudo().browse(after or []).exists()
+        if anchor:
+            domain = expression.AND([domain, self._tts_keyset_after_domain(keys, anchor)])
+
+        return model.search(domain, limit=limit, order=order), total
+
+    @api.model
+    def _tts_keyset_order(self, order):
+        """
+        Parse an order string into [(field, 'asc'|'desc')], or None if it
+        can't be used for keyset paging (unknown column, NULLS clause, or no
+        trailing id to make the key unique).
+        """
+        keys = []
+        for part in (order or '').split(','):
+            words = part.split()
+            if not words or len(words) > 2 or words[0] not in TTS_KEYSET_FIELDS:
+                return None
+            direction = words[1].lower() if len(words) == 2 else 'asc'
+            if direction not in ('asc', 'desc'):
+                return None
+            keys.append((words[0], direction))
+        if not keys or keys[-1][0] != 'id':
+            return None
+        return keys
+
+    @api.model
+    def _tts_keyset_after_domain(self, keys, anchor):
+        """
+        Domain of the products sorted after `anchor`:
+        k1 > a1 OR (k1 = a1 AND k2 > a2) OR ... (< for descending keys)
+        """
+        values = [anchor[field] for field, _direction in keys]
+        branches = []
+        for position, (field, direction) in enumerate(keys):
+            branch = [(keys[i][0], '=', values[i]) for i in range(position)]
+            branch.append((field, '>' if direction == 'asc' else '<', values[position]))
+            branches.append(expression.AND([[leaf] for leaf in branch]))
+        return expression.OR(branches)
+
+    @api.model
+    def _tts_cached_count(self, domain):
+        """
+        search_count(domain), memoized until the next change of what the
+        domain filters on: the catalog and the stock buckets, plus the
+        'display' topic when it filters on anything else (e.g. list_price
+        for the /shop price range).
+        """
+        Version = self.env['tts.cache.version']
+        topics = ['catalog', 'stock']
+        filtered_fields = {
+            leaf[0].split('.')[0] for leaf in domain
+            if expression.is_leaf(leaf) and isinstance(leaf[0], str)  # not TRUE_LEAF/FALSE_LEAF
+        }
+        if filtered_fields - TTS_CATALOG_FIELDS - {'tts_stock_bucket'}:
+            topics.append('display')
+        version = tuple(Version._tts_get(topic) for topic in topics)
+        return self._tts_search_count(_tts_freeze(domain), version)
+
+    @tools.ormcache('self.env.uid', 'self.env.su', 'frozen_domain', 'version')
+    def _tts_search_count(self, frozen_domain, version):
+        return self.search_count(list(frozen_domain))
+
+    # -------------------------------------------------------------------------
+    # Search-as-you-type suggestions (/shop/suggest)
+    # -------------------------------------------------------------------------
+
+    @api.model
+    def _tts_suggest(self, term, limit=TTS_SUGGEST_LIMIT):
+        """
+        Products and categories whose name, SKU or a word of the name starts
+        with `term`, answered from the in-memory prefix index.
+
+        :return: dict {'products': [{name, sku, url}], 'categories': [{name, url}]}
+        """
+        result = {'products': [], 'categories': []}
+        term = (term or '').strip().lower()
+        if len(term) < TTS_SUGGEST_MIN_CHARS:
+            return result
+
+        website = self.env['website'].get_current_website()
+        with _tts_suggest_lock:
+            entries = self._tts_suggest_index(website.id, self.env.lang or 'en_US').lookup(term, limit)
+
+        for kind, _record_id, name, sku, url in entries:
+            if kind == 'category':
+                result['categories'].append({'name': name, 'url': url})
+            else:
+                result['products'].append({'name': name, 'sku': sku, 'url': url})
+        return result
+
+    @api.model
+    def _tts_suggest_index(self, website_id, lang):
+        """
+        This worker's suggestion index of a website and language, brought up
+        to date with the catalog version (call with _tts_suggest_lock held).
+
+        Built once; after a catalog change only the products written since
+        the last sync are re-read and re-indexed, and the categories when one
+        of them changed. A product count that doesn't match the index (e.g.
+        deleted products) triggers a full rebuild.
+
+        :return: TTSSuggestIndex
+        """
+        Version = self.env['tts.cache.version']
+        version = Version._tts_get('catalog')
+        key = (self.env.cr.dbname, website_id, lang)
+        index = _tts_suggest_indexes.get(key)
+        if index is not None and index.version == version:
+            return index
+        if Version._tts_is_pending('catalog'):
+            # Uncommitted catalog changes in this transaction: keep them out
+            # of the shared index
+            return index or self._tts_suggest_sync(TTSSuggestIndex(), website_id, lang)
+
+        index = self._tts_suggest_sync(index or TTSSuggestIndex(), website_id, lang)
+        if index.counts['product'] != self._tts_suggest_products(website_id, lang, count=True):
+            index = self._tts_suggest_sync(TTSSuggestIndex(), website_id, lang)
+        index.version = version
+        _tts_suggest_indexes[key] = index
+        return index
+
+    @api.model
+    def _tts_suggest_products(self, website_id, lang, since=None, count=False):
+        """
+        Products for the suggestion index: the visible ones, or all those
+        written since `since` (visible or not), with the visibility domain.
+        """
+        Template = self.sudo().with_context(lang=lang, active_test=False)
+        visible_domain = [
+            ('active', '=', True),
+            ('is_published', '=', True),
+            ('sale_ok', '=', True),
+            ('website_id', 'in', [False, website_id]),
+        ]
+        if count:
+            return Template.search_count(visible_domain)
+        if since is None:
+            return Template.search(visible_domain), visible_domain
+        changed = Template.search([
+            '|', ('write_date', '>=', since), ('product_variant_ids.write_date', '>=', since),
+        ])
+        return changed, visible_domain
+
+    @api.model
+    def _tts_suggest_sync(self, index, website_id, lang):
+        """Re-index what changed since `index` was last synced (everything for a new index)."""
+        IrHttp = self.env['ir.http']
+        synced_at = self.env.cr.now()
+
+        since = index.synced_at - TTS_SUGGEST_SYNC_MARGIN if index.synced_at else None
+        products, visible_domain = self._tts_suggest_products(website_id, lang, since=since)
+        items = []
+        for product in products:
+            index.remove('product', product.id)
+            if since is not None and not product.filtered_domain(visible_domain):
+                continue
+            skus = [code for code in product.product_variant_ids.mapped('default_code') if code]
+            entry = (
+                'product', product.id, product.name, product.default_code or '',
+                f'/shop/{IrHttp._slug(product)}',
+            )
+            items.append((entry, tts_suggest_keys(product.name, skus)))
+
+        # Categories are few: re-index them all when any of them changed
+        Category = self.env['product.public.category'].sudo().with_context(lang=lang)
+        category_domain = [('website_id', 'in', [False, website_id])]
+        fingerprint = Category._read_group(category_domain, aggregates=['__count', 'write_date:max'])[0]
+        if fingerprint != index.category_fingerprint:
+            for category_id in index.record_ids('category'):
+                index.remove('category', category_id)
+            for category in Category.search(category_domain):
+                entry = ('category', category.id, category.name, '', f'/shop/category/{IrHttp._slug(category)}')
+                items.append((entry, tts_suggest_keys(category.name)))
+            index.category_fingerprint = fingerprint
+
+        index.add(items)
+        index.synced_at = synced_at
+        return index
+
+    def init(self):
+        super().init()
+        # product.template.name already has a trigram index (index='trigram')
+        if self.env.registry.has_trigram:
+            create_index(
+                self.env.cr, 'product_template_tts_default_code_trgm_index',
+                self._table, ['default_code gin_trgm_ops'], method='gin',
+            )
+
+    # -------------------------------------------------------------------------
+    # Cache versions (tts.cache.version)
+    # -------------------------------------------------------------------------
+
+    @api.model
+    def _tts_bump_cache_versions(self, fields):
+        """
+        Bump the cache versions that a write of `fields` invalidates: the
+        catalog, the stock buckets, or only what shop pages display. A write
+        of nothing (e.g. only touching write_date) invalidates nothing.
+        """
+        fields = set(fields)
+        topics = []
+        if fields & TTS_CATALOG_FIELDS:
+            topics.append('catalog')
+        elif fields - {'tts_stock_bucket'}:
+            topics.append('display')
+        if 'tts_stock_bucket' in fields:
+            topics.append('stock')
+        if topics:
+            self.env['tts.cache.version']._tts_bump(*topics)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['tts.cache.version']._tts_bump('catalog')
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if self:
+            self._tts_bump_cache_versions(vals)
+        if TTS_DISPLAY_PRICE_FIELDS.intersection(vals):
+            self.env['tts.product.display.price']._tts_schedule_refresh(templates=self)
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['tts.cache.version']._tts_bump('catalog')
+        return res
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+
+from odoo import api, models, tools
+
+# Lightweight, immutable rows for address form dropdowns.
+# Templates use them exactly like records: country.id, country.name
+CountryOption = namedtuple('CountryOption', ['id', 'name'])
+StateOption = namedtuple('StateOption', ['id', 'name', 'country_id'])
+
+# Fields the options are built from
+TTS_COUNTRY_OPTION_FIELDS = {'name'}
+TTS_STATE_OPTION_FIELDS = {'name', 'country_id'}
+
+
+class ResCountry(models.Model):
+    _inherit = 'res.country'
+
+    @api.model
+    def _get_tts_country_options(self):
+        """
+        Country options for address forms (checkout + portal).
+
+        Cached per worker process, language and country version, so address
+        pages don't search and read ~250 countries on every request.
+
+        :return: tuple of CountryOption(id, name)
+        """
+        version = self.env['tts.cache.version']._tts_get('country')
+        return self._tts_country_options(self.env.lang or 'en_US', version)
+
+    @tools.ormcache('lang', 'version')
+    def _tts_country_options(self, lang, version):
+        countries = self.sudo().with_context(lang=lang).search([])
+        return tuple(CountryOption(country.id, country.name) for country in countries)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['tts.cache.version']._tts_bump('country')
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if self and TTS_COUNTRY_OPTION_FIELDS.intersection(vals):
+            self.env['tts.cache.version']._tts_bump('country')
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['tts.cache.version']._tts_bump('country')
+        return res
+
+
+class ResCountryState(models.Model):
+    _inherit = 'res.country.state'
+
+    @api.model
+    def _get_tts_state_options(self, country_id=None):
+        """
+        State options for address forms (checkout + portal).
+
+        Same caching as res.country._get_tts_country_options().
+
+        :param country_id: optional res.country id to restrict the options to
+        :return: tuple of StateOption(id, name, country_id)
+        """
+        version = self.env['tts.cache.version']._tts_get('country')
+        states = self._tts_state_options(self.env.lang or 'en_US', version)
+        if country_id:
+            states = tuple(state for state in states if state.country_id == country_id)
+        return states
+
+    @tools.ormcache('lang', 'version')
+    def _tts_state_options(self, lang, version):
+        states = self.sudo().with_context(lang=lang).search([])
+        return tuple(StateOption(state.id, state.name, state.country_id.id) for state in states)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['tts.cache.version']._tts_bump('country')
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if self and TTS_STATE_OPTION_FIELDS.intersection(vals):
+            self.env['tts.cache.version']._tts_bump('country')
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['tts.cache.version']._tts_bump('country')
+        return res
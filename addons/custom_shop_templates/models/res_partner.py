@@ -1,5 +1,34 @@
 # -*- coding: utf-8 -*-
-from odoo import fields, models
+import hashlib
+import logging
+
+from odoo import api, fields, models, tools
+from odoo.tools.sql import create_index
+
+_logger = logging.getLogger(__name__)
+
+# Fields identifying an address (tts_address_hash); many2one fields as ids
+TTS_ADDRESS_FIELDS = ('name', 'street', 'street2', 'zip', 'city', 'state_id', 'country_id')
+
+# Fields address_get() walks the contact tree on; changing them changes the
+# default addresses of the tree (see _tts_mark_address_tree_changed)
+TTS_ADDRESS_TREE_FIELDS = {'type', 'parent_id', 'active', 'is_company'}
+
+# base.partner.merge.automatic.wizard refuses bigger merges for non-admins
+TTS_MERGE_BATCH_SIZE = 3
+
+
+def tts_address_hash(values):
+    """
+    Normalized hash of an address: case, extra spaces and empty values don't
+    matter. False when there is no address at all.
+
+    :param values: dict {field: value} for TTS_ADDRESS_FIELDS (ids for many2one)
+    """
+    parts = [' '.join(str(values.get(field) or '').split()).casefold() for field in TTS_ADDRESS_FIELDS]
+    if not any(parts[1:]):
+        return False
+    return hashlib.sha1('\x1f'.join(parts).encode()).hexdigest()
 
 
 class ResPartner(models.Model):
@@ -12,3 +41,203 @@ class ResPartner(models.Model):
         ('bank_transfer', 'Bank Transfer'),
         ('demo', 'Demo'),
     ], string='Preferred Payment Method', help='The preferred payment method for this customer')
+
+    # Indexed together with commercial_partner_id (see init), so checkout can
+    # find an existing delivery contact with the same address in one lookup
+    tts_address_hash = fields.Char(
+        string='Address Hash',
+        compute='_compute_tts_address_hash',
+        store=True,
+        copy=False,
+    )
+
+    @api.depends(*TTS_ADDRESS_FIELDS)
+    def _compute_tts_address_hash(self):
+        for partner in self:
+            partner.tts_address_hash = tts_address_hash({
+                field: partner[field].id if partner._fields[field].type == 'many2one' else partner[field]
+                for field in TTS_ADDRESS_FIELDS
+            })
+
+    def init(self):
+        super().init()
+        create_index(
+            self.env.cr, 'res_partner_tts_address_hash_index',
+            self._table, ['commercial_partner_id', 'tts_address_hash'],
+            where='tts_address_hash IS NOT NULL',
+        )
+
+    def _tts_find_delivery_address(self, values):
+        """
+        Existing delivery contact of this partner's company with the same
+        address as `values` (see tts_address_hash).
+
+        :return: res.partner record (empty if none)
+        """
+        self.ensure_one()
+        address_hash = tts_address_hash(values)
+        if not address_hash:
+            return self.browse()
+        return self.search([
+            ('commercial_partner_id', '=', self.commercial_partner_id.id),
+            ('tts_address_hash', '=', address_hash),
+            ('type', '=', 'delivery'),
+        ], order='id', limit=1)
+
+    def _tts_is_exclusive_to(self, order):
+        """
+        Whether this contact is a delivery address used by `order` only: no
+        other sale order refers to it and it is no user's partner, so it can
+        be edited in place without changing anyone else's address.
+        """
+        self.ensure_one()
+        partner = self.sudo().with_context(active_test=False)
+        if partner.type != 'delivery' or partner.user_ids or partner.child_ids:
+            return False
+        return not self.env['sale.order'].sudo().search_count([
+            ('id', '!=', order.id),
+            '|', '|',
+            ('partner_id', '=', partner.id),
+            ('partner_invoice_id', '=', partner.id),
+            ('partner_shipping_id', '=', partner.id),
+        ], limit=1)
+
+    def _tts_write_changed(self, vals):
+        """
+        write() only the values that differ from the current ones, so
+        re-submitting an unchanged address form doesn't touch the partner.
+
+        :return: True if something was written
+        """
+        self.ensure_one()
+        changed = {}
+        for name, value in vals.items():
+            field = self._fields[name]
+            current = self[name]
+            if field.type == 'many2one':
+                current, value = current.id or False, value or False
+            elif field.type in ('char', 'text'):
+                current, value = current or '', value or ''
+            if current != value:
+                changed[name] = value
+        if changed:
+            self.write(changed)
+        return bool(changed)
+
+    def _get_tts_default_addresses(self):
+        """
+        Default invoice and delivery addresses of this partner, i.e.
+        address_get(['invoice', 'delivery']), memoized.
+
+        address_get() walks the partner's descendants and ancestors; for big
+        company contact trees that is slow, and the portal addresses page and
+        checkout need it on every request. The result is cached per partner
+        and version of its contact tree (see _tts_address_tree_version).
+
+        A transaction that changed the tree (contact created, deleted or
+        changed on TTS_ADDRESS_TREE_FIELDS) calls address_get() directly
+        until it commits, so nothing is cached from uncommitted data.
+
+        :return: dict {'invoice': res.partner, 'delivery': res.partner}
+        """
+        self.ensure_one()
+        commercial_partner_id = self.commercial_partner_id.id
+        if commercial_partner_id in self.env.cr.precommit.data.get('tts_address_trees_changed', ()):
+            addresses = self.sudo().address_get(['invoice', 'delivery'])
+            invoice_id, delivery_id = addresses['invoice'], addresses['delivery']
+        else:
+            version = self._tts_address_tree_version(commercial_partner_id)
+            invoice_id, delivery_id = self._tts_default_address_ids(self.id, version)
+        return {'invoice': self.browse(invoice_id), 'delivery': self.browse(delivery_id)}
+
+    @api.model
+    def _tts_address_tree_version(self, commercial_partner_id):
+        """
+        Version of a contact tree: the latest write_date and the number of
+        contacts (archived ones included) under the commercial partner.
+
+        Read-only, with one aggregate over the indexed commercial_partner_id
+        column, once per tree and transaction. A contact created, written,
+        archived, moved to another tree or deleted changes it.
+        """
+        versions = self.env.cr.precommit.data.setdefault('tts_address_tree_versions', {})
+        if commercial_partner_id not in versions:
+            self.env.cr.execute("""
+                SELECT MAX(write_date), COUNT(*)
+                  FROM res_partner
+                 WHERE commercial_partner_id = %s
+            """, [commercial_partner_id])
+            versions[commercial_partner_id] = self.env.cr.fetchone()
+        return versions[commercial_partner_id]
+
+    def _tts_mark_address_tree_changed(self):
+        """Bypass the memoized default addresses of these partners' trees until commit."""
+        tree_ids = set(self.sudo().with_context(active_test=False).commercial_partner_id.ids)
+        if not tree_ids:
+            return
+        data = self.env.cr.precommit.data
+        data.setdefault('tts_address_trees_changed', set()).update(tree_ids)
+        versions = data.get('tts_address_tree_versions', {})
+        for tree_id in tree_ids:
+            versions.pop(tree_id, None)
+
+    @api.model
+    @tools.ormcache('partner_id', 'version')
+    def _tts_default_address_ids(self, partner_id, version):
+        addresses = self.sudo().browse(partner_id).address_get(['invoice', 'delivery'])
+        return addresses['invoice'], addresses['delivery']
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        partners = super().create(vals_list)
+        partners.filtered('parent_id')._tts_mark_address_tree_changed()
+        return partners
+
+    def write(self, vals):
+        tree_changed = bool(TTS_ADDRESS_TREE_FIELDS.intersection(vals))
+        if tree_changed:
+            # The tree a contact leaves changes too
+            self._tts_mark_address_tree_changed()
+        res = super().write(vals)
+        if tree_changed:
+            self._tts_mark_address_tree_changed()
+        return res
+
+    def unlink(self):
+        self._tts_mark_address_tree_changed()
+        res = super().unlink()
+        return res
+
+    @api.model
+    def _cron_tts_merge_duplicate_addresses(self):
+        """
+        Merge delivery contacts of the same company that have the same
+        address (left over from checkouts before addresses were reused).
+
+        The oldest contact is kept; orders, invoices, etc. of the others are
+        moved to it by Odoo's contact merge.
+        """
+        self.flush_model(['commercial_partner_id', 'tts_address_hash', 'type', 'active'])
+        self.env.cr.execute("""
+            SELECT ARRAY_AGG(id ORDER BY id)
+              FROM res_partner
+             WHERE type = 'delivery'
+               AND active
+               AND tts_address_hash IS NOT NULL
+          GROUP BY commercial_partner_id, tts_address_hash
+            HAVING COUNT(*) > 1
+        """)
+        groups = [row[0] for row in self.env.cr.fetchall()]
+
+        Merge = self.env['base.partner.merge.automatic.wizard']
+        merged = 0
+        for partner_ids in groups:
+            destination = self.browse(partner_ids[0])
+            duplicates = partner_ids[1:]
+            for start in range(0, len(duplicates), TTS_MERGE_BATCH_SIZE - 1):
+                batch = self.browse(duplicates[start:start + TTS_MERGE_BATCH_SIZE - 1])
+                Merge._merge((destination | batch).ids, destination, extra_checks=False)
+                merged += len(batch)
+
+        _logger.info("TTS: merged %s duplicate delivery addresses (%s groups)", merged, len(groups))
+        return merged
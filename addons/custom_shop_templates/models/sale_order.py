@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import hashlib
+
+from odoo import models
+
+
+class SaleOrder(models.Model):
+    _inherit = 'sale.order'
+
+    def _compute_partner_invoice_id(self):
+        # Website carts: memoized address_get() (res.partner._get_tts_default_addresses)
+        website_orders = self.filtered(lambda order: order.website_id and order.partner_id)
+        super(SaleOrder, self - website_orders)._compute_partner_invoice_id()
+        for order in website_orders:
+            order.partner_invoice_id = order.partner_id._get_tts_default_addresses()['invoice']
+
+    def _compute_partner_shipping_id(self):
+        website_orders = self.filtered(lambda order: order.website_id and order.partner_id)
+        super(SaleOrder, self - website_orders)._compute_partner_shipping_id()
+        for order in website_orders:
+            order.partner_shipping_id = order.partner_id._get_tts_default_addresses()['delivery']
+
+    def _get_tts_delivery_fingerprint(self):
+        """
+        Hash of everything a delivery rate depends on.
+
+        Used as the key of the checkout's delivery quote cache: any change to
+        the cart lines, quantities, shipping address or pricelist produces a
+        new fingerprint, so stale quotes are never reused.
+        """
+        self.ensure_one()
+        shipping = self.partner_shipping_id
+        lines = sorted(
+            (line.product_id.id, line.product_uom_qty)
+            for line in self.order_line
+            if not line.is_delivery
+        )
+        key = (
+            self.id, self.pricelist_id.id, self.currency_id.id, lines,
+            shipping.id, shipping.street, shipping.street2, shipping.zip,
+            shipping.city, shipping.country_id.id, shipping.state_id.id,
+        )
+        return hashlib.sha1(repr(key).encode()).hexdigest()
+
+    def _tts_cart_set_quantities(self, quantities):
+        """
+        Set the quantities of several cart lines in one pass (cart page
+        batched update, see TTSCheckout.cart_update_batch).
+
+        Lines are looked up in one dict instead of one _cart_update() (and
+        line search) per change. Each new quantity still goes through
+        _verify_updated_quantity() (stock and other limits) and the cart
+        line update hooks; lines set to 0 are deleted together. Nothing
+        reads the order totals in the loop, so they are recomputed once,
+        for all the lines, when they are next read.
+
+        :param quantities: dict {line id: new quantity}
+        :return: (updated lines, ids of the removed or unknown lines)
+        """
+        self.ensure_one()
+        order = self.with_company(self.company_id)
+        lines = {line.id: line for line in order.website_order_line}
+        updated = to_remove = order.order_line.browse()
+        unknown = []
+        for line_id, quantity in quantities.items():
+            line = lines.get(line_id)
+            if not line:
+                unknown.append(line_id)
+                continue
+            if quantity > 0:
+                quantity, _warning = order._verify_updated_quantity(line, line.product_id.id, quantity)
+            if quantity <= 0:
+                to_remove |= line
+                continue
+            update_values = order._prepare_order_line_update_values(line, quantity)
+            if update_values:
+                order._update_cart_line_values(line, update_values)
+            updated |= line
+        removed_ids = to_remove.ids + unknown
+        to_remove.unlink()
+        return updated, removed_ids
+
+    def _get_tts_portal_line_preview(self, limit=2):
+        """
+        First order lines and line count of every order in self.
+
+        Used by the /my/orders list, which shows the first `limit` lines of
+        each order plus a "+ N more" link. Loads a whole page of orders with
+        two queries instead of reloading order_line for every order.
+
+        :return: dict {order_id: {'lines': sale.order.line recordset, 'count': int}}
+        """
+        Line = self.env['sale.order.line'].sudo()
+        previews = {order_id: {'lines': Line.browse(), 'count': 0} for order_id in self.ids}
+        if not self:
+            return previews
+
+        for order, count in Line._read_group([('order_id', 'in', self.ids)], ['order_id'], ['__count']):
+            previews[order.id]['count'] = count
+
+        # First `limit` lines per order, in the same order as order.order_line
+        Line.flush_model(['order_id', 'sequence'])
+        self.env.cr.execute("""
+            SELECT id
+              FROM (
+                    SELECT id,
+                           ROW_NUMBER() OVER (PARTITION BY order_id ORDER BY sequence, id) AS position
+                      FROM sale_order_line
+                     WHERE order_id IN %s
+                   ) AS numbered
+             WHERE position <= %s
+        """, [tuple(self.ids), limit])
+        line_ids = [row[0] for row in self.env.cr.fetchall()]
+
+        # Browsing all lines at once shares one prefetch set (product_id, qty, ...)
+        for line in Line.browse(line_ids).sorted(lambda line: (line.sequence, line.id)):
+            previews[line.order_id.id]['lines'] |= line
+
+        return previews
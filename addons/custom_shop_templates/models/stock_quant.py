@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from odoo import api, models
+
+
+class StockQuant(models.Model):
+    _inherit = 'stock.quant'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        quants = super().create(vals_list)
+        quants.product_id.product_tmpl_id._tts_schedule_stock_bucket_update()
+        return quants
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'quantity' in vals or 'location_id' in vals or 'product_id' in vals:
+            self.product_id.product_tmpl_id._tts_schedule_stock_bucket_update()
+        return res
+
+    def unlink(self):
+        templates = self.product_id.product_tmpl_id
+        res = super().unlink()
+        templates._tts_schedule_stock_bucket_update()
+        return res
+
+
+class StockMove(models.Model):
+    _inherit = 'stock.move'
+
+    def _action_done(self, cancel_backorder=False):
+        # Done moves change on-hand quantities (quant updates are also caught
+        # above; both land in the same per-transaction update)
+        moves = super()._action_done(cancel_backorder=cancel_backorder)
+        moves.product_id.product_tmpl_id._tts_schedule_stock_bucket_update()
+        return moves
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import uuid
+
+from odoo import api, fields, models
+
+# Data the TTS caches are built from; each has its own version
+TTS_CACHE_TOPICS = (
+    'catalog',   # product/category visibility, names, SKUs, categories, related products
+    'stock',     # product.template.tts_stock_bucket
+    'display',   # anything else shown on shop pages (prices, sequences, descriptions, ...)
+    'country',   # countries and states (address forms)
+    'carrier',   # delivery carriers (checkout shipping step)
+    'payment',   # payment methods and providers (checkout payment step)
+)
+
+
+class TTSCacheVersion(models.Model):
+    """
+    Versions of the data behind the TTS caches, shared by all workers.
+
+    Memoized values (ormcache methods, the anonymous page cache, the search
+    suggestion index) carry the version of the data they are built from in
+    their key. A write bumps only the versions of what it changed, instead of
+    clearing the whole registry cache in every worker; entries of old
+    versions are no longer hit and age out of their LRU.
+
+    Versions are read transactionally, once per transaction, so a version
+    never goes with data from another snapshot. They are bumped in a short
+    transaction of their own after the commit of the change, which keeps the
+    row lock out of the writing transaction.
+    """
+    _name = 'tts.cache.version'
+    _description = 'TTS Cache Version'
+    _log_access = False
+
+    topic = fields.Char(required=True, readonly=True)
+    version = fields.Integer(default=0, readonly=True)
+
+    _sql_constraints = [
+        ('topic_unique', 'UNIQUE(topic)', 'One version per cache topic.'),
+    ]
+
+    def init(self):
+        super().init()
+        self.env.cr.execute("""
+            INSERT INTO tts_cache_version (topic, version)
+                 SELECT topic, 0 FROM unnest(%s::varchar[]) AS topic
+            ON CONFLICT (topic) DO NOTHING
+        """, [list(TTS_CACHE_TOPICS)])
+
+    @api.model
+    def _tts_get(self, topic):
+        """
+        Current version of a topic, for a cache key.
+
+        Read with one query per transaction. A transaction that changed the
+        topic gets a version of its own until it commits, so what it caches
+        from its uncommitted data is never served to anyone else.
+        """
+        data = self.env.cr.precommit.data
+        pending = data.get('tts_cache_version_pending', {})
+        if topic in pending:
+            return pending[topic]
+        if 'tts_cache_versions' not in data:
+            self.env.cr.execute("SELECT topic, version FROM tts_cache_version")
+            data['tts_cache_versions'] = dict(self.env.cr.fetchall())
+        return data['tts_cache_versions'].get(topic, 0)
+
+    @api.model
+    def _tts_is_pending(self, topic):
+        """Whether this transaction changed the topic (not committed yet)."""
+        return topic in self.env.cr.precommit.data.get('tts_cache_version_pending', {})
+
+    @api.model
+    def _tts_bump(self, *topics):
+        """Bump the versions of these topics once this transaction commits."""
+        pending = self.env.cr.precommit.data.setdefault('tts_cache_version_pending', {})
+        new_topics = [topic for topic in topics if topic not in pending]
+        if not new_topics:
+            return
+        if not pending:
+            # precommit data is dropped on commit and rollback, postcommit
+            # callbacks only run on commit: collect the topics here too
+            self.env.cr.postcommit.data.setdefault('tts_cache_version_bump', set())
+            self.env.cr.postcommit.add(self._tts_flush_bump)
+        for topic in new_topics:
+            pending[topic] = f'pending-{uuid.uuid4().hex}'
+        self.env.cr.postcommit.data['tts_cache_version_bump'].update(new_topics)
+
+    @api.model
+    def _tts_flush_bump(self):
+        topics = self.env.cr.postcommit.data.pop('tts_cache_version_bump', set())
+        if not topics:
+            return
+        with self.env.registry.cursor() as cr:
+            # READ COMMITTED: concurrent bumps queue on the row lock instead
+            # of failing with a serialization error
+            cr.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+            cr.execute("""
+                UPDATE tts_cache_version
+                   SET version = version + 1
+                 WHERE topic = ANY(%s)
+            """, [sorted(topics)])
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import re
+
+from markupsafe import Markup
+
+from odoo import models, tools
+from odoo.tools.misc import file_open
+
+_logger = logging.getLogger(__name__)
+
+# ir.config_parameter enabling the anonymous full-page cache ('1' = on)
+PAGE_CACHE_PARAM = 'custom_shop_templates.page_cache'
+
+# ir.config_parameter enabling keyset pagination on /shop ('1' = on)
+KEYSET_PAGINATION_PARAM = 'custom_shop_templates.keyset_pagination'
+
+# Output of scripts/build_images.py
+IMAGE_MANIFEST_PATH = 'custom_shop_templates/static/dist/img/manifest.json'
+IMAGE_SOURCE_URL = '/custom_shop_templates/static/src/img/'
+IMAGE_HASHED_URL = '/tts/img/'
+
+# Inlined in <head> by base_layout.xml
+CRITICAL_CSS_PATH = 'custom_shop_templates/static/src/css/critical.css'
+
+
+class Website(models.Model):
+    _inherit = 'website'
+
+    def _tts_page_cache_enabled(self):
+        """Full-page cache for anonymous /shop and product pages is opt-in."""
+        return self.env['ir.config_parameter'].sudo().get_param(PAGE_CACHE_PARAM) == '1'
+
+    def _tts_keyset_pagination_enabled(self):
+        """Keyset (?after=<id>) pagination of /shop is opt-in."""
+        return self.env['ir.config_parameter'].sudo().get_param(KEYSET_PAGINATION_PARAM) == '1'
+
+    @tools.ormcache()
+    def _tts_image_manifest(self):
+        """
+        Manifest of the built images (see scripts/build_images.py), read
+        once per registry. Empty if the images were never built.
+
+        :return: dict {source path: entry}
+        """
+        try:
+            with file_open(IMAGE_MANIFEST_PATH) as f:
+                return json.load(f)['images']
+        except FileNotFoundError:
+            return {}
+        except (ValueError, KeyError):
+            _logger.warning("TTS: invalid image manifest %s, serving original images", IMAGE_MANIFEST_PATH)
+            return {}
+
+    def _get_tts_image(self, path):
+        """
+        URLs of an image of static/src/img, for the tts_picture template.
+
+        Built images get their content-hashed URL (cached forever by
+        browsers), a srcset and AVIF/WebP <source>s; others keep their
+        static/src URL.
+
+        :param path: path relative to static/src/img, e.g. 'footer/team-photo.png'
+        :return: dict with src, srcset, sources [{type, srcset}], width, height
+        """
+        entry = self._tts_image_manifest().get(path)
+        if not entry:
+            return {'src': IMAGE_SOURCE_URL + path, 'srcset': '', 'sources': [], 'width': None, 'height': None}
+
+        def srcset(variants):
+            return ', '.join(f'{IMAGE_HASHED_URL}{name} {width}w' for name, width in variants)
+
+        variants = entry['variants']
+        fallback_type = next((mimetype for mimetype in variants if mimetype not in ('image/avif', 'image/webp')), None)
+        return {
+            'src': IMAGE_HASHED_URL + entry['src'],
+            'srcset': srcset(variants[fallback_type]) if fallback_type else '',
+            'sources': [
+                {'type': mimetype, 'srcset': srcset(variants[mimetype])}
+                for mimetype in ('image/avif', 'image/webp') if variants.get(mimetype)
+            ],
+            'width': entry.get('width'),
+            'height': entry.get('height'),
+        }
+
+    def _get_tts_image_url(self, path):
+        """Best single URL of an image of static/src/img (e.g. for CSS masks)."""
+        return self._get_tts_image(path)['src']
+
+    @tools.ormcache()
+    def _tts_critical_css(self):
+        """
+        Critical CSS inlined in the <head> of website.layout pages (page
+        background, header), read once per registry with comments and
+        whitespace stripped.
+        """
+        with file_open(CRITICAL_CSS_PATH) as f:
+            css = f.read()
+        css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+        return Markup(' '.join(css.split()))
@@ -0,0 +1,742 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load test of the shop and checkout funnel, against a local Odoo.
+
+    python3 scripts/benchmark.py seed --db bench [--create-db --master-password PASSWORD]
+        [--products 1000] [--variants 3] [--categories 20] [--stock 25]
+        [--customers 50] [--orders 2]
+    python3 scripts/benchmark.py run --db bench [--users 10] [--anonymous 5]
+        [--duration 60] [--save-baseline FILE] [--baseline FILE]
+    python3 scripts/benchmark.py search --db bench [--repeat 20]
+    python3 scripts/benchmark.py grid --db bench [--ppg 20 60 120] [--repeat 20]
+
+seed fills a database with a synthetic catalog (published products with
+variants, public categories, on-hand stock) and portal customers
+bench001@example.com, bench002@example.com, ... (password --customer-password)
+with a few confirmed orders each. --create-db creates the database first and
+installs custom_shop_templates. A database that was already seeded is left
+alone: use a new one.
+
+run starts --users logged-in customers and --anonymous visitors, each in its
+own thread and session, for --duration seconds. Customers go through the
+whole funnel in a loop:
+
+    /shop, /shop/page/2, a category, a product, add to cart, /shop/cart,
+    the four checkout steps (address, shipping, payment, notes; each shown,
+    then submitted through /shop/checkout/step like checkout_steps.js),
+    /my, /my/orders, /my/addresses, /my/account, /my/payment_method
+
+The order is never confirmed, so runs can be repeated on the same data.
+Anonymous visitors only browse /shop and product pages.
+
+search measures the /shop Name/SKU search on the seeded catalog, one
+request at a time: an exact SKU, a SKU prefix, a name word, a term matching
+every product (ranked, sorted, and deeper pages), --repeat times each. Seed
+one database per catalog size to compare them, e.g. for 10k, 100k and 1M
+products: seed --products 10000 --variants 1 --stock 0 --customers 0 (the
+same with 100000 and 1000000). Leave the page cache off.
+
+grid measures the /shop product grid at each --ppg page size (products per
+page) the same way, with the QWeb render time of the page.
+
+The report shows throughput, p50/p95/p99 latency and errors per page, and
+SQL queries per request of each server route, read from /tts/metrics
+before and after the run. Every worker keeps its own metrics, so start Odoo
+with --workers=0 (or few workers: /tts/metrics is scraped several times to
+reach each of them); pass the custom_shop_templates.metrics_token system
+parameter with --metrics-token. --save-baseline stores the results as JSON;
+--baseline compares with such a file, and --max-regression makes the
+command fail when a p95 got slower by more than that percentage.
+
+Only talks to the given Odoo server (default http://localhost:8069), and
+uses the standard library only.
+"""
+
+import argparse
+import collections
+import http.cookiejar
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+BATCH_SIZE = 200
+
+CUSTOMER_LOGIN = 'bench{:03d}@example.com'
+PRODUCT_CODE = 'BENCH-{:05d}'
+
+ACCOUNT_PAGES = ('/my', '/my/orders', '/my/addresses', '/my/account', '/my/payment_method')
+
+METRIC_LINE_RE = re.compile(
+    r'^tts_route_(sql_queries|sql_seconds|render_seconds)_(sum|count)\{route="([^"]+)",pid="(\d+)"\} ([0-9.eE+-]+)$', re.M
+)
+
+
+# =======================================================================
+# SEED
+# =======================================================================
+
+class Rpc:
+    """JSON-RPC client of the external API (/jsonrpc)."""
+
+    def __init__(self, base_url, db):
+        self.url = base_url.rstrip('/') + '/jsonrpc'
+        self.db = db
+        self.uid = None
+        self.password = None
+
+    def call(self, service, method, *args):
+        data = json.dumps({'jsonrpc': '2.0', 'method': 'call', 'params': {
+            'service': service, 'method': method, 'args': args,
+        }}).encode()
+        request = urllib.request.Request(self.url, data=data, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request) as response:
+            result = json.load(response)
+        if result.get('error'):
+            error = result['error']
+            raise RuntimeError((error.get('data') or {}).get('message') or error.get('message'))
+        return result.get('result')
+
+    def login(self, login, password):
+        self.uid = self.call('common', 'login', self.db, login, password)
+        self.password = password
+        if not self.uid:
+            raise SystemExit(f'Cannot log in to {self.db} as {login}')
+
+    def __call__(self, model, method, *args, **kwargs):
+        return self.call('object', 'execute_kw', self.db, self.uid, self.password, model, method, list(args), kwargs)
+
+    def create(self, model, vals_list, context=None):
+        """Create records by batches of BATCH_SIZE, :return: ids"""
+        ids = []
+        for start in range(0, len(vals_list), BATCH_SIZE):
+            ids += self(model, 'create', vals_list[start:start + BATCH_SIZE], context=context or {})
+        return ids
+
+
+def create_database(rpc, args):
+    print(f'Creating database {args.db} and installing custom_shop_templates...')
+    rpc.call('db', 'create_database', args.master_password, args.db, False, 'en_US',
+             args.admin_password, args.admin_login, args.country)
+    rpc.login(args.admin_login, args.admin_password)
+    module_ids = rpc('ir.module.module', 'search', [('name', '=', 'custom_shop_templates')])
+    if not module_ids:
+        raise SystemExit('custom_shop_templates is not in the addons path of the server')
+    rpc('ir.module.module', 'button_immediate_install', module_ids)
+
+
+def seed_categories(rpc, count):
+    """Public categories, one top-level category per 5, :return: ids"""
+    category_ids = []
+    parent_id = False
+    for index in range(count):
+        parent = parent_id if index % 5 else False
+        category_ids += rpc.create('product.public.category', [{
+            'name': f'Bench Category {index + 1:02d}',
+            'parent_id': parent,
+            'sequence': index,
+        }])
+        if not index % 5:
+            parent_id = category_ids[-1]
+    return category_ids
+
+
+def seed_products(rpc, rng, args, category_ids):
+    """Published templates (with --variants sizes each), :return: template ids"""
+    value_ids = []
+    if args.variants > 1:
+        attribute_id = rpc.create('product.attribute', [{
+            'name': 'Bench Size',
+            'create_variant': 'always',
+            'value_ids': [(0, 0, {'name': f'Size {index + 1}', 'sequence': index}) for index in range(args.variants)],
+        }])[0]
+        value_ids = rpc('product.attribute.value', 'search', [('attribute_id', '=', attribute_id)])
+
+    template_fields = rpc('product.template', 'fields_get', attributes=['type'])
+    vals_list = []
+    for index in range(args.products):
+        list_price = round(rng.uniform(5, 500), 2)
+        vals = {
+            'name': f'Bench Product {index + 1:05d}',
+            'default_code': PRODUCT_CODE.format(index + 1),
+            'list_price': list_price,
+            'type': 'consu',
+            'is_published': True,
+            'public_categ_ids': [(6, 0, [rng.choice(category_ids)])] if category_ids else [],
+            'description_sale': f'Synthetic product {index + 1} for load tests.',
+        }
+        if 'is_storable' in template_fields:
+            vals['is_storable'] = True
+        if 'compare_list_price' in template_fields and rng.random() < 0.3:
+            vals['compare_list_price'] = round(list_price * rng.uniform(1.1, 1.5), 2)
+        if value_ids:
+            vals['attribute_line_ids'] = [(0, 0, {'attribute_id': attribute_id, 'value_ids': [(6, 0, value_ids)]})]
+        vals_list.append(vals)
+    return rpc.create('product.template', vals_list)
+
+
+def seed_stock(rpc, rng, args, template_ids):
+    """On-hand quantities (0 to 2 * --stock) of every variant in the main warehouse."""
+    warehouse = rpc('stock.warehouse', 'search_read', [], fields=['lot_stock_id'], limit=1)
+    if not warehouse:
+        print('No warehouse: skipping stock')
+        return
+    location_id = warehouse[0]['lot_stock_id'][0]
+    product_ids = rpc('product.product', 'search', [('product_tmpl_id', 'in', template_ids)])
+    quant_ids = rpc.create('stock.quant', [
+        {'product_id': product_id, 'location_id': location_id, 'inventory_quantity': rng.randint(0, args.stock * 2)}
+        for product_id in product_ids
+    ], context={'inventory_mode': True})
+    for start in range(0, len(quant_ids), BATCH_SIZE):
+        rpc('stock.quant', 'action_apply_inventory', quant_ids[start:start + BATCH_SIZE])
+
+
+def seed_customers(rpc, rng, args, template_ids):
+    """Portal users with an address and --orders confirmed orders each."""
+    country_ids = rpc('res.country', 'search', [('code', '=', args.country)], limit=1)
+    portal_group = rpc('ir.model.data', 'search_read',
+                       [('module', '=', 'base'), ('name', '=', 'group_portal')], fields=['res_id'], limit=1)
+    user_ids = rpc.create('res.users', [{
+        'name': f'Bench Customer {index + 1:03d}',
+        'login': CUSTOMER_LOGIN.format(index + 1),
+        'email': CUSTOMER_LOGIN.format(index + 1),
+        'password': args.customer_password,
+        'groups_id': [(6, 0, [portal_group[0]['res_id']])],
+        'street': f'{index + 1} Benchmark Street',
+        'city': 'Testville',
+        'zip': f'{10000 + index}',
+        'country_id': country_ids[0] if country_ids else False,
+        'phone': f'+49 30 {1000000 + index}',
+    } for index in range(args.customers)], context={'no_reset_password': True})
+
+    if not args.orders:
+        return
+    partners = rpc('res.users', 'read', user_ids, ['partner_id'])
+    product_ids = rpc('product.product', 'search', [('product_tmpl_id', 'in', template_ids)])
+    order_ids = rpc.create('sale.order', [{
+        'partner_id': partner['partner_id'][0],
+        'order_line': [
+            (0, 0, {'product_id': product_id, 'product_uom_qty': rng.randint(1, 3)})
+            for product_id in rng.sample(product_ids, min(3, len(product_ids)))
+        ],
+    } for partner in partners for _order in range(args.orders)])
+    for start in range(0, len(order_ids), BATCH_SIZE):
+        rpc('sale.order', 'action_confirm', order_ids[start:start + BATCH_SIZE])
+
+
+def seed(args):
+    rng = random.Random(args.seed)
+    rpc = Rpc(args.url, args.db)
+    if args.create_db:
+        if not args.master_password:
+            raise SystemExit('--create-db needs --master-password')
+        create_database(rpc, args)
+    else:
+        rpc.login(args.admin_login, args.admin_password)
+
+    existing = rpc('product.template', 'search_count', [('default_code', '=like', 'BENCH-%')])
+    if existing:
+        print(f'{args.db} already holds {existing} benchmark products: seed a new database instead')
+        return 1
+
+    started_at = time.perf_counter()
+    category_ids = seed_categories(rpc, args.categories)
+    print(f'{len(category_ids)} categories')
+    template_ids = seed_products(rpc, rng, args, category_ids)
+    print(f'{len(template_ids)} products')
+    if args.stock:
+        seed_stock(rpc, rng, args, template_ids)
+        print('stock set')
+    seed_customers(rpc, rng, args, template_ids)
+    print(f'{args.customers} customers ({CUSTOMER_LOGIN.format(1)}, ...), {args.orders} orders each')
+    print(f'Seeded {args.db} in {time.perf_counter() - started_at:.0f} s')
+    return 0
+
+
+# =======================================================================
+# RUN
+# =======================================================================
+
+SEARCH_CASES = (
+    ('exact SKU', '/shop?search=' + PRODUCT_CODE.format(1)),
+    ('SKU prefix', '/shop?search=BENCH-0000'),
+    ('name word', '/shop?search=Product+0001'),
+    ('all products', '/shop?search=Bench'),
+    ('all products, by name', '/shop?search=Bench&order=name+asc'),
+    ('all products, page 2', '/shop/page/2?search=Bench'),
+    ('all products, page 50', '/shop/page/50?search=Bench'),
+)
+
+RESULTS_RANGE_RE = re.compile(rb' to </span>\s*<span[^>]*>(\d+)</span>\s*<span[^>]*> \(of </span>\s*<span[^>]*>(\d+)</span>')
+
+class Recorder:
+    """Latencies and errors per page, shared by the user threads."""
+
+    def __init__(self):
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.Counter()
+        self.journeys = 0
+        self.recording = False
+        self._lock = threading.Lock()
+
+    def add(self, label, seconds, error=None):
+        if not self.recording:
+            return
+        with self._lock:
+            self.latencies[label].append(seconds)
+            if error:
+                self.errors[label] += 1
+
+    def add_journey(self):
+        if self.recording:
+            with self._lock:
+                self.journeys += 1
+
+
+class Client:
+    """One simulated visitor: its own cookies (session, cart)."""
+
+    def __init__(self, base_url, db, recorder):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        if db:
+            self.get(None, f'/web?db={urllib.parse.quote(db)}')
+
+    def _open(self, label, request, expect_path=None):
+        """:return: (final path, body), (None, b'') on errors"""
+        started_at = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                body = response.read()
+                final_path = urllib.parse.urlparse(response.geturl()).path
+        except (urllib.error.URLError, OSError) as e:
+            if label:
+                self.recorder.add(label, time.perf_counter() - started_at, error=str(e))
+            return None, b''
+        # A checkout step that redirects (to the cart, to a previous step) is a failed step
+        error = expect_path and final_path != expect_path
+        if label:
+            self.recorder.add(label, time.perf_counter() - started_at, error=error)
+        return final_path, body
+
+    def get(self, label, path, expect_path=None):
+        return self._open(label, self.base_url + path, expect_path)[1]
+
+    def json_call(self, label, path, params):
+        data = json.dumps({'jsonrpc': '2.0', 'method': 'call', 'params': params}).encode()
+        request = urllib.request.Request(self.base_url + path, data=data, headers={'Content-Type': 'application/json'})
+        started_at = time.perf_counter()
+        _path, body = self._open(None, request)
+        try:
+            result = json.loads(body)
+        except ValueError:
+            result = {'error': 'invalid response'}
+        if label:
+            self.recorder.add(label, time.perf_counter() - started_at, error=result.get('error'))
+        return result.get('result')
+
+
+def parse_catalog(client):
+    """Product and category URLs listed on /shop."""
+    body = client.get(None, '/shop').decode('utf-8', 'replace')
+    products = sorted(set(re.findall(r'href="(/shop/(?:[\w-]+/)?[\w-]+-\d+)"', body)))
+    categories = sorted(set(re.findall(r'href="(/shop/category/[\w-]+-\d+)"', body)))
+    # Category links also match the product pattern
+    products = [path for path in products if not path.startswith('/shop/category/')]
+    return products, categories
+
+
+def first_value(body, name):
+    """Value of the first input/option named `name` (selected option first)."""
+    select = re.search(rb'<select[^>]*name="' + name.encode() + rb'".*?</select>', body, re.S)
+    if select:
+        match = (re.search(rb'value="(\d+)"[^>]*selected', select.group(0))
+                 or re.search(rb'value="(\d+)"', select.group(0)))
+    else:
+        match = (re.search(rb'name="' + name.encode() + rb'"[^>]*value="(\d+)"', body)
+                 or re.search(rb'value="(\d+)"[^>]*name="' + name.encode() + rb'"', body))
+    return int(match.group(1)) if match else None
+
+
+def browse(client, rng, products, categories):
+    """Listing, a category, a product; :return: the product page"""
+    client.get('GET /shop', '/shop')
+    client.get('GET /shop/page/2', '/shop/page/2')
+    if categories:
+        client.get('GET /shop/category', rng.choice(categories))
+    return client.get('GET /shop/<product>', rng.choice(products))
+
+
+def checkout(client, index):
+    """The four checkout steps: each page, then its submission."""
+    def submit(step, data):
+        client.json_call(f'POST /shop/checkout/step ({step})', '/shop/checkout/step', {'step': step, 'data': data})
+
+    page = client.get('GET /shop/checkout?step=address', '/shop/checkout?step=address', expect_path='/shop/checkout')
+    submit('address', {
+        'billing_first_name': 'Bench',
+        'billing_last_name': f'Customer {index:03d}',
+        'billing_street': f'{index} Benchmark Street',
+        'billing_city': 'Testville',
+        'billing_zip': f'{10000 + index}',
+        'billing_country_id': first_value(page, 'billing_country_id') or '',
+        'phone': f'+49 30 {1000000 + index}',
+        'shipping_same': '1',
+    })
+    page = client.get('GET /shop/checkout?step=shipping', '/shop/checkout?step=shipping', expect_path='/shop/checkout')
+    submit('shipping', {'carrier_id': first_value(page, 'carrier_id') or 0})
+    page = client.get('GET /shop/payment', '/shop/payment', expect_path='/shop/payment')
+    submit('payment', {'payment_method_id': first_value(page, 'payment_method_id') or 0})
+    client.get('GET /shop/checkout/notes', '/shop/checkout/notes', expect_path='/shop/checkout/notes')
+
+
+def customer_user(args, recorder, index, stop, products, categories):
+    rng = random.Random(args.seed + index)
+    client = Client(args.url, args.db, recorder)
+    client.json_call(None, '/web/session/authenticate', {
+        'db': args.db, 'login': CUSTOMER_LOGIN.format(index), 'password': args.customer_password,
+    })
+    # A few products per customer, so the cart keeps a realistic size across loops
+    basket = rng.sample(products, min(3, len(products)))
+    while not stop.is_set():
+        product_page = browse(client, rng, basket, categories)
+        product_id = first_value(product_page, 'product_id')
+        if product_id:
+            client.json_call('POST /shop/cart/update_json', '/shop/cart/update_json',
+                             {'product_id': product_id, 'set_qty': rng.randint(1, 3)})
+        client.get('GET /shop/cart', '/shop/cart')
+        checkout(client, index)
+        for path in ACCOUNT_PAGES:
+            client.get(f'GET {path}', path)
+        recorder.add_journey()
+        if args.think:
+            stop.wait(args.think / 1000)
+
+
+def anonymous_user(args, recorder, index, stop, products, categories):
+    rng = random.Random(args.seed + 1000 + index)
+    client = Client(args.url, args.db, recorder)
+    while not stop.is_set():
+        browse(client, rng, products, categories)
+        recorder.add_journey()
+        if args.think:
+            stop.wait(args.think / 1000)
+
+
+def scrape_sql_metrics(args):
+    """
+    SQL sums and counts per (route, worker pid) from /tts/metrics, scraped
+    --metrics-scrapes times to reach several workers.
+
+    :return: {pid: {route: {'sql_queries_sum', 'sql_queries_count', 'sql_seconds_sum', ...}}}
+    """
+    if not args.metrics_token:
+        return {}
+    workers = {}
+    metrics_request = urllib.request.Request(
+        args.url.rstrip('/') + '/tts/metrics',
+        headers={'Authorization': f'Bearer {args.metrics_token}'},
+    )
+    for _scrape in range(args.metrics_scrapes):
+        try:
+            with urllib.request.urlopen(metrics_request, timeout=10) as response:
+                text = response.read().decode()
+        except (urllib.error.URLError, OSError):
+            return {}
+        for metric, kind, route, pid, value in METRIC_LINE_RE.findall(text):
+            workers.setdefault(pid, {}).setdefault(route, {})[f'{metric}_{kind}'] = float(value)
+    return workers
+
+
+def sql_per_route(before, after):
+    """Mean SQL queries, SQL time and render time per request of each route during the run."""
+    totals = collections.defaultdict(lambda: collections.Counter())
+    for pid, routes in after.items():
+        for route, values in routes.items():
+            previous = before.get(pid, {}).get(route, {})
+            for key, value in values.items():
+                totals[route][key] += value - previous.get(key, 0)
+    return {
+        route: {
+            'requests': int(values['sql_queries_count']),
+            'queries': values['sql_queries_sum'] / values['sql_queries_count'],
+            'sql_ms': values['sql_seconds_sum'] / values['sql_seconds_count'] * 1000,
+            'render_ms': (values['render_seconds_sum'] / values['render_seconds_count'] * 1000
+                          if values['render_seconds_count'] else None),
+        }
+        for route, values in sorted(totals.items()) if values['sql_queries_count'] > 0
+    }
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of a sorted list."""
+    return sorted_values[max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(recorder, elapsed):
+    pages = {}
+    for label, latencies in sorted(recorder.latencies.items()):
+        latencies = sorted(latencies)
+        pages[label] = {
+            'requests': len(latencies),
+            'errors': recorder.errors[label],
+            'rps': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+        }
+    total = sum(page['requests'] for page in pages.values())
+    return {
+        'duration_s': elapsed,
+        'requests': total,
+        'errors': sum(page['errors'] for page in pages.values()),
+        'rps': total / elapsed,
+        'journeys': recorder.journeys,
+        'pages': pages,
+    }
+
+
+def measure_pages(args, cases, inspect=None):
+    """
+    --repeat sequential GETs of each (label, path) by one anonymous visitor,
+    after an unmeasured one, with the SQL queries per request of the route
+    from /tts/metrics.
+
+    :param inspect: function(body of the unmeasured request) -> dict, added
+                    to the results of the page
+    :return: {label: {'path', 'requests', 'errors', 'p50_ms', 'p95_ms',
+             'queries', 'sql_ms', 'render_ms', ...}}
+    """
+    recorder = Recorder()
+    client = Client(args.url, args.db, recorder)
+    results = {}
+    for label, path in cases:
+        body = client.get(None, path)
+        sql_before = scrape_sql_metrics(args)
+        recorder.recording = True
+        for _request in range(args.repeat):
+            client.get(label, path)
+        recorder.recording = False
+        # One visitor, one page at a time: the route with requests is this page's
+        routes = sql_per_route(sql_before, scrape_sql_metrics(args)).values()
+        sql = max(routes, key=lambda route: route['requests'], default={})
+        latencies = sorted(recorder.latencies[label])
+        results[label] = {
+            'path': path,
+            'requests': len(latencies),
+            'errors': recorder.errors[label],
+            'p50_ms': percentile(latencies, 50) * 1000 if latencies else None,
+            'p95_ms': percentile(latencies, 95) * 1000 if latencies else None,
+            'queries': sql.get('queries'),
+            'sql_ms': sql.get('sql_ms'),
+            'render_ms': sql.get('render_ms'),
+            **(inspect(body) if inspect else {}),
+        }
+    return results
+
+
+def results_range(body):
+    """Products shown and total of "Showing X to Y (of Z)" on a /shop page."""
+    match = RESULTS_RANGE_RE.search(body)
+    return {'shown': int(match.group(1)), 'total': int(match.group(2))} if match else {}
+
+
+def print_pages(results, columns=()):
+    """Table of measure_pages() results, plus `columns` [(key, header)]."""
+    def number(value, digits=0):
+        return '-' if value is None else f'{value:.{digits}f}'
+
+    print(f'\n{"page":24} {"reqs":>5} {"err":>4} {"p50 ms":>8} {"p95 ms":>8} {"queries":>8} {"SQL ms":>8} {"QWeb ms":>8}'
+          + ''.join(f' {header:>8}' for _key, header in columns) + '  path')
+    for label, page in results.items():
+        print(f'{label:24} {page["requests"]:5} {page["errors"]:4} {number(page["p50_ms"]):>8} '
+              f'{number(page["p95_ms"]):>8} {number(page["queries"], 1):>8} {number(page["sql_ms"], 1):>8} '
+              f'{number(page["render_ms"], 1):>8}'
+              + ''.join(f' {number(page.get(key)):>8}' for key, _header in columns) + f'  {page["path"]}')
+    if all(page['queries'] is None for page in results.values()):
+        print('\nNo SQL counts: /tts/metrics unreachable (set --metrics-token to the custom_shop_templates.metrics_token system parameter)')
+
+
+def run(args):
+    anonymous = Client(args.url, args.db, Recorder())
+    products, categories = parse_catalog(anonymous)
+    if not products:
+        raise SystemExit('No product links on /shop: seed the database first')
+
+    recorder = Recorder()
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=customer_user, args=(args, recorder, index + 1, stop, products, categories), daemon=True)
+        for index in range(args.users)
+    ] + [
+        threading.Thread(target=anonymous_user, args=(args, recorder, index, stop, products, categories), daemon=True)
+        for index in range(args.anonymous)
+    ]
+    print(f'{args.users} customers, {args.anonymous} anonymous visitors, '
+          f'{len(products)} products: warming up {args.warmup} s, then measuring {args.duration} s', file=sys.stderr)
+    for thread in threads:
+        thread.start()
+    time.sleep(args.warmup)
+
+    sql_before = scrape_sql_metrics(args)
+    recorder.recording = True
+    started_at = time.perf_counter()
+    time.sleep(args.duration)
+    recorder.recording = False
+    elapsed = time.perf_counter() - started_at
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=60)
+
+    results = summarize(recorder, elapsed)
+    results['sql'] = sql_per_route(sql_before, scrape_sql_metrics(args))
+    results['config'] = {
+        'users': args.users, 'anonymous': args.anonymous, 'duration': args.duration, 'think_ms': args.think,
+    }
+    return results
+
+
+def delta(current, previous):
+    if not previous:
+        return ''
+    return f'{(current - previous) / previous * 100:+.0f}%'
+
+
+def print_report(results, baseline):
+    base_pages = baseline.get('pages', {}) if baseline else {}
+    base_sql = baseline.get('sql', {}) if baseline else {}
+    print(f'\n{results["requests"]} requests in {results["duration_s"]:.0f} s: '
+          f'{results["rps"]:.1f} req/s, {results["journeys"]} journeys, {results["errors"]} errors'
+          + (f'  (baseline {baseline["rps"]:.1f} req/s, {delta(results["rps"], baseline["rps"])})' if baseline else ''))
+
+    print(f'\n{"page":44} {"reqs":>6} {"err":>4} {"req/s":>7} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}'
+          + ('   vs baseline p50/p95/p99' if baseline else ''))
+    for label, page in results['pages'].items():
+        line = (f'{label:44} {page["requests"]:6} {page["errors"]:4} {page["rps"]:7.1f} '
+                f'{page["p50_ms"]:8.0f} {page["p95_ms"]:8.0f} {page["p99_ms"]:8.0f}')
+        previous = base_pages.get(label)
+        if previous:
+            line += '   ' + ' / '.join(
+                delta(page[key], previous[key]) or '-' for key in ('p50_ms', 'p95_ms', 'p99_ms')
+            )
+        print(line)
+
+    if not results['sql']:
+        print('\nNo SQL counts: /tts/metrics unreachable (set --metrics-token to the custom_shop_templates.metrics_token system parameter)')
+        return
+    print(f'\n{"server route":44} {"reqs":>6} {"queries":>8} {"SQL ms":>8}' + ('   vs baseline' if baseline else ''))
+    for route, sql in results['sql'].items():
+        line = f'{route:44} {sql["requests"]:6} {sql["queries"]:8.1f} {sql["sql_ms"]:8.1f}'
+        previous = base_sql.get(route)
+        if previous:
+            line += f'   {sql["queries"] - previous["queries"]:+.1f} queries'
+        print(line)
+
+
+def regressions(results, baseline, max_regression):
+    """Pages whose p95 got slower than the baseline by more than max_regression %."""
+    return [
+        label for label, page in results['pages'].items()
+        if label in baseline.get('pages', {})
+        and page['p95_ms'] > baseline['pages'][label]['p95_ms'] * (1 + max_regression / 100)
+    ]
+
+
+def add_metrics_arguments(parser):
+    parser.add_argument('--metrics-token', help='custom_shop_templates.metrics_token system parameter, to read the SQL counts')
+    parser.add_argument('--metrics-scrapes', type=int, default=10, help='scrapes of /tts/metrics, to reach each worker (default: %(default)s)')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('--url', default='http://localhost:8069', help='Odoo base URL (default: %(default)s)')
+    parser.add_argument('--db', required=True, help='benchmark database')
+    parser.add_argument('--customer-password', default='bench', help='password of the seeded customers (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed (default: %(default)s)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = commands.add_parser('seed', help='create the synthetic catalog and customers')
+    seed_parser.add_argument('--admin-login', default='admin', help='(default: %(default)s)')
+    seed_parser.add_argument('--admin-password', default='admin', help='(default: %(default)s)')
+    seed_parser.add_argument('--create-db', action='store_true', help='create --db and install custom_shop_templates first')
+    seed_parser.add_argument('--master-password', help='database manager password, for --create-db')
+    seed_parser.add_argument('--country', default='DE', help='country code of the company and customers (default: %(default)s)')
+    seed_parser.add_argument('--products', type=int, default=1000, help='product templates (default: %(default)s)')
+    seed_parser.add_argument('--variants', type=int, default=3, help='variants per product (default: %(default)s)')
+    seed_parser.add_argument('--categories', type=int, default=20, help='public categories (default: %(default)s)')
+    seed_parser.add_argument('--stock', type=int, default=25, help='mean on-hand quantity per variant, 0 for none (default: %(default)s)')
+    seed_parser.add_argument('--customers', type=int, default=50, help='portal customers (default: %(default)s)')
+    seed_parser.add_argument('--orders', type=int, default=2, help='confirmed orders per customer (default: %(default)s)')
+
+    run_parser = commands.add_parser('run', help='load the funnel and report latencies and SQL counts')
+    run_parser.add_argument('--users', type=int, default=10, help='concurrent customers, at most the seeded count (default: %(default)s)')
+    run_parser.add_argument('--anonymous', type=int, default=5, help='concurrent anonymous visitors (default: %(default)s)')
+    run_parser.add_argument('--duration', type=float, default=60, help='measured seconds (default: %(default)s)')
+    run_parser.add_argument('--warmup', type=float, default=10, help='unmeasured seconds first (default: %(default)s)')
+    run_parser.add_argument('--think', type=float, default=0, help='pause between journeys, in ms (default: %(default)s)')
+    add_metrics_arguments(run_parser)
+    run_parser.add_argument('--save-baseline', metavar='FILE', help='store the results as the baseline')
+    run_parser.add_argument('--baseline', metavar='FILE', help='compare with a stored baseline')
+    run_parser.add_argument('--max-regression', type=float, metavar='PERCENT',
+                            help='with --baseline, fail if a page p95 is slower by more than PERCENT')
+    run_parser.add_argument('--json', action='store_true', help='print the results as JSON')
+
+    search_parser = commands.add_parser('search', help='measure the /shop search on the seeded catalog')
+    search_parser.add_argument('--repeat', type=int, default=20, help='measured requests per search (default: %(default)s)')
+    add_metrics_arguments(search_parser)
+    search_parser.add_argument('--json', action='store_true', help='print the results as JSON')
+
+    grid_parser = commands.add_parser('grid', help='measure the /shop grid at several page sizes')
+    grid_parser.add_argument('--ppg', type=int, nargs='+', default=[20, 60, 120],
+                             help='products per page to compare (default: %(default)s)')
+    grid_parser.add_argument('--repeat', type=int, default=20, help='measured requests per page size (default: %(default)s)')
+    add_metrics_arguments(grid_parser)
+    grid_parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args(argv)
+
+    if args.command == 'seed':
+        return seed(args)
+    if args.command in ('search', 'grid'):
+        if args.command == 'search':
+            results = measure_pages(args, SEARCH_CASES, inspect=results_range)
+        else:
+            results = measure_pages(args, [(f'ppg={ppg}', f'/shop?ppg={ppg}') for ppg in args.ppg], inspect=results_range)
+        if args.json:
+            json.dump(results, sys.stdout, indent=1)
+            print()
+        else:
+            print_pages(results, columns=[('shown', 'shown'), ('total', 'results')])
+        return 0
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    results = run(args)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=1)
+    if args.json:
+        json.dump(results, sys.stdout, indent=1)
+        print()
+    else:
+        print_report(results, baseline)
+
+    if baseline and args.max_regression is not None:
+        slower = regressions(results, baseline, args.max_regression)
+        if slower:
+            print(f'\np95 regression over {args.max_regression:g}%: {", ".join(slower)}', file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
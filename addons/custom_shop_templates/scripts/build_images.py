@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Build the optimized, content-hashed copies of static/src/img.
+
+    python3 scripts/build_images.py [--widths 480,960,1440,1920] [--quality 80]
+    python3 scripts/build_images.py --check
+
+For every image under static/src/img (macOS `._*` / .DS_Store files skipped):
+- SVG: minified (comments, metadata, editor attributes and whitespace
+  removed, coordinates rounded); embedded base64 rasters are re-encoded as
+  WebP when that is smaller
+- PNG/JPEG: recompressed, plus WebP and AVIF variants at each width up to
+  the original width
+
+Output goes to static/dist/img/ with the content hash in the file name,
+plus static/dist/img/manifest.json, which website._get_tts_image() reads to
+write src/srcset. Hashed files are served with immutable cache headers from
+/tts/img/<file>; images missing from the manifest keep their static/src URL.
+
+Rasters need Pillow (an Odoo dependency, so run this where Odoo runs, e.g.
+`docker compose exec web python3 /mnt/extra-addons/custom_shop_templates/scripts/build_images.py`).
+AVIF needs Pillow built with libavif or the pillow-avif-plugin package; it is
+skipped otherwise. Commit static/dist/img/ after running.
+
+The manifest records the content hash of every source image it was built
+from. --check builds nothing and exits with status 1 when static/src/img
+changed since (images added, removed or edited), i.e. when the committed
+manifest is out of date. Rasters left out of a build without Pillow are
+reported but don't fail the check.
+"""
+
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+if Image is not None:
+    try:
+        import pillow_avif  # noqa: F401 - registers the AVIF plugin on older Pillow
+    except ImportError:
+        pass
+
+MODULE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(MODULE_DIR, 'static', 'src', 'img')
+DIST_DIR = os.path.join(MODULE_DIR, 'static', 'dist', 'img')
+MANIFEST_NAME = 'manifest.json'
+
+DEFAULT_WIDTHS = (480, 960, 1440, 1920)
+DEFAULT_QUALITY = 80
+HASH_LENGTH = 10
+
+RASTER_FORMATS = {'.png': 'PNG', '.jpg': 'JPEG', '.jpeg': 'JPEG'}
+MIMETYPES = {'PNG': 'image/png', 'JPEG': 'image/jpeg', 'WEBP': 'image/webp', 'AVIF': 'image/avif'}
+
+SVG_DROP_PATTERNS = (
+    re.compile(r'<\?xml.*?\?>', re.S),
+    re.compile(r'<!DOCTYPE.*?>', re.S),
+    re.compile(r'<!--.*?-->', re.S),
+    re.compile(r'<metadata\b.*?</metadata>', re.S),
+    re.compile(r'<(sodipodi|inkscape):[^>]*?(/>|>.*?</\1:[^>]*>)', re.S),
+    re.compile(r'\s(sodipodi|inkscape|xmlns:sodipodi|xmlns:inkscape)(:[\w-]+)?="[^"]*"'),
+)
+SVG_EMBEDDED_RASTER = re.compile(r'data:image/(png|jpe?g);base64,([A-Za-z0-9+/=\s]+)')
+SVG_LONG_DECIMAL = re.compile(r'(\d\.\d{3})\d+')
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def content_name(relative_path, data, suffix=''):
+    """`dir/name.png` -> `dir/name<suffix>.<hash>.png`"""
+    root, extension = os.path.splitext(relative_path)
+    return f'{root}{suffix}.{content_hash(data)}{extension}'
+
+
+def write_output(dist_dir, name, data):
+    path = os.path.join(dist_dir, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return name
+
+
+def encode(image, image_format, quality):
+    buffer = io.BytesIO()
+    if image_format == 'PNG':
+        image.save(buffer, 'PNG', optimize=True)
+    elif image_format == 'JPEG':
+        image.convert('RGB').save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(buffer, image_format, quality=quality)
+    return buffer.getvalue()
+
+
+def reencode_embedded_raster(match, quality):
+    """Embedded PNG/JPEG of an SVG as WebP, if Pillow is there and it's smaller."""
+    original = match.group(0)
+    if Image is None:
+        return original
+    raw = base64.b64decode(re.sub(r'\s', '', match.group(2)))
+    try:
+        webp = encode(Image.open(io.BytesIO(raw)), 'WEBP', quality)
+    except (OSError, ValueError):
+        return original
+    if len(webp) >= len(raw):
+        return original
+    return 'data:image/webp;base64,' + base64.b64encode(webp).decode()
+
+
+def minify_svg(text, quality):
+    for pattern in SVG_DROP_PATTERNS:
+        text = pattern.sub('', text)
+    text = SVG_EMBEDDED_RASTER.sub(lambda match: reencode_embedded_raster(match, quality), text)
+    text = SVG_LONG_DECIMAL.sub(r'\1', text)
+    text = re.sub(r'>\s+<', '><', text)
+    text = re.sub(r'[ \t\r\n]+', ' ', text)
+    return text.strip()
+
+
+def build_svg(relative_path, source, dist_dir, quality):
+    with open(source, encoding='utf-8') as f:
+        data = minify_svg(f.read(), quality).encode()
+    return {
+        'src': write_output(dist_dir, content_name(relative_path, data), data),
+        'variants': {},
+    }
+
+
+def build_raster(relative_path, source, dist_dir, widths, quality, avif):
+    image = Image.open(source)
+    image.load()
+    source_format = RASTER_FORMATS[os.path.splitext(source)[1].lower()]
+    formats = [source_format, 'WEBP'] + (['AVIF'] if avif else [])
+
+    # Full size in the original format, never bigger than the source file
+    data = encode(image, source_format, quality)
+    if len(data) >= os.path.getsize(source):
+        with open(source, 'rb') as f:
+            data = f.read()
+    entry = {
+        'src': write_output(dist_dir, content_name(relative_path, data), data),
+        'width': image.width,
+        'height': image.height,
+        'variants': {MIMETYPES[image_format]: [] for image_format in formats},
+    }
+
+    sizes = sorted({width for width in widths if width < image.width} | {image.width})
+    for width in sizes:
+        resized = image if width == image.width else image.resize(
+            (width, round(image.height * width / image.width)), Image.LANCZOS)
+        for image_format in formats:
+            data = encode(resized, image_format, quality)
+            name = relative_path if image_format == source_format else \
+                os.path.splitext(relative_path)[0] + '.' + image_format.lower()
+            name = content_name(name, data, suffix=f'.{width}w')
+            entry['variants'][MIMETYPES[image_format]].append([write_output(dist_dir, name, data), width])
+    return entry
+
+
+def iter_images(src_dir):
+    for directory, _dirnames, filenames in os.walk(src_dir):
+        for filename in sorted(filenames):
+            extension = os.path.splitext(filename)[1].lower()
+            if filename.startswith('.') or (extension != '.svg' and extension not in RASTER_FORMATS):
+                continue
+            path = os.path.join(directory, filename)
+            yield os.path.relpath(path, src_dir).replace(os.sep, '/'), path
+
+
+def source_hashes(src_dir):
+    """{relative path: content hash} of the source images."""
+    hashes = {}
+    for relative_path, source in iter_images(src_dir):
+        with open(source, 'rb') as f:
+            hashes[relative_path] = content_hash(f.read())
+    return hashes
+
+
+def check(src_dir, dist_dir):
+    """Problems that make the committed manifest out of date (see --check)."""
+    try:
+        with open(os.path.join(dist_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return ['no manifest: run scripts/build_images.py'], []
+    built = manifest.get('sources', {})
+    current = source_hashes(src_dir)
+
+    problems = [f'new image: {path}' for path in sorted(current.keys() - built.keys())]
+    problems += [f'removed image: {path}' for path in sorted(built.keys() - current.keys())]
+    problems += [f'changed image: {path}' for path in sorted(current.keys() & built.keys()) if current[path] != built[path]]
+    for entry in manifest.get('images', {}).values():
+        for name in [entry['src']] + [name for files in entry['variants'].values() for name, _width in files]:
+            if not os.path.exists(os.path.join(dist_dir, name)):
+                problems.append(f'missing built file: {name}')
+    warnings = [f'not built (no Pillow): {path}' for path in sorted(built.keys() - manifest.get('images', {}).keys())]
+    return problems, warnings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('--widths', default=','.join(map(str, DEFAULT_WIDTHS)),
+                        help='comma separated srcset widths for rasters (default: %(default)s)')
+    parser.add_argument('--quality', type=int, default=DEFAULT_QUALITY,
+                        help='JPEG/WebP/AVIF quality (default: %(default)s)')
+    parser.add_argument('--check', action='store_true',
+                        help='only check that the manifest is up to date with static/src/img')
+    args = parser.parse_args(argv)
+    widths = [int(width) for width in args.widths.split(',') if width.strip()]
+
+    if args.check:
+        problems, warnings = check(SRC_DIR, DIST_DIR)
+        for message in warnings + problems:
+            print(message)
+        if problems:
+            print('static/dist/img is out of date: run scripts/build_images.py and commit it')
+            return 1
+        print('static/dist/img is up to date')
+        return 0
+
+    if Image is None:
+        print('Pillow is not installed: only SVGs are processed', file=sys.stderr)
+    avif = Image is not None and 'AVIF' in Image.SAVE
+    if Image is not None and not avif:
+        print('No AVIF encoder available: AVIF variants skipped', file=sys.stderr)
+
+    # Start from scratch so stale hashed files don't pile up
+    shutil.rmtree(DIST_DIR, ignore_errors=True)
+    os.makedirs(DIST_DIR)
+
+    images = {}
+    source_bytes = output_bytes = 0
+    for relative_path, source in iter_images(SRC_DIR):
+        if relative_path.lower().endswith('.svg'):
+            entry = build_svg(relative_path, source, DIST_DIR, args.quality)
+        elif Image is not None:
+            entry = build_raster(relative_path, source, DIST_DIR, widths, args.quality, avif)
+        else:
+            continue
+        images[relative_path] = entry
+        source_bytes += os.path.getsize(source)
+        output_bytes += os.path.getsize(os.path.join(DIST_DIR, entry['src']))
+
+    with open(os.path.join(DIST_DIR, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump({'version': 1, 'images': images, 'sources': source_hashes(SRC_DIR)}, f, indent=1, sort_keys=True)
+
+    print(f'{len(images)} images: {source_bytes / 1024:.0f} KiB -> {output_bytes / 1024:.0f} KiB '
+          f'(full-size files, before srcset/WebP/AVIF savings), written to {DIST_DIR}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Check the per-area style bundles of __manifest__.py against the templates.
+
+    python3 scripts/check_assets.py
+
+Page styles are split into one bundle per area (shop, checkout, account,
+auth, see views/layout/assets.xml), so a page only gets the classes of the
+core styles and of its own bundle. This script checks, without Odoo:
+
+- every file listed in the manifest assets exists
+- each area bundle keeps the page files in STYLE_ORDER, the order of the
+  former single web.assets_frontend list, so the cascade is unchanged
+- every class a page of an area uses, when a page file defines it,
+  is defined by a file of the core styles or of that area's bundle. Pages
+  of an area are the view files of its directory plus the components they
+  t-call; views/layout/ templates are on every page.
+
+Exits with status 1 and lists the problems otherwise. It does not compile
+the SCSS: undefined variables or mixins only show up when Odoo builds the
+bundle (load each area's page once after changing a bundle).
+"""
+
+import argparse
+import ast
+import os
+import re
+import sys
+
+MODULE = 'custom_shop_templates'
+MODULE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CORE_BUNDLE = 'web.assets_frontend'
+AREA_BUNDLES = {
+    'shop': f'{MODULE}.assets_shop',
+    'checkout': f'{MODULE}.assets_checkout',
+    'account': f'{MODULE}.assets_account',
+    'auth': f'{MODULE}.assets_auth',
+}
+
+# View files of each area (manifest 'data' paths); views/layout/ is on every page
+AREA_VIEWS = {
+    'shop': ('views/shop/',),
+    'checkout': ('views/checkout/',),
+    'account': ('views/account/dashboard.xml', 'views/account/orders.xml', 'views/account/addresses.xml',
+                'views/account/payment_methods.xml', 'views/account/account_details.xml'),
+    'auth': ('views/account/login.xml', 'views/account/register.xml'),
+}
+LAYOUT_VIEWS = ('views/layout/',)
+
+# Classes of Odoo's own layouts that page styles are scoped with, and the
+# areas whose pages carry them
+ODOO_AREA_CLASSES = {
+    'o_portal': ('account',),
+    'o_portal_wrap': ('account',),
+    'oe_website_sale': ('shop', 'checkout'),
+}
+
+# Former web.assets_frontend order of the style files
+STYLE_ORDER = (
+    'static/src/scss/variables.scss',
+    'static/src/scss/_base.scss',
+    'static/src/scss/_utilities.scss',
+    'static/src/scss/components.scss',
+    'static/src/scss/components/_buttons.scss',
+    'static/src/scss/components/_banners.scss',
+    'static/src/scss/components/_summary-base.scss',
+    'static/src/scss/components/_cart-summary.scss',
+    'static/src/scss/components/_checkout-summary.scss',
+    'static/src/scss/pages/_cart.scss',
+    'static/src/scss/pages/_checkout-address.scss',
+    'static/src/scss/pages/_checkout-shipping.scss',
+    'static/src/scss/pages/_checkout-payment.scss',
+    'static/src/scss/pages/_login.scss',
+    'static/src/scss/pages/_register.scss',
+    'static/src/scss/pages/_account-layout.scss',
+    'static/src/scss/pages/_account-navigation.scss',
+    'static/src/scss/pages/_dashboard.scss',
+    'static/src/scss/pages/_account-details.scss',
+    'static/src/scss/pages/_addresses.scss',
+    'static/src/scss/pages/_payment-methods.scss',
+    'static/src/scss/pages/_orders.scss',
+)
+
+TEMPLATE_RE = re.compile(r'<template\s[^>]*\bid="([\w.]+)"')
+T_CALL_RE = re.compile(r't-call="(?:%s\.)?([\w]+)"' % MODULE)
+CLASS_ATTR_RE = re.compile(r'\b(?:class|t-attf-class|t-att-class)="([^"]*)"')
+SELECTOR_CLASS_RE = re.compile(r'\.(-?[a-zA-Z_][\w-]*)')
+CLASS_TOKEN_RE = re.compile(r'(?<![\w.-])[a-zA-Z_][\w-]*')
+SCSS_COMMENT_RE = re.compile(r'/\*.*?\*/|//[^\n]*', re.S)
+
+
+def read(path):
+    with open(os.path.join(MODULE_DIR, path), encoding='utf-8') as f:
+        return f.read()
+
+
+def load_manifest():
+    return ast.literal_eval(read('__manifest__.py'))
+
+
+def bundle_files(manifest, bundle):
+    """Module-relative style files of a bundle, in order (includes left out)."""
+    prefix = MODULE + '/'
+    return [
+        path[len(prefix):] for path in manifest['assets'].get(bundle, [])
+        if isinstance(path, str) and path.startswith(prefix) and path.endswith(('.scss', '.css'))
+    ]
+
+
+def scss_selectors(text):
+    """Class sets of the selectors of a SCSS file (& nesting resolved)."""
+    text = SCSS_COMMENT_RE.sub('', text)
+    selectors = set()
+    stack = []  # selectors of the open blocks; None inside @mixin / @function bodies
+    start = 0
+    for position, char in enumerate(text):
+        if char == '{':
+            head = text[start:position].strip()
+            start = position + 1
+            parents = stack[-1] if stack else ['']
+            if parents is None or head.startswith(('@mixin', '@function', '@each', '@for')):
+                stack.append(None)
+                continue
+            if head.startswith('@'):
+                # @media, @supports, @include ... { }: same selectors as the parent
+                stack.append(parents)
+                continue
+            resolved = []
+            for selector in head.split(','):
+                selector = selector.strip()
+                if '&' in selector:
+                    resolved.extend(selector.replace('&', parent) for parent in parents)
+                else:
+                    resolved.extend(f'{parent} {selector}'.strip() for parent in parents)
+            stack.append(resolved)
+            for selector in resolved:
+                classes = frozenset(SELECTOR_CLASS_RE.findall(selector))
+                if classes:
+                    selectors.add(classes)
+        elif char in '};':
+            start = position + 1
+            if char == '}' and stack:
+                stack.pop()
+    return selectors
+
+
+def template_index(view_files):
+    """{template id: view file} and {view file: text} of the loaded view files."""
+    texts = {path: read(path) for path in view_files}
+    ids = {}
+    for path, text in texts.items():
+        for template_id in TEMPLATE_RE.findall(text):
+            ids[template_id.split('.')[-1]] = path
+    return ids, texts
+
+
+def area_view_files(view_files, patterns, ids, texts):
+    """View files matching `patterns`, plus the module templates they t-call."""
+    files = {path for path in view_files if path.startswith(patterns) or path in patterns}
+    pending = list(files)
+    while pending:
+        for called in T_CALL_RE.findall(texts[pending.pop()]):
+            path = ids.get(called)
+            if path and path not in files:
+                files.add(path)
+                pending.append(path)
+    return files
+
+
+def used_classes(texts):
+    classes = set()
+    for text in texts:
+        for value in CLASS_ATTR_RE.findall(text):
+            classes.update(CLASS_TOKEN_RE.findall(value))
+    return classes
+
+
+def check(manifest):
+    problems = []
+
+    # Listed files exist
+    for bundle, paths in manifest['assets'].items():
+        for path in paths:
+            if isinstance(path, str) and path.startswith(MODULE + '/'):
+                if not os.path.exists(os.path.join(MODULE_DIR, path[len(MODULE) + 1:])):
+                    problems.append(f'{bundle}: missing file {path}')
+
+    core_files = bundle_files(manifest, CORE_BUNDLE)
+    area_files = {area: bundle_files(manifest, bundle) for area, bundle in AREA_BUNDLES.items()}
+
+    # Cascade order
+    for area, files in area_files.items():
+        unknown = [path for path in files if path not in STYLE_ORDER]
+        problems.extend(f'{AREA_BUNDLES[area]}: {path} is not in STYLE_ORDER' for path in unknown)
+        known = [path for path in files if path in STYLE_ORDER]
+        if known != sorted(known, key=STYLE_ORDER.index):
+            problems.append(f'{AREA_BUNDLES[area]}: files are not in STYLE_ORDER order')
+
+    # Rules matching each area's pages are in its bundles. A selector
+    # matches an area's pages when they use all of its classes that the
+    # module's templates (or ODOO_AREA_CLASSES) use at all; other Odoo
+    # classes count as present. Selectors with a tts-* class no loaded
+    # template uses never match.
+    selectors = {path: scss_selectors(read(path)) for path in STYLE_ORDER if os.path.exists(os.path.join(MODULE_DIR, path))}
+    view_files = [path for path in manifest['data'] if path.startswith('views/')]
+    ids, texts = template_index(view_files)
+    all_used = used_classes(texts.values()) | set(ODOO_AREA_CLASSES)
+
+    layout_files = area_view_files(view_files, LAYOUT_VIEWS, ids, texts)
+    for area, bundle in AREA_BUNDLES.items():
+        views = area_view_files(view_files, AREA_VIEWS[area], ids, texts) | layout_files
+        used = used_classes(texts[path] for path in views)
+        used.update(name for name, areas in ODOO_AREA_CLASSES.items() if area in areas)
+        for path, file_selectors in selectors.items():
+            if path in core_files or path in area_files[area]:
+                continue
+            missed = set()
+            for classes in file_selectors:
+                if any(name.startswith('tts-') and name not in all_used for name in classes):
+                    continue
+                known = classes & all_used
+                if known and known <= used:
+                    missed.update(known)
+            if missed:
+                names = ', '.join(f'.{name}' for name in sorted(missed))
+                problems.append(f'{bundle}: its pages use {names}, styled by {path} which it does not list')
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1].strip())
+    parser.parse_args(argv)
+
+    problems = check(load_manifest())
+    for problem in problems:
+        print(problem)
+    if problems:
+        print(f'{len(problems)} problem(s)')
+        return 1
+    print('Asset bundles OK')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
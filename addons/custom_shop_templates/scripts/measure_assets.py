@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Report the CSS/JS each page type downloads, and its first-render timing.
+
+    python3 scripts/measure_assets.py [--url http://localhost:8069] [--db DB]
+        [--login LOGIN --password PASSWORD] [--runs 5] [--browser]
+
+For each page type (shop, product, cart, checkout, account, auth) the page
+is fetched and the stylesheets and scripts linked in it are downloaded.
+The report shows, per page:
+
+- HTML bytes and time to first byte / full HTML (median of --runs)
+- bytes of every CSS and JS bundle (raw and gzipped), inline <style> bytes
+- render-blocking CSS bytes: what the browser needs before the first paint
+
+With --browser (needs the `playwright` package and its Chromium), the
+pages are also loaded in a headless browser to read first-contentful-paint
+and DOMContentLoaded.
+
+account uses the --login session (auth is always fetched anonymously);
+cart and checkout add the first /shop product to the cart first. Only talks to
+the given Odoo server (no other network access).
+"""
+
+import argparse
+import gzip
+import http.cookiejar
+import json
+import re
+import statistics
+import sys
+import time
+import urllib.parse
+import urllib.request
+from html.parser import HTMLParser
+
+PAGES = ('shop', 'product', 'cart', 'checkout', 'account', 'auth')
+
+
+class AssetParser(HTMLParser):
+    """Stylesheets, scripts, inline styles and product links of a page."""
+
+    def __init__(self):
+        super().__init__()
+        self.stylesheets = []  # (url, render blocking)
+        self.scripts = []
+        self.inline_style_bytes = 0
+        self.product_links = []
+        self._in_style = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'link' and 'stylesheet' in (attrs.get('rel') or '').split() and attrs.get('href'):
+            self.stylesheets.append((attrs['href'], attrs.get('media') in (None, '', 'all', 'screen')))
+        elif tag == 'script' and attrs.get('src'):
+            self.scripts.append(attrs['src'])
+        elif tag == 'style':
+            self._in_style = True
+        elif tag == 'a' and re.match(r'^/shop/(?!cart|checkout|page/|category/|payment|confirm)[\w-]+-\d+', attrs.get('href') or ''):
+            self.product_links.append(attrs['href'])
+
+    def handle_endtag(self, tag):
+        if tag == 'style':
+            self._in_style = False
+
+    def handle_data(self, data):
+        if self._in_style:
+            self.inline_style_bytes += len(data.encode())
+
+
+class Client:
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+        self._asset_sizes = {}
+
+    def get(self, path):
+        """:return: (final url, body bytes, time to first byte, total time)"""
+        started_at = time.perf_counter()
+        with self.opener.open(urllib.parse.urljoin(self.base_url + '/', path.lstrip('/'))) as response:
+            first_byte = response.read(1)
+            ttfb = time.perf_counter() - started_at
+            body = first_byte + response.read()
+            return response.geturl(), body, ttfb, time.perf_counter() - started_at
+
+    def json_call(self, path, params):
+        data = json.dumps({'jsonrpc': '2.0', 'method': 'call', 'params': params}).encode()
+        request = urllib.request.Request(self.base_url + path, data=data, headers={'Content-Type': 'application/json'})
+        with self.opener.open(request) as response:
+            result = json.load(response)
+        if result.get('error'):
+            raise RuntimeError(result['error'].get('message'))
+        return result.get('result')
+
+    def asset_size(self, url):
+        """:return: (raw bytes, gzipped bytes), cached per URL"""
+        if url not in self._asset_sizes:
+            _final_url, body, _ttfb, _total = self.get(url)
+            self._asset_sizes[url] = (len(body), len(gzip.compress(body)))
+        return self._asset_sizes[url]
+
+
+def product_url(client):
+    parser = AssetParser()
+    parser.feed(client.get('/shop')[1].decode('utf-8', 'replace'))
+    return parser.product_links[0] if parser.product_links else None
+
+
+def fill_cart(client, product_path):
+    """Add the product of `product_path` to the cart of this session."""
+    _url, body, _ttfb, _total = client.get(product_path)
+    match = re.search(rb'name="product_id"[^>]*value="(\d+)"|value="(\d+)"[^>]*name="product_id"', body)
+    if not match:
+        return False
+    product_id = int(match.group(1) or match.group(2))
+    client.json_call('/shop/cart/update_json', {'product_id': product_id, 'add_qty': 1})
+    return True
+
+
+def measure_page(client, path, runs):
+    timings = []
+    for _run in range(runs):
+        final_url, body, ttfb, total = client.get(path)
+        timings.append((ttfb, total))
+
+    parser = AssetParser()
+    parser.feed(body.decode('utf-8', 'replace'))
+    css = [(url, blocking, *client.asset_size(url)) for url, blocking in parser.stylesheets]
+    js = [(url, *client.asset_size(url)) for url in parser.scripts]
+    return {
+        'url': final_url,
+        'html_bytes': len(body),
+        'ttfb_ms': statistics.median(t[0] for t in timings) * 1000,
+        'html_ms': statistics.median(t[1] for t in timings) * 1000,
+        'inline_style_bytes': parser.inline_style_bytes,
+        'css': css,
+        'js': js,
+        'blocking_css_bytes': sum(raw for _url, blocking, raw, _gz in css if blocking),
+        'blocking_css_gzip': sum(gz for _url, blocking, _raw, gz in css if blocking),
+    }
+
+
+def measure_in_browser(base_url, paths, cookies):
+    """First paint timings from headless Chromium, or {} without playwright."""
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        print('playwright is not installed: skipping browser timings', file=sys.stderr)
+        return {}
+
+    host = urllib.parse.urlparse(base_url).hostname
+    timings = {}
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch()
+        context = browser.new_context()
+        context.add_cookies([
+            {'name': cookie.name, 'value': cookie.value, 'domain': host, 'path': cookie.path or '/'}
+            for cookie in cookies
+        ])
+        page = context.new_page()
+        for name, path in paths.items():
+            page.goto(base_url.rstrip('/') + path, wait_until='load')
+            timings[name] = page.evaluate("""() => {
+                const paint = performance.getEntriesByName('first-contentful-paint')[0];
+                const nav = performance.getEntriesByType('navigation')[0];
+                return {
+                    fcp_ms: paint ? paint.startTime : null,
+                    dcl_ms: nav ? nav.domContentLoadedEventEnd : null,
+                };
+            }""")
+        browser.close()
+    return timings
+
+
+def print_report(results, browser_timings):
+    def kib(value):
+        return f'{value / 1024:7.1f} KiB'
+
+    for name, result in results.items():
+        if result is None:
+            print(f'\n{name}: skipped')
+            continue
+        print(f'\n{name}: {result["url"]}')
+        print(f'  HTML {kib(result["html_bytes"])}   TTFB {result["ttfb_ms"]:.0f} ms   full HTML {result["html_ms"]:.0f} ms'
+              f'   inline <style> {kib(result["inline_style_bytes"])}')
+        for url, blocking, raw, gz in result['css']:
+            print(f'  css {kib(raw)} ({kib(gz)} gz){"  blocking" if blocking else ""}  {url}')
+        for url, raw, gz in result['js']:
+            print(f'  js  {kib(raw)} ({kib(gz)} gz)  {url}')
+        print(f'  render-blocking CSS: {kib(result["blocking_css_bytes"])} ({kib(result["blocking_css_gzip"])} gz)')
+        if name in browser_timings:
+            timing = browser_timings[name]
+            print(f'  browser: first contentful paint {timing["fcp_ms"] or 0:.0f} ms, '
+                  f'DOMContentLoaded {timing["dcl_ms"] or 0:.0f} ms')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('--url', default='http://localhost:8069', help='Odoo base URL (default: %(default)s)')
+    parser.add_argument('--db', help='database, when the server hosts several')
+    parser.add_argument('--login', help='portal user for the account page')
+    parser.add_argument('--password', help='password of --login')
+    parser.add_argument('--runs', type=int, default=5, help='requests per page for the timings (default: %(default)s)')
+    parser.add_argument('--browser', action='store_true', help='also measure first paint in headless Chromium')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args(argv)
+
+    anonymous = Client(args.url)
+    client = Client(args.url)
+    if args.db:
+        anonymous.get(f'/web?db={urllib.parse.quote(args.db)}')
+        client.get(f'/web?db={urllib.parse.quote(args.db)}')
+    if args.login:
+        client.json_call('/web/session/authenticate', {'db': args.db, 'login': args.login, 'password': args.password})
+
+    product = product_url(client)
+    has_cart = bool(product) and fill_cart(client, product)
+    paths = {
+        'shop': '/shop',
+        'product': product,
+        'cart': '/shop/cart' if has_cart else None,
+        'checkout': '/shop/checkout' if has_cart else None,
+        'account': '/my' if args.login else None,
+        'auth': '/web/login',
+    }
+    paths = {name: path for name, path in paths.items() if path}
+    results = {
+        name: measure_page(anonymous if name == 'auth' else client, paths[name], args.runs) if name in paths else None
+        for name in PAGES
+    }
+    # The browser uses the logged-in session, where /web/login redirects
+    browser_paths = {name: path for name, path in paths.items() if name != 'auth' or not args.login}
+    browser_timings = measure_in_browser(args.url, browser_paths, client.cookies) if args.browser else {}
+
+    if args.json:
+        json.dump({'pages': results, 'browser': browser_timings}, sys.stdout, indent=1)
+        print()
+    else:
+        print_report(results, browser_timings)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
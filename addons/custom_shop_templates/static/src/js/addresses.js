@@ -1,6 +1,7 @@
 /**
  * TTS Addresses - Toggle between list view and form view
  * Allows editing addresses without reloading the page
+ * Also loads state options on demand when the country changes
  */
 (function() {
     'use strict';
@@ -78,13 +79,104 @@
         }
     }
 
+    /**
+     * Country-scoped state dropdowns (checkout address step + /my/addresses)
+     *
+     * The server only renders the selected country's states. Each state
+     * <select> declares which country <select> drives it:
+     *   data-tts-country-field="billing_country_id"  (id of the country select)
+     *   data-tts-country-id="57"                     (country of the rendered options)
+     * When the country changes, states are fetched from /shop/states/<id>.
+     * Responses are kept per page and the browser revalidates them with ETags.
+     * Selects inserted later (checkout steps swapped in by checkout_steps.js)
+     * are bound on the 'tts:checkout-step' event.
+     */
+    const statesCache = {};
+
+    function fetchStates(countryId) {
+        if (!statesCache[countryId]) {
+            statesCache[countryId] = fetch('/shop/states/' + countryId, {
+                credentials: 'same-origin',
+                headers: { 'Accept': 'application/json' },
+            }).then(function(response) {
+                if (!response.ok) {
+                    throw new Error('Could not load states (' + response.status + ')');
+                }
+                return response.json();
+            }).then(function(data) {
+                return data.states;
+            }).catch(function(error) {
+                delete statesCache[countryId];
+                throw error;
+            });
+        }
+        return statesCache[countryId];
+    }
+
+    function renderStates(stateSelect, states) {
+        // Keep the "Select state" placeholder, replace the rest
+        const placeholder = stateSelect.querySelector('option[value=""]');
+        stateSelect.innerHTML = '';
+        if (placeholder) {
+            stateSelect.appendChild(placeholder);
+        }
+        states.forEach(function(state) {
+            const option = document.createElement('option');
+            option.value = state.id;
+            option.textContent = state.name;
+            stateSelect.appendChild(option);
+        });
+    }
+
+    function initStateLoading(root) {
+        const stateSelects = (root || document).querySelectorAll('select[data-tts-country-field]');
+
+        stateSelects.forEach(function(stateSelect) {
+            const countrySelect = document.getElementById(stateSelect.dataset.ttsCountryField);
+            if (!countrySelect || stateSelect.dataset.ttsStatesBound) {
+                return;
+            }
+            stateSelect.dataset.ttsStatesBound = '1';
+
+            function syncStates() {
+                const countryId = countrySelect.value;
+                if (!countryId || countryId === stateSelect.dataset.ttsCountryId) {
+                    return;
+                }
+                stateSelect.dataset.ttsCountryId = countryId;
+                fetchStates(countryId).then(function(states) {
+                    // Ignore late responses for a country that is no longer selected
+                    if (stateSelect.dataset.ttsCountryId === countryId) {
+                        renderStates(stateSelect, states);
+                    }
+                }).catch(function(error) {
+                    console.warn(error);
+                });
+            }
+
+            countrySelect.addEventListener('change', syncStates);
+
+            // The browser may preselect another country (no saved country, back/forward cache)
+            syncStates();
+        });
+    }
+
     // Execute initialization
     // Check if DOM is already loaded (in case script loads after DOMContentLoaded)
     if (document.readyState === 'loading') {
         // DOM not ready yet, wait for it
         document.addEventListener('DOMContentLoaded', initAddressesToggle);
+        document.addEventListener('DOMContentLoaded', function() {
+            initStateLoading();
+        });
     } else {
         // DOM is already ready, execute now
         initAddressesToggle();
+        initStateLoading();
     }
+
+    // Checkout step swapped in without a page load
+    document.addEventListener('tts:checkout-step', function(e) {
+        initStateLoading(e.detail.container);
+    });
 })();
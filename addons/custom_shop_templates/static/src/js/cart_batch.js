@@ -0,0 +1,135 @@
+/**
+ * TTS Cart Batch - Batched quantity changes on the cart page
+ * +/-, delete and quantity input changes are collected for a short moment
+ * and sent together to /shop/cart/update_batch. Only the changed rows and
+ * the summary are replaced with the returned HTML fragments.
+ * Takes over from website_sale's per-click cart_update_json inside
+ * #cart_products[data-tts-cart-batch].
+ */
+(function() {
+    'use strict';
+
+    const DEBOUNCE_MS = 400;
+    const CONTAINER = '[data-tts-cart-batch]';
+
+    const pending = {};  // {line_id: quantity}
+    let timer = null;
+    let inFlight = false;
+
+    function getInput(lineId) {
+        return document.querySelector(CONTAINER + ' .js_quantity[data-line-id="' + lineId + '"]');
+    }
+
+    function queue(lineId, quantity) {
+        pending[lineId] = Math.max(quantity, 0);
+        clearTimeout(timer);
+        timer = setTimeout(flush, DEBOUNCE_MS);
+    }
+
+    function replaceHtml(element, html) {
+        if (!element) {
+            return;
+        }
+        const template = document.createElement('template');
+        template.innerHTML = html.trim();
+        element.replaceWith(...template.content.childNodes);
+    }
+
+    function apply(result) {
+        if (result.empty) {
+            window.location.reload();
+            return;
+        }
+
+        Object.keys(result.lines).forEach(function(lineId) {
+            // Keep rows the user changed again while this request was running
+            if (pending[lineId] !== undefined) {
+                return;
+            }
+            replaceHtml(document.querySelector('[data-tts-line-id="' + lineId + '"]'), result.lines[lineId]);
+        });
+        result.removed.forEach(function(lineId) {
+            const row = document.querySelector('[data-tts-line-id="' + lineId + '"]');
+            if (row) {
+                row.remove();
+            }
+        });
+        replaceHtml(document.getElementById('cart_total'), result.summary);
+
+        document.querySelectorAll('.my_cart_quantity').forEach(function(badge) {
+            badge.textContent = result.cart_quantity;
+        });
+    }
+
+    function flush() {
+        // One request at a time; changes made meanwhile go in the next one
+        if (inFlight) {
+            timer = setTimeout(flush, DEBOUNCE_MS);
+            return;
+        }
+        const lines = Object.keys(pending).map(function(lineId) {
+            const change = { line_id: parseInt(lineId, 10), quantity: pending[lineId] };
+            delete pending[lineId];
+            return change;
+        });
+        if (!lines.length) {
+            return;
+        }
+
+        inFlight = true;
+        fetch('/shop/cart/update_batch', {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ jsonrpc: '2.0', method: 'call', params: { lines: lines } }),
+        }).then(function(response) {
+            return response.json();
+        }).then(function(data) {
+            if (data.error || !data.result) {
+                window.location.reload();
+                return;
+            }
+            apply(data.result);
+        }).catch(function(error) {
+            console.warn(error);
+            window.location.reload();
+        }).finally(function() {
+            inFlight = false;
+        });
+    }
+
+    // Capture phase, so website_sale's delegated handlers don't also fire
+    document.addEventListener('click', function(e) {
+        const button = e.target.closest(CONTAINER + ' .js_add_cart_json, ' + CONTAINER + ' .js_delete_product');
+        if (!button) {
+            return;
+        }
+        e.preventDefault();
+        e.stopImmediatePropagation();
+
+        const lineId = button.dataset.lineId;
+        const input = getInput(lineId);
+        let quantity = 0;
+        if (!button.classList.contains('js_delete_product')) {
+            const step = button.classList.contains('quantity-dropdown-minus') ? -1 : 1;
+            quantity = Math.max((parseFloat(input && input.value) || 0) + step, 0);
+        }
+        if (input) {
+            input.value = quantity;
+        }
+        queue(lineId, quantity);
+    }, true);
+
+    document.addEventListener('change', function(e) {
+        const input = e.target.closest(CONTAINER + ' .js_quantity');
+        if (!input) {
+            return;
+        }
+        e.stopImmediatePropagation();
+
+        const quantity = parseFloat(input.value);
+        if (!isNaN(quantity)) {
+            queue(input.dataset.lineId, quantity);
+        }
+    }, true);
+})();
@@ -0,0 +1,126 @@
+/**
+ * TTS Checkout Steps - Switch checkout steps without page reloads
+ * Step forms (form[data-tts-step-form]) are submitted to /shop/checkout/step,
+ * which saves the step and returns the next one. The step content and the
+ * order summary are swapped in place and the URL is updated, replacing the
+ * POST -> redirect -> full page GET of each step.
+ * After a swap, a 'tts:checkout-step' event is dispatched on document so
+ * other scripts can bind the new content (addresses.js: state dropdowns).
+ * The payment step is always a full page load (its form is an Odoo widget).
+ * Validation errors of a step are shown in its form ([data-tts-step-error]).
+ * Without JS (or on any other error) the forms still post to their own routes.
+ */
+(function() {
+    'use strict';
+
+    let swapped = false;
+
+    function formData(form) {
+        const data = {};
+        new FormData(form).forEach(function(value, name) {
+            if (name !== 'csrf_token') {
+                data[name] = value;
+            }
+        });
+        return data;
+    }
+
+    // Scripts inserted with innerHTML don't run: re-create them
+    function runScripts(container) {
+        container.querySelectorAll('script').forEach(function(oldScript) {
+            const script = document.createElement('script');
+            script.textContent = oldScript.textContent;
+            oldScript.replaceWith(script);
+        });
+    }
+
+    function showStep(result) {
+        const container = document.getElementById('shop_checkout');
+        container.innerHTML = result.html;
+        container.dataset.ttsStep = result.step;
+        runScripts(container);
+
+        const summary = document.getElementById('o_wsale_total_accordion');
+        if (summary) {
+            summary.innerHTML = result.summary;
+        }
+
+        swapped = true;
+        window.history.pushState({ ttsStep: result.step }, '', result.url);
+        window.scrollTo({ top: 0, behavior: 'smooth' });
+
+        document.dispatchEvent(new CustomEvent('tts:checkout-step', {
+            detail: { step: result.step, container: container },
+        }));
+    }
+
+    function showError(form, message) {
+        let alert = form.querySelector('[data-tts-step-error]');
+        if (!alert) {
+            alert = document.createElement('div');
+            alert.className = 'alert alert-danger';
+            alert.setAttribute('role', 'alert');
+            alert.dataset.ttsStepError = '';
+            form.appendChild(alert);
+        }
+        alert.textContent = message;
+        alert.hidden = false;
+        alert.scrollIntoView({ block: 'center', behavior: 'smooth' });
+    }
+
+    function submitStep(form) {
+        const button = form.querySelector('[type="submit"]');
+        if (button) {
+            button.disabled = true;
+        }
+
+        fetch('/shop/checkout/step', {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                jsonrpc: '2.0',
+                method: 'call',
+                params: { step: form.dataset.ttsStepForm, data: formData(form) },
+            }),
+        }).then(function(response) {
+            return response.json();
+        }).then(function(data) {
+            if (data.error || !data.result) {
+                throw new Error(data.error ? data.error.message : 'Empty response');
+            }
+            if (data.result.redirect) {
+                window.location.assign(data.result.redirect);
+                return;
+            }
+            if (data.result.error) {
+                showError(form, data.result.error);
+                if (button) {
+                    button.disabled = false;
+                }
+                return;
+            }
+            showStep(data.result);
+        }).catch(function(error) {
+            // Fall back to the regular form POST
+            console.warn(error);
+            form.submit();
+        });
+    }
+
+    document.addEventListener('submit', function(e) {
+        const form = e.target.closest('#shop_checkout form[data-tts-step-form]');
+        if (!form) {
+            return;
+        }
+        e.preventDefault();
+        submitStep(form);
+    });
+
+    // Back/forward between swapped steps: load that step's page
+    window.addEventListener('popstate', function() {
+        if (swapped) {
+            window.location.reload();
+        }
+    });
+})();
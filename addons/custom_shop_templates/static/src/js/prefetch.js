@@ -2,60 +2,62 @@
  * TTS Prefetch - instant.page integration
  * Preloads pages on hover/mousedown for instant navigation
  *
- * Strategy: Mousedown + hover hybrid
+ * Browsers supporting Speculation Rules prefetch from the
+ * <script type="speculationrules" id="tts_speculation_rules"> of the page
+ * (views/layout/assets.xml); this script then does nothing.
+ *
+ * Other browsers - Strategy: Mousedown + hover hybrid
  * - Starts prefetch on mousedown (100-200ms before click)
  * - Falls back to hover on desktop
  * - Uses mousedown on mobile (no hover)
  *
- * Blacklist: Excludes logout, external links, POST forms
- * Whitelist: Only internal links (/my, /shop, /page)
+ * Allowed URLs come from the same speculation rules (the server's prefetch
+ * route table, models/ir_http.py): only internal links to side-effect free
+ * pages. The server rejects prefetches of any other route.
  */
 (function() {
     'use strict';
 
-    // Configuration
-    const config = {
-        // Intensity: 'mousedown' | 'hover' | 'viewport'
-        // mousedown = fastest (100ms before click)
-        intensity: 'mousedown',
-
-        // Blacklist - URLs that should NEVER be prefetched
-        blacklist: [
-            '/web/session/logout',      // Logout (kills session)
-            '/newsletter/subscribe',    // POST form
-            '/web/signup',              // POST form
-            '/web/login',               // POST form (login page is fine, but form submit not)
-        ],
+    const rulesScript = document.getElementById('tts_speculation_rules');
+    if (!rulesScript) return;
+    if (window.HTMLScriptElement && HTMLScriptElement.supports && HTMLScriptElement.supports('speculationrules')) {
+        return; // The browser prefetches from the rules itself
+    }
 
-        // Allow query strings (e.g., /my/addresses?edit=1)
-        allowQueryString: true,
+    /**
+     * URL patterns of the rules ('*' = anything) as one regex on the pathname
+     */
+    function patternsToRegExp(patterns) {
+        const escaped = patterns.map(function(pattern) {
+            return pattern.replace(/[.+?^${}()|[\]\\]/g, '\\$&').replace(/\*/g, '.*');
+        });
+        return new RegExp('^(?:' + escaped.join('|') + ')$');
+    }
 
-        // Allow external links (false = only prefetch same-origin)
-        allowExternalLinks: false
-    };
+    let allowed, excluded;
+    try {
+        const where = JSON.parse(rulesScript.textContent).prefetch[0].where.and;
+        allowed = patternsToRegExp(where[0].href_matches);
+        excluded = patternsToRegExp(where[1].not.href_matches);
+    } catch (e) {
+        return;
+    }
 
     /**
      * Check if URL should be prefetched
      */
-    function shouldPrefetch(url) {
+    function shouldPrefetch(link) {
         // External links - skip
-        if (url.startsWith('http') && !url.startsWith(window.location.origin)) {
+        if (link.origin !== window.location.origin) {
             return false;
         }
 
-        // Blacklist check
-        for (const pattern of config.blacklist) {
-            if (url.includes(pattern)) {
-                return false;
-            }
-        }
-
-        // Anchor links - skip
-        if (url.includes('#')) {
+        // Anchor links, new tabs, downloads - skip
+        if (link.hash || link.target === '_blank' || link.hasAttribute('download')) {
             return false;
         }
 
-        return true;
+        return allowed.test(link.pathname) && !excluded.test(link.pathname);
     }
 
     /**
@@ -72,7 +74,7 @@
 
         const url = link.href;
 
-        if (!shouldPrefetch(url)) return;
+        if (!shouldPrefetch(link)) return;
         if (prefetchedLinks.has(url)) return; // Already prefetched
 
         // Create prefetch hint
@@ -99,7 +101,7 @@
 
         const url = link.href;
 
-        if (!shouldPrefetch(url)) return;
+        if (!shouldPrefetch(link)) return;
         if (prefetchedLinks.has(url)) return;
 
         // Debounce hover (only prefetch if hover lasts 100ms)
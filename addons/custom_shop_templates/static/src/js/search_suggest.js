@@ -0,0 +1,112 @@
+/**
+ * TTS Search Suggest - Search-as-you-type for the shop search box
+ * Shows matching products and categories from /shop/suggest while typing.
+ * Requests are debounced; Enter still submits the full /shop search.
+ */
+(function() {
+    'use strict';
+
+    const DEBOUNCE_MS = 150;
+    const MIN_CHARS = 2;
+
+    function escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text;
+        return div.innerHTML;
+    }
+
+    function initSearchSuggest(input) {
+        // Dropdown is positioned under the input's relative wrapper
+        const wrapper = input.closest('.position-relative') || input.parentElement;
+        const menu = document.createElement('div');
+        menu.className = 'dropdown-menu w-100 tts-search-suggest';
+        menu.setAttribute('role', 'listbox');
+        wrapper.appendChild(menu);
+
+        let timer = null;
+        let lastQuery = '';
+        const cache = {};
+
+        function hide() {
+            menu.classList.remove('show');
+        }
+
+        function render(data) {
+            const items = [];
+            data.categories.forEach(function(category) {
+                items.push(
+                    '<a class="dropdown-item" role="option" href="' + escapeHtml(category.url) + '">' +
+                    '<span class="fw-bold">' + escapeHtml(category.name) + '</span></a>'
+                );
+            });
+            data.products.forEach(function(product) {
+                items.push(
+                    '<a class="dropdown-item" role="option" href="' + escapeHtml(product.url) + '">' +
+                    escapeHtml(product.name) +
+                    (product.sku ? ' <small class="text-muted">' + escapeHtml(product.sku) + '</small>' : '') +
+                    '</a>'
+                );
+            });
+
+            menu.innerHTML = items.join('');
+            menu.classList.toggle('show', items.length > 0);
+        }
+
+        function suggest() {
+            const query = input.value.trim();
+            lastQuery = query;
+            if (query.length < MIN_CHARS) {
+                hide();
+                return;
+            }
+            if (cache[query]) {
+                render(cache[query]);
+                return;
+            }
+
+            fetch('/shop/suggest?q=' + encodeURIComponent(query), {
+                credentials: 'same-origin',
+                headers: { 'Accept': 'application/json' },
+            }).then(function(response) {
+                return response.ok ? response.json() : null;
+            }).then(function(data) {
+                if (!data) {
+                    return;
+                }
+                cache[query] = data;
+                // Ignore responses for queries the user already typed past
+                if (query === lastQuery) {
+                    render(data);
+                }
+            }).catch(function(error) {
+                console.warn(error);
+            });
+        }
+
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            timer = setTimeout(suggest, DEBOUNCE_MS);
+        });
+
+        input.addEventListener('keydown', function(e) {
+            if (e.key === 'Escape') {
+                hide();
+            }
+        });
+
+        // Close when clicking outside (delay lets suggestion links receive the click)
+        input.addEventListener('blur', function() {
+            setTimeout(hide, 200);
+        });
+    }
+
+    function init() {
+        document.querySelectorAll('input[data-tts-suggest]').forEach(initSearchSuggest);
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', init);
+    } else {
+        init();
+    }
+})();
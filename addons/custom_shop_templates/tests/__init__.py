@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+
+from . import test_shop_grid
+from . import test_portal_orders
+from . import test_search
+from . import test_checkout_steps
+from . import test_cart_batch
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import patch
+
+from odoo import Command
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestCartBatch(TransactionCase):
+    """Cart page batched update: one pass over the lines, totals computed once."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.website = cls.env.ref('website.default_website')
+        cls.partner = cls.env['res.partner'].create({'name': 'TTS Cart Customer'})
+        cls.products = cls.env['product.product'].create([
+            {'name': f'TTS Cart Product {position:02d}', 'type': 'consu', 'list_price': 10.0 + position}
+            for position in range(30)
+        ])
+
+    def _create_cart(self, size):
+        return self.env['sale.order'].create({
+            'partner_id': self.partner.id,
+            'website_id': self.website.id,
+            'order_line': [
+                Command.create({'product_id': product.id, 'product_uom_qty': 1})
+                for product in self.products[:size]
+            ],
+        })
+
+    def _set_quantities(self, cart, quantities):
+        updated, removed = cart._tts_cart_set_quantities(quantities)
+        cart.amount_total  # totals are recomputed on read
+        return updated, removed
+
+    def test_set_quantities(self):
+        cart = self._create_cart(3)
+        first, second, third = cart.order_line
+        updated, removed = self._set_quantities(cart, {first.id: 4, second.id: 0, -1: 2})
+
+        self.assertEqual(updated, first)
+        self.assertEqual(first.product_uom_qty, 4)
+        self.assertEqual(sorted(removed), sorted([second.id, -1]))
+        self.assertFalse(second.exists())
+        self.assertEqual(cart.order_line, first | third)
+        self.assertEqual(cart.amount_untaxed, first.price_subtotal + third.price_subtotal)
+
+    def test_totals_computed_once(self):
+        """Changing the 30 lines of a cart computes the order totals once."""
+        cart = self._create_cart(30)
+        SaleOrder = type(cart)
+        compute_amounts = SaleOrder._compute_amounts
+        computed = []
+
+        def _compute_amounts(orders):
+            computed.append(orders.ids)
+            return compute_amounts(orders)
+
+        with patch.object(SaleOrder, '_compute_amounts', _compute_amounts):
+            self._set_quantities(cart, {line.id: 2 for line in cart.order_line})
+        self.assertEqual(computed, [cart.ids])
+        self.assertEqual(cart.amount_untaxed, sum(cart.order_line.mapped('price_subtotal')))
+
+    def test_query_count(self):
+        """30 changed lines cost no more queries than 5."""
+        small_cart = self._create_cart(5)
+        large_cart = self._create_cart(30)
+        self.env.invalidate_all()
+        count = self.cr.sql_log_count
+        self._set_quantities(small_cart, {line.id: 2 for line in small_cart.order_line})
+        self.env.flush_all()
+        small_count = self.cr.sql_log_count - count
+
+        self.env.invalidate_all()
+        with self.assertQueryCount(small_count):
+            self._set_quantities(large_cart, {line.id: 2 for line in large_cart.order_line})
+            self.env.flush_all()
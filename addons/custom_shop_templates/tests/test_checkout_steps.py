@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+
+from odoo.tests import HttpCase, new_test_user, tagged
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('post_install', '-at_install')
+class TestCheckoutSteps(HttpCase):
+    """
+    Checkout funnel through the step API (/shop/checkout/step).
+
+    Each step is one request that saves it and returns the next one, with
+    no POST -> 302 -> GET hop. Requests, SQL queries and server time of
+    the funnel are logged.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.website = cls.env.ref('website.default_website')
+        new_test_user(cls.env, login='tts_checkout', password='tts_checkout', groups='base.group_portal')
+        cls.product = cls.env['product.product'].create({
+            'name': 'TTS Checkout Product',
+            'type': 'consu',
+            'list_price': 25.0,
+            'is_published': True,
+            'sale_ok': True,
+        })
+        delivery_product = cls.env['product.product'].create({'name': 'TTS Delivery', 'type': 'service'})
+        cls.carrier = cls.env['delivery.carrier'].create({
+            'name': 'TTS Fixed',
+            'delivery_type': 'fixed',
+            'fixed_price': 5.0,
+            'product_id': delivery_product.id,
+            'is_published': True,
+        })
+        cls.payment_method = cls.env.ref('payment.payment_method_unknown')
+        cls.address = {
+            'billing_first_name': 'Erika',
+            'billing_last_name': 'Muster',
+            'billing_street': 'Hauptstr. 1',
+            'billing_city': 'Berlin',
+            'billing_zip': '10115',
+            'billing_country_id': str(cls.env.ref('base.de').id),
+            'phone': '+49 30 123456',
+            'shipping_same': '1',
+        }
+
+    def setUp(self):
+        super().setUp()
+        self.funnel = []  # (request, SQL queries, server ms)
+        self.authenticate('tts_checkout', 'tts_checkout')
+        self.make_jsonrpc_request('/shop/cart/update_json', {'product_id': self.product.id, 'add_qty': 1})
+
+    def _measured(self, label, call):
+        count = self.cr.sql_log_count
+        started_at = time.perf_counter()
+        result = call()
+        self.funnel.append((label, self.cr.sql_log_count - count, (time.perf_counter() - started_at) * 1000))
+        return result
+
+    def _page(self, url):
+        response = self._measured(url, lambda: self.url_open(url, allow_redirects=False))
+        self.assertEqual(response.status_code, 200, f'{url} should render, not redirect')
+        return response
+
+    def _step(self, step, data):
+        return self._measured(f'step {step}', lambda: self.make_jsonrpc_request(
+            '/shop/checkout/step', {'step': step, 'data': data},
+        ))
+
+    def test_funnel(self):
+        self._page('/shop/checkout?step=address')
+
+        result = self._step('address', self.address)
+        self.assertEqual(result['step'], 'shipping')
+        self.assertEqual(result['url'], '/shop/checkout?step=shipping')
+        self.assertIn('TTS Fixed', result['html'])
+        self.assertTrue(result['summary'])
+
+        # The payment form is an Odoo widget: always a full page load
+        result = self._step('shipping', {'carrier_id': str(self.carrier.id)})
+        self.assertEqual(result, {'redirect': '/shop/payment'})
+        self._page('/shop/payment')
+
+        result = self._step('payment', {'payment_method_id': str(self.payment_method.id)})
+        self.assertEqual(result['step'], 'notes')
+        self.assertIn('terms_accepted', result['html'])
+
+        result = self._step('notes', {'order_note': 'Leave at the door'})
+        self.assertEqual(result['step'], 'notes')
+        self.assertTrue(result['error'])
+
+        result = self._step('notes', {'order_note': 'Leave at the door', 'terms_accepted': '1'})
+        self.assertTrue(result['redirect'].startswith('/shop/payment/transaction'))
+
+        order = self.env['sale.order'].search([('order_line.product_id', '=', self.product.id)], order='id desc', limit=1)
+        self.assertEqual(order.partner_id.city, 'Berlin')
+        self.assertEqual(order.partner_shipping_id, order.partner_id)
+        self.assertEqual(order.carrier_id, self.carrier)
+
+        # One request per step: address and payment pages, 5 step submits (one rejected)
+        self.assertEqual(len(self.funnel), 7)
+        for label, queries, duration in self.funnel:
+            _logger.info("TTS checkout funnel: %-32s %4d queries %8.1f ms", label, queries, duration)
+        _logger.info(
+            "TTS checkout funnel: %d requests, %d queries, %.1f ms server time",
+            len(self.funnel), sum(queries for _label, queries, _ms in self.funnel),
+            sum(duration for _label, _queries, duration in self.funnel),
+        )
+
+    def test_notes_terms_error(self):
+        """Terms not accepted: the step API answers an error, the page shows it."""
+        self._step('address', self.address)
+        self._step('shipping', {'carrier_id': str(self.carrier.id)})
+
+        result = self._step('notes', {})
+        self.assertEqual(set(result), {'step', 'error'})
+
+        response = self._page('/shop/checkout/notes?error=terms')
+        self.assertIn(result['error'], response.text)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+from odoo import Command
+from odoo.tests import HttpCase, new_test_user, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestPortalOrders(HttpCase):
+    """/my/orders: line previews of the whole page preloaded, SQL count independent of the order count."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.portal_user = new_test_user(
+            cls.env, login='tts_portal_orders', password='tts_portal_orders', groups='base.group_portal',
+        )
+        cls.partner = cls.portal_user.partner_id
+        cls.products = cls.env['product.product'].create([
+            {'name': f'TTS Order Product {position}', 'type': 'consu', 'list_price': 10.0}
+            for position in range(3)
+        ])
+
+    def _create_orders(self, count):
+        """Confirmed orders of the portal customer, 3 lines each (sequences 30, 10, 20)."""
+        orders = self.env['sale.order'].create([{
+            'partner_id': self.partner.id,
+            'order_line': [
+                Command.create({'product_id': product.id, 'product_uom_qty': quantity, 'sequence': sequence})
+                for product, quantity, sequence in zip(self.products, (1, 2, 3), (30, 10, 20))
+            ],
+        } for _position in range(count)])
+        orders.action_confirm()
+        return orders
+
+    def _orders_query_count(self):
+        """SQL queries of a warm /my/orders request."""
+        self.url_open('/my/orders')
+        count = self.cr.sql_log_count
+        response = self.url_open('/my/orders')
+        self.assertEqual(response.status_code, 200)
+        return self.cr.sql_log_count - count
+
+    def test_line_preview(self):
+        order = self._create_orders(1)
+        preview = order._get_tts_portal_line_preview(limit=2)[order.id]
+        self.assertEqual(preview['count'], 3)
+        self.assertEqual(preview['lines'].mapped('sequence'), [10, 20])
+        self.assertEqual(preview['lines'].product_id, self.products[1:])
+
+    def test_line_preview_query_count(self):
+        """Two queries for the page, whatever the number of orders."""
+        small_page = self._create_orders(2)
+        large_page = self._create_orders(20)
+        small_page._get_tts_portal_line_preview()
+        self.env.invalidate_all()
+        count = self.cr.sql_log_count
+        small_page._get_tts_portal_line_preview()
+        small_count = self.cr.sql_log_count - count
+
+        self.env.invalidate_all()
+        with self.assertQueryCount(small_count):
+            previews = large_page._get_tts_portal_line_preview()
+        self.assertEqual(len(previews), 20)
+
+    def test_orders_page_query_count(self):
+        """20 orders on /my/orders cost no more queries than 3."""
+        self._create_orders(3)
+        self.authenticate('tts_portal_orders', 'tts_portal_orders')
+        three_orders = self._orders_query_count()
+
+        self._create_orders(17)
+        self.url_open('/my/orders')
+        with self.assertQueryCount(three_orders):
+            response = self.url_open('/my/orders')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('TTS Order Product 1', response.text)
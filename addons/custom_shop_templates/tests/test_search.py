@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import TransactionCase, tagged
+
+SHOP_ORDER = 'website_sequence asc, id desc'
+
+
+@tagged('post_install', '-at_install')
+class TestSearch(TransactionCase):
+    """/shop Name/SKU search: exact SKU fast path, relevance ranking, limit and count."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.website = cls.env.ref('website.default_website')
+        cls.Product = cls.env['product.template'].with_context(website_id=cls.website.id)
+
+        # Listed in reverse relevance order by the shop order (website_sequence)
+        cls.ranked = cls.Product.create([
+            {'name': 'Zeta gadget', 'default_code': 'QUOKKA-9', 'website_sequence': 5},
+            {'name': 'Quokka', 'website_sequence': 4},
+            {'name': 'Quokka plush', 'website_sequence': 3},
+            {'name': 'Giant quokka', 'website_sequence': 2},
+            {'name': 'Megaquokka', 'website_sequence': 1},
+        ])
+        cls.sku_products = cls.Product.create([
+            {'name': 'TTS Cable', 'default_code': 'QK-100'},
+            {'name': 'TTS Cable long', 'default_code': 'QK-1000'},
+        ])
+        (cls.ranked | cls.sku_products).write({'is_published': True, 'sale_ok': True})
+
+    def _search(self, term, rank=True, limit=20, search_limit=None):
+        options = {
+            'displayImage': False,
+            'displayDescription': False,
+            'displayExtraLink': False,
+            'displayDetail': False,
+            'allowFuzzy': False,
+            'display_currency': self.website.currency_id,
+            'tts_search_limit': search_limit,
+        }
+        detail = self.Product._search_get_detail(self.website, SHOP_ORDER, options)
+        return self.Product.with_context(tts_search_rank=rank)._search_fetch(detail, term, limit, SHOP_ORDER)
+
+    def test_exact_sku(self):
+        """An exact variant SKU returns that product alone, not every SKU containing it."""
+        results, count = self._search('QK-100')
+        self.assertEqual(results, self.sku_products[0])
+        self.assertEqual(count, 1)
+
+        results, count = self._search('QK-10')
+        self.assertEqual(results, self.sku_products)
+        self.assertEqual(count, 2)
+
+    def test_ranking(self):
+        """SKU prefix, exact name, name prefix, word prefix, then anything else."""
+        results, count = self._search('quokka')
+        self.assertEqual(results.ids, self.ranked.ids)
+        self.assertEqual(count, 5)
+
+    def test_shop_order_without_ranking(self):
+        """A sort chosen by the shopper (no tts_search_rank) keeps the shop order."""
+        results, _count = self._search('quokka', rank=False)
+        self.assertEqual(results.ids, self.ranked[::-1].ids)
+
+    def test_limit_and_count(self):
+        """Results stop at the limit /shop asks for; the count doesn't."""
+        results, count = self._search('quokka', limit=None, search_limit=3)
+        self.assertEqual(results.ids, self.ranked[:3].ids)
+        self.assertEqual(count, 5)
+
+        results, count = self._search('quokka', limit=None)
+        self.assertEqual(results.ids, self.ranked.ids)
+        self.assertEqual(count, 5)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+from odoo import Command
+from odoo.tests import HttpCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestShopGrid(HttpCase):
+    """/shop grid: stock per page in one grouped query, SQL count independent of the page size."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.website = cls.env.ref('website.default_website')
+        cls.warehouse = cls.env['stock.warehouse'].search([('company_id', '=', cls.env.company.id)], limit=1)
+        cls.category = cls.env['product.public.category'].create({'name': 'TTS Grid'})
+
+        size = cls.env['product.attribute'].create({
+            'name': 'TTS Size',
+            'create_variant': 'always',
+            'value_ids': [Command.create({'name': 'S'}), Command.create({'name': 'L'})],
+        })
+        cls.templates = cls.env['product.template'].create([{
+            'name': f'TTS Grid Product {position:03d}',
+            'type': 'consu',
+            'is_storable': True,
+            'list_price': 10.0 + position,
+            'is_published': True,
+            'sale_ok': True,
+            'public_categ_ids': [Command.link(cls.category.id)],
+            'attribute_line_ids': [Command.create({
+                'attribute_id': size.id,
+                'value_ids': [Command.set(size.value_ids.ids)],
+            })],
+        } for position in range(60)])
+
+        # 0, 5 and 50 units per template, spread over both variants
+        for position, template in enumerate(cls.templates):
+            quantity = (0, 5, 50)[position % 3]
+            for variant in template.product_variant_ids:
+                if quantity:
+                    cls.env['stock.quant']._update_available_quantity(
+                        variant, cls.warehouse.lot_stock_id, quantity / 2,
+                    )
+        cls.templates._tts_update_stock_bucket()
+
+    def _shop_url(self, ppg):
+        return f'/shop?category={self.category.id}&ppg={ppg}&in_stock=0'
+
+    def _url_query_count(self, url):
+        """SQL queries of a warm request (display price rows and caches filled by a first one)."""
+        self.url_open(url)
+        count = self.cr.sql_log_count
+        response = self.url_open(url)
+        self.assertEqual(response.status_code, 200)
+        return self.cr.sql_log_count - count
+
+    def test_stock_map(self):
+        stock_map = self.templates[:3]._get_tts_stock_map()
+        self.assertEqual(stock_map, {
+            self.templates[0].id: 0.0,
+            self.templates[1].id: 5.0,
+            self.templates[2].id: 50.0,
+        })
+        self.assertEqual(self.templates[:3].mapped('tts_stock_bucket'), ['out', 'low', 'in'])
+
+    def test_stock_map_query_count(self):
+        """One grouped stock.quant read, whatever the number of templates and variants."""
+        self.templates[:2]._get_tts_stock_map()
+        self.env.invalidate_all()
+        count = self.cr.sql_log_count
+        self.templates[:2]._get_tts_stock_map()
+        small_page = self.cr.sql_log_count - count
+
+        self.env.invalidate_all()
+        with self.assertQueryCount(small_page):
+            self.templates._get_tts_stock_map()
+
+    def test_shop_grid_query_count(self):
+        """A 60-product page costs no more queries than a 20-product one."""
+        page_20 = self._url_query_count(self._shop_url(20))
+
+        self.url_open(self._shop_url(60))
+        with self.assertQueryCount(page_20):
+            response = self.url_open(self._shop_url(60))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('TTS Grid Product 000', response.text)